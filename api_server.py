@@ -0,0 +1,328 @@
+# api_server.py
+import hmac
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from constants import API_HOST, API_PORT, API_MAX_BODY, AUDIO_DIR, AUDIO_FORMATS, DAYS
+from chime import CHIME_PREFIX, chime_path, is_chime_path
+from logger import log_error, log_info, log_warning
+from metrics import registry
+from mixer import PRIORITY_MANUAL
+from data_manager import is_local_setting
+
+# Setting rahasia (api_token, replication_token, stream_token, ...) tidak
+# pernah dibaca atau diubah lewat API
+SECRET_SUFFIX = "_token"
+
+
+def is_secret_setting(key: str) -> bool:
+    """True untuk token yang tidak boleh keluar lewat API"""
+    return key.endswith(SECRET_SUFFIX)
+
+# Bagian ETag yang berubah setiap aplikasi dijalankan, karena nomor generasi
+# cache mulai lagi dari 0 dan tidak boleh cocok dengan ETag sesi sebelumnya
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+_requests = {}
+
+
+def _count(method, status) -> None:
+    key = (method, status)
+    counter = _requests.get(key)
+    if counter is None:
+        counter = _requests[key] = registry.counter(
+            "api_requests_total", "Permintaan ke API kontrol", {"method": method, "status": str(status)})
+    counter.inc()
+
+
+class ApiError(Exception):
+    """Kesalahan permintaan yang dikirim ke klien sebagai JSON"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    server_version = "BellSekolahAPI/1.0"
+
+    @property
+    def api(self):
+        return self.server.api
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method):
+        self._status = 500  # Tetap terhitung jika handler atau _send gagal
+        url = urlsplit(self.path)
+        route = url.path.rstrip("/")
+        handler = self.api.routes.get((method, route))
+        try:
+            if not self.api.authorized(self.headers.get("Authorization")):
+                raise ApiError(401, "Token API tidak valid")
+            if handler is None:
+                known = any(path == route for _, path in self.api.routes)
+                raise ApiError(405 if known else 404, "Metode tidak didukung" if known else "Tidak ditemukan")
+            if method == "GET":
+                etag, body = handler(parse_qs(url.query))
+                if etag and etag == self.headers.get("If-None-Match"):
+                    self._send(304, None, etag)
+                else:
+                    self._send(200, body, etag)
+            else:
+                result = handler(self._read_json())
+                self._send(200, json.dumps(result).encode("utf-8"))
+        except ApiError as e:
+            self._send(e.status, json.dumps({"error": str(e)}).encode("utf-8"))
+        except Exception as e:
+            log_error(f"Error di API {method} {route}: {e}")
+            self._send(500, json.dumps({"error": "Kesalahan internal"}).encode("utf-8"))
+        _count(method, self._status)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > API_MAX_BODY:
+            raise ApiError(413, "Body terlalu besar")
+        if not length:
+            return {}
+        try:
+            data = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(400, "Body harus JSON")
+        if not isinstance(data, dict):
+            raise ApiError(400, "Body harus objek JSON")
+        return data
+
+    def _send(self, status, body, etag=None):
+        self._status = status
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if body is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        else:
+            self.send_header("Content-Length", "0")
+        self.end_headers()
+        if body is not None:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Polling klien tidak perlu masuk log
+        pass
+
+
+class ApiServer:
+    """API kontrol HTTP/JSON: jadwal, setting, pustaka audio, bunyikan dan hentikan
+
+    Berjalan di ThreadingHTTPServer dengan thread sendiri (bukan thread
+    scheduler). Baca jadwal diambil dari cache jadwal di memori; ETag berasal
+    dari nomor generasi cache, sehingga klien yang polling dengan
+    If-None-Match cukup dijawab 304 tanpa query database maupun serialisasi.
+    """
+
+    def __init__(self, data_manager, audio_player, host=API_HOST, port=API_PORT, token=None,
+                 publisher=None):
+        self.data_manager = data_manager
+        self.audio_player = audio_player
+        self.host = host
+        self.port = port
+        self.token = token or None
+        self.httpd = None
+        self.thread = None
+        self._bodies = {}  # route -> (etag, body JSON)
+        self._lock = threading.Lock()
+        self.routes = {
+            ("GET", "/api/schedules"): self.get_schedules,
+            ("POST", "/api/schedules"): self.add_schedule,
+            ("DELETE", "/api/schedules"): self.delete_schedule,
+            ("GET", "/api/settings"): self.get_settings,
+            ("PUT", "/api/settings"): self.put_settings,
+            ("GET", "/api/library"): self.get_library,
+            ("GET", "/api/status"): self.get_status,
+            ("POST", "/api/ring"): self.ring,
+            ("POST", "/api/stop"): self.stop_audio,
+        }
+        self.publisher = publisher  # ReplicationPublisher jika PC ini primary
+        if publisher is not None:
+            self.routes[("GET", "/api/replication/changes")] = self.get_changes
+            self.routes[("GET", "/api/replication/snapshot")] = self.get_snapshot
+
+    def start(self) -> bool:
+        """Jalankan server di thread daemon"""
+        if self.host not in ("127.0.0.1", "localhost", "::1") and not self.token:
+            log_warning("API kontrol dibuka ke jaringan tanpa api_token")
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), _ApiHandler)
+            self.httpd.daemon_threads = True
+            self.httpd.api = self
+            self.port = self.httpd.server_address[1]
+            self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+            self.thread.start()
+            log_info(f"API kontrol aktif di http://{self.host}:{self.port}/api")
+            return True
+        except Exception as e:
+            log_error(f"Gagal menjalankan API kontrol: {e}")
+            self.httpd = None
+            return False
+
+    def stop(self) -> None:
+        """Hentikan server"""
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def authorized(self, header) -> bool:
+        if not self.token:
+            return True
+        expected = f"Bearer {self.token}"
+        return header is not None and hmac.compare_digest(header.encode("utf-8"), expected.encode("utf-8"))
+
+    def _cached(self, route, etag, build) -> tuple:
+        """(etag, body) dengan body diserialisasi sekali per generasi"""
+        with self._lock:
+            cached = self._bodies.get(route)
+            if cached is not None and cached[0] == etag:
+                return cached
+        body = json.dumps(build(), ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._bodies[route] = (etag, body)
+        return etag, body
+
+    # Baca
+
+    def get_schedules(self, query) -> tuple:
+        generation = self.data_manager.cache_generation
+        etag = f'"{_BOOT_ID}-j{generation}"'
+
+        def build():
+            schedules = self.data_manager.get_schedules()
+            return {
+                "generation": generation,
+                "schedules": {day: [{"time": schedule_time, "audio_path": path}
+                                    for schedule_time, path in schedules.get(day, [])]
+                              for day in DAYS},
+            }
+        return self._cached("schedules", etag, build)
+
+    def get_settings(self, query) -> tuple:
+        generation = self.data_manager.settings_generation
+        etag = f'"{_BOOT_ID}-s{generation}"'
+
+        def build():
+            return {key: value for key, value in self.data_manager.get_settings().items()
+                    if not is_secret_setting(key)}
+        return self._cached("settings", etag, build)
+
+    def get_library(self, query) -> tuple:
+        try:
+            mtime = os.stat(AUDIO_DIR).st_mtime_ns
+        except OSError:
+            mtime = 0
+        etag = f'"{_BOOT_ID}-p{self.data_manager.cache_generation}-{mtime}"'
+
+        def build():
+            files = []
+            if os.path.isdir(AUDIO_DIR):
+                for name in sorted(os.listdir(AUDIO_DIR)):
+                    path = os.path.join(AUDIO_DIR, name)
+                    if os.path.splitext(name)[1].lower() in AUDIO_FORMATS and os.path.isfile(path):
+                        files.append({"name": name, "size": os.path.getsize(path)})
+            chimes = [{"name": chime.name, "path": chime_path(chime.name), "notes": chime.notes}
+                      for chime in self.data_manager.get_chimes()]
+            return {"files": files, "chimes": chimes}
+        return self._cached("library", etag, build)
+
+    def get_status(self, query) -> tuple:
+        body = {"playing": bool(self.audio_player.currently_playing),
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "generation": self.data_manager.cache_generation}
+        return None, json.dumps(body).encode("utf-8")
+
+    def get_changes(self, query) -> tuple:
+        try:
+            since = int(query.get("since", ["0"])[0])
+        except ValueError:
+            raise ApiError(400, "since harus angka")
+        etag, body = self.publisher.changes(since)
+        if body is None:
+            raise ApiError(410, "Delta sudah di-compact, muat snapshot")
+        return etag, body
+
+    def get_snapshot(self, query) -> tuple:
+        return self.publisher.snapshot()
+
+    # Tulis
+
+    def _audio_path(self, value) -> str:
+        """Path audio yang diizinkan: chime atau file di folder audio/"""
+        if not isinstance(value, str) or not value:
+            raise ApiError(400, "audio wajib diisi")
+        if is_chime_path(value):
+            if self.data_manager.get_chime(value[len(CHIME_PREFIX):]) is None:
+                raise ApiError(404, "Chime tidak ditemukan")
+            return value
+        path = os.path.join(AUDIO_DIR, os.path.basename(value))
+        if not os.path.isfile(path):
+            raise ApiError(404, f"File audio tidak ditemukan: {os.path.basename(value)}")
+        return path
+
+    def add_schedule(self, data) -> dict:
+        day, schedule_time = data.get("day"), data.get("time")
+        if day not in DAYS:
+            raise ApiError(400, f"Hari tidak valid: {day}")
+        try:
+            datetime.strptime(schedule_time or "", "%H:%M")
+        except ValueError:
+            raise ApiError(400, "Format waktu harus HH:MM")
+        path = self._audio_path(data.get("audio"))
+        gain_db = data.get("gain_db")
+        if gain_db is not None and not isinstance(gain_db, (int, float)):
+            raise ApiError(400, "gain_db harus angka")
+        if not self.data_manager.add_schedule(day, schedule_time, path, gain_db):
+            raise ApiError(500, "Gagal menyimpan jadwal")
+        return {"ok": True, "generation": self.data_manager.cache_generation}
+
+    def delete_schedule(self, data) -> dict:
+        day, schedule_time, audio = data.get("day"), data.get("time"), data.get("audio")
+        if day not in DAYS or not schedule_time or not audio:
+            raise ApiError(400, "day, time dan audio wajib diisi")
+        if not self.data_manager.delete_schedule(day, schedule_time, os.path.basename(audio)):
+            raise ApiError(500, "Gagal menghapus jadwal")
+        return {"ok": True, "generation": self.data_manager.cache_generation}
+
+    def put_settings(self, data) -> dict:
+        # Setting lokal PC (backend audio, path sink, host API, replikasi,
+        # metrics, autostart) hanya bisa diubah dari PC itu sendiri
+        for key in data:
+            if is_secret_setting(key) or is_local_setting(key):
+                raise ApiError(403, f"Setting {key} tidak bisa diubah lewat API")
+        for key, value in data.items():
+            if not self.data_manager.set_setting(key, None if value is None else str(value)):
+                raise ApiError(500, f"Gagal menyimpan setting {key}")
+        return {"ok": True, "generation": self.data_manager.settings_generation}
+
+    def ring(self, data) -> dict:
+        path = self._audio_path(data.get("audio"))
+        log_info(f"Bel dibunyikan lewat API: {path}")
+        return {"ok": bool(self.audio_player.play_audio(path, priority=PRIORITY_MANUAL))}
+
+    def stop_audio(self, data) -> dict:
+        self.audio_player.stop_audio()
+        return {"ok": True}
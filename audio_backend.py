@@ -0,0 +1,352 @@
+# audio_backend.py
+import collections
+import os
+import threading
+import time
+import wave
+from constants import MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER, MIXER_MAX_STREAMS
+from logger import log_info, log_warning
+
+try:
+    import numpy as np
+except ImportError:  # FileSinkBackend membutuhkan numpy
+    np = None
+
+# Nama backend untuk setting `audio_backend`
+BACKEND_PYGAME = "pygame"
+BACKEND_NULL = "null"
+BACKEND_FILE_SINK = "file"
+
+# Perkiraan bitrate untuk durasi file terkompresi tanpa metadata (byte/detik)
+FALLBACK_BYTES_PER_SECOND = 16000
+# Jumlah pemutaran terakhir yang disimpan NullBackend untuk diperiksa
+VOICE_HISTORY = 1000
+
+
+def known_durations() -> dict:
+    """Durasi (detik) per path dari tabel audio_metadata"""
+    from data_manager import data_manager
+    return {row[0]: row[2] for row in data_manager.get_audio_metadata() if row[2] is not None}
+
+
+def estimate_duration(path: str, durations: dict):
+    """Durasi file tanpa decode: metadata, header WAV, lalu perkiraan ukuran file
+
+    Mengembalikan None jika file tidak ada.
+    """
+    if path in durations:
+        return durations[path]
+    if path.lower().endswith(".wav"):
+        try:
+            with wave.open(path, "rb") as wav:
+                return wav.getnframes() / wav.getframerate()
+        except (wave.Error, EOFError, OSError):
+            pass
+    try:
+        return os.path.getsize(path) / FALLBACK_BYTES_PER_SECOND
+    except OSError:
+        return None
+
+
+class AudioBackend:
+    """Antarmuka backend audio yang dipakai Mixer
+
+    Objek sound harus punya `set_volume(v)` dan `get_length()`; objek channel
+    punya `play(sound, fade_ms=0)`, `queue(sound)`, `get_queue()`, `fadeout(ms)`,
+    `stop()` dan `get_busy()` (sama dengan pygame.mixer.Sound/Channel).
+    `queue` menyambung sound berikutnya tanpa jeda dan dipakai stream siaran.
+    """
+    name = None
+
+    def init(self, max_streams: int = MIXER_MAX_STREAMS) -> None:
+        raise NotImplementedError
+
+    def is_initialized(self) -> bool:
+        raise NotImplementedError
+
+    def quit(self) -> None:
+        raise NotImplementedError
+
+    def load(self, path: str):
+        """Sound dari file audio"""
+        raise NotImplementedError
+
+    def load_buffer(self, buffer):
+        """Sound dari PCM mentah berformat mixer"""
+        raise NotImplementedError
+
+    def find_channel(self):
+        """Channel kosong, atau None jika semua terpakai"""
+        raise NotImplementedError
+
+    def output_latency(self) -> float:
+        """Detik dari channel.play() sampai sampel pertama keluar perangkat"""
+        return 0.0
+
+
+class PygameBackend(AudioBackend):
+    """Backend perangkat suara lewat pygame.mixer"""
+    name = BACKEND_PYGAME
+
+    def __init__(self):
+        import pygame
+        self._pygame = pygame
+
+    def init(self, max_streams: int = MIXER_MAX_STREAMS) -> None:
+        self._pygame.mixer.init(frequency=MIXER_FREQUENCY, size=MIXER_SIZE,
+                                channels=MIXER_CHANNELS, buffer=MIXER_BUFFER)
+        self._pygame.mixer.set_num_channels(max_streams)
+
+    def is_initialized(self) -> bool:
+        return bool(self._pygame.mixer.get_init())
+
+    def quit(self) -> None:
+        if self._pygame.mixer.get_init():
+            self._pygame.mixer.quit()
+
+    def load(self, path: str):
+        return self._pygame.mixer.Sound(path)
+
+    def load_buffer(self, buffer):
+        return self._pygame.mixer.Sound(buffer=buffer)
+
+    def find_channel(self):
+        return self._pygame.mixer.find_channel()
+
+    def output_latency(self) -> float:
+        # Sound baru dicampur pada callback SDL berikutnya lalu menunggu satu
+        # buffer perangkat diputar
+        frequency = (self._pygame.mixer.get_init() or (MIXER_FREQUENCY,))[0]
+        return MIXER_BUFFER / frequency
+
+
+class NullSound:
+    """Sound tanpa sampel; hanya durasi dan riwayat volume"""
+
+    def __init__(self, length: float, clock, pcm=None):
+        self.length = length
+        self.pcm = pcm  # PCM int16 (FileSinkBackend), None untuk NullBackend
+        self._clock = clock
+        self.volumes = [(None, 1.0)]  # (waktu, volume); None = sejak awal
+
+    def set_volume(self, value: float) -> None:
+        self.volumes.append((self._clock(), value))
+
+    def get_volume(self) -> float:
+        return self.volumes[-1][1]
+
+    def get_length(self) -> float:
+        return self.length
+
+
+class Voice:
+    """Satu kali pemutaran di channel simulasi"""
+    __slots__ = ("sound", "started_at", "fade_in_ms", "ends_at", "fade_out_ms")
+
+    def __init__(self, sound, started_at, fade_in_ms):
+        self.sound = sound
+        self.started_at = started_at
+        self.fade_in_ms = fade_in_ms
+        self.ends_at = started_at + sound.get_length()
+        self.fade_out_ms = 0
+
+
+class NullChannel:
+    """Channel simulasi: sibuk selama durasi sound menurut jam backend"""
+
+    def __init__(self, backend):
+        self._backend = backend
+        self.voice = None
+        self.queued = None
+
+    def _advance(self) -> None:
+        """Mulai sound antrian tepat saat sound sebelumnya selesai"""
+        if (self.queued is not None and self.voice is not None
+                and self._backend.clock() >= self.voice.ends_at):
+            self.voice = Voice(self.queued, self.voice.ends_at, 0)
+            self._backend.voices.append(self.voice)
+            self.queued = None
+
+    def play(self, sound, fade_ms: int = 0) -> None:
+        self.queued = None
+        self.voice = Voice(sound, self._backend.clock(), fade_ms)
+        self._backend.voices.append(self.voice)
+
+    def queue(self, sound) -> None:
+        if self.get_busy():
+            self.queued = sound
+        else:
+            self.play(sound)
+
+    def get_queue(self):
+        self._advance()
+        return self.queued
+
+    def fadeout(self, ms: int) -> None:
+        self.queued = None
+        if self.get_busy():
+            self.voice.fade_out_ms = ms
+            self.voice.ends_at = min(self.voice.ends_at, self._backend.clock() + ms / 1000)
+
+    def stop(self) -> None:
+        self.queued = None
+        if self.get_busy():
+            self.voice.fade_out_ms = 0
+            self.voice.ends_at = self._backend.clock()
+
+    def get_busy(self) -> bool:
+        self._advance()
+        return self.voice is not None and self._backend.clock() < self.voice.ends_at
+
+
+class NullBackend(AudioBackend):
+    """Backend tanpa perangkat suara; durasi diambil dari metadata
+
+    `clock` bisa diganti jam tiruan agar scheduler, antrian dan preemption
+    bisa diuji secara deterministik tanpa menunggu durasi audio sebenarnya.
+    """
+    name = BACKEND_NULL
+
+    def __init__(self, clock=time.monotonic, durations=None, history=VOICE_HISTORY):
+        self.clock = clock
+        self.durations = durations  # path -> detik; None = baca dari database
+        self.voices = collections.deque(maxlen=history)  # Pemutaran terakhir
+        self._channels = []
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def init(self, max_streams: int = MIXER_MAX_STREAMS) -> None:
+        self._channels = [NullChannel(self) for _ in range(max_streams)]
+        self._initialized = True
+
+    def is_initialized(self) -> bool:
+        return self._initialized
+
+    def quit(self) -> None:
+        for channel in self._channels:
+            channel.stop()
+        self._initialized = False
+
+    def duration_of(self, path: str) -> float:
+        """Durasi file: metadata loudness, header WAV, lalu perkiraan ukuran file"""
+        if self.durations is None:
+            self.durations = known_durations()
+        duration = estimate_duration(path, self.durations)
+        return 1.0 if duration is None else duration
+
+    def load(self, path: str):
+        return NullSound(self.duration_of(path), self.clock)
+
+    def load_buffer(self, buffer):
+        frames = len(buffer) // (MIXER_CHANNELS * abs(MIXER_SIZE) // 8)
+        return NullSound(frames / MIXER_FREQUENCY, self.clock)
+
+    def find_channel(self):
+        with self._lock:
+            for channel in self._channels:
+                if not channel.get_busy():
+                    return channel
+        return None
+
+
+class FileSinkBackend(NullBackend):
+    """Backend yang merender hasil mixing ke file WAV
+
+    Volume, ducking, fade in dan fade out diterapkan sesuai jam backend,
+    sehingga hasil mixer bisa didengar atau dibandingkan tanpa perangkat suara.
+    """
+    name = BACKEND_FILE_SINK
+
+    def __init__(self, output_path: str, clock=time.monotonic, durations=None):
+        if np is None:
+            raise ImportError("FileSinkBackend membutuhkan numpy")
+        super().__init__(clock, durations)
+        self.voices = []  # Semua pemutaran dibutuhkan untuk render
+        self.output_path = output_path
+        self.origin = clock()
+
+    def load(self, path: str):
+        pcm = self._read_pcm(path)
+        if pcm is None:
+            log_warning(f"Tidak bisa decode {path} untuk file sink, diganti hening")
+            frames = int(self.duration_of(path) * MIXER_FREQUENCY)
+            pcm = np.zeros((frames, MIXER_CHANNELS), dtype=np.int16)
+        return NullSound(len(pcm) / MIXER_FREQUENCY, self.clock, pcm)
+
+    def load_buffer(self, buffer):
+        pcm = np.frombuffer(bytes(buffer), dtype="<i2").reshape(-1, MIXER_CHANNELS)
+        return NullSound(len(pcm) / MIXER_FREQUENCY, self.clock, pcm)
+
+    def _read_pcm(self, path: str):
+        """PCM berformat mixer dari cache PCM atau WAV yang formatnya sama"""
+        from pcm_cache import pcm_cache, CachedPcm
+        candidates = [path]
+        cached_path = pcm_cache.cache_path(path)
+        if cached_path:
+            candidates.insert(0, cached_path)
+        for candidate in candidates:
+            if not candidate.lower().endswith(".wav") or not os.path.exists(candidate):
+                continue
+            try:
+                cached = CachedPcm(candidate)
+            except (OSError, ValueError):
+                continue
+            try:
+                if cached.matches_mixer:
+                    view = cached.view()
+                    try:
+                        return np.frombuffer(view, dtype="<i2").reshape(-1, MIXER_CHANNELS).copy()
+                    finally:
+                        view.release()
+            finally:
+                cached.close()
+        return None
+
+    def render(self):
+        """Campur semua channel yang pernah diputar menjadi array int16"""
+        end = max((voice.ends_at for voice in self.voices), default=self.origin)
+        total = np.zeros((int((end - self.origin) * MIXER_FREQUENCY) + 1, MIXER_CHANNELS))
+        for voice in self.voices:
+            start = int((voice.started_at - self.origin) * MIXER_FREQUENCY)
+            frames = min(len(voice.sound.pcm),
+                         int((voice.ends_at - voice.started_at) * MIXER_FREQUENCY))
+            if frames <= 0:
+                continue
+            times = voice.started_at + np.arange(frames) / MIXER_FREQUENCY
+            gain = np.full(frames, voice.sound.volumes[0][1])
+            for moment, value in voice.sound.volumes[1:]:
+                gain[times >= moment] = value
+            if voice.fade_in_ms:
+                ramp = int(voice.fade_in_ms / 1000 * MIXER_FREQUENCY)
+                gain[:ramp] *= np.linspace(0.0, 1.0, ramp, endpoint=False)[:frames]
+            if voice.fade_out_ms:
+                ramp = min(frames, int(voice.fade_out_ms / 1000 * MIXER_FREQUENCY))
+                gain[frames - ramp:] *= np.linspace(1.0, 0.0, ramp)
+            total[start:start + frames] += voice.sound.pcm[:frames] * gain[:, None]
+        return np.clip(total, -32768, 32767).astype("<i2")
+
+    def quit(self) -> None:
+        super().quit()
+        self.write()
+
+    def write(self) -> str:
+        """Tulis hasil render ke output_path"""
+        pcm = self.render()
+        with wave.open(self.output_path, "wb") as wav:
+            wav.setnchannels(MIXER_CHANNELS)
+            wav.setsampwidth(abs(MIXER_SIZE) // 8)
+            wav.setframerate(MIXER_FREQUENCY)
+            wav.writeframes(pcm.tobytes())
+        log_info(f"Hasil mixing ditulis ke {self.output_path} ({len(pcm) / MIXER_FREQUENCY:.1f} detik)")
+        return self.output_path
+
+
+def create_backend(name: str = None, output_path: str = None) -> AudioBackend:
+    """Buat backend menurut nama (setting `audio_backend`)"""
+    if name == BACKEND_NULL:
+        return NullBackend()
+    if name == BACKEND_FILE_SINK:
+        return FileSinkBackend(output_path or "bell_sink.wav")
+    if name not in (None, "", BACKEND_PYGAME):
+        log_warning(f"Backend audio tidak dikenal: {name}, memakai {BACKEND_PYGAME}")
+    return PygameBackend()
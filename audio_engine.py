@@ -0,0 +1,358 @@
+# audio_engine.py
+import os
+import sys
+import time
+import wave
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from constants import MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS
+from chime import chime_library, is_chime_path
+from data_manager import data_manager
+from latency import latency_tracker, STAGE_MIXER_READY, STAGE_FIRST_OUTPUT
+from logger import log_error, log_info, log_warning
+from metrics import registry
+from mixer import Mixer, MixerConfig, PRIORITY_BELL, TICK_ACTIVE
+from pcm_cache import pcm_cache, CachedPcm
+from loudness import loudness, gain_to_volume
+from watchdog import supervisor
+
+# Interval heartbeat dari proses engine saat memutar audio
+ENGINE_BEAT_INTERVAL = 0.5  # detik
+# Interval pemeriksaan proses engine oleh proses utama
+ENGINE_MONITOR_INTERVAL = 1.0  # detik
+
+_respawns = registry.counter("audio_engine_respawns_total", "Proses audio engine dijalankan ulang")
+
+
+def _attach(name: str):
+    """Buka shared memory milik proses utama tanpa mendaftarkannya ke resource tracker
+
+    Proses utama yang membuat dan meng-unlink segmen. Jika proses engine
+    ikut mendaftar (Python < 3.13), resource tracker menganggap segmen
+    bocor atau mencoba menghapusnya dua kali.
+    """
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _load_sound(backend, command, message):
+    """Buat Sound dari perintah play_* (backend menyalin buffer sekali)"""
+    if command == "play_pcm":
+        shm = _attach(message[2])
+        view = shm.buf[:message[3]]
+        try:
+            return backend.load_buffer(view)
+        finally:
+            view.release()
+            shm.close()
+    if command == "play_cached":
+        # WAV cache di-mmap oleh proses ini lalu disalin ke Sound
+        cached = CachedPcm(message[2])
+        view = cached.view()
+        try:
+            return backend.load_buffer(view)
+        finally:
+            view.release()
+            cached.close()
+    return backend.load(message[2])
+
+
+def _engine_main(conn, config) -> None:
+    """Loop proses audio engine: terima perintah lewat pipe, putar lewat Mixer
+
+    Perintah: ("play_pcm", id, nama_shm, jumlah_byte, volume, prioritas),
+    ("play_cached", id, path_wav, volume, prioritas), ("play_file", id, path, volume, prioritas),
+    ("stop",), ("ping",), ("quit",).
+    Balasan: ("ready",), ("mixer_siap", id, t), ("started", id, t), ("beat",),
+    ("done", id, berhasil, pesan_error), ("pong",).
+    """
+    mixer = Mixer(MixerConfig(*config), heartbeat=None)
+    mixer.ensure_init()
+    conn.send(("ready",))
+    last_beat = 0.0
+
+    def on_start(request_id):
+        return lambda stream: conn.send(("started", request_id, stream.output_at))
+
+    def on_done(request_id):
+        return lambda stream: conn.send(("done", request_id, stream.success,
+                                         None if stream.success else "dibatalkan"))
+
+    while True:
+        if conn.poll(TICK_ACTIVE if mixer.active() else 0.5):
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            command = message[0]
+            if command == "quit":
+                break
+            if command == "ping":
+                conn.send(("pong",))
+            elif command == "stop":
+                mixer.stop_all()
+            elif command in ("play_pcm", "play_cached", "play_file"):
+                request_id, volume, priority = message[1], message[-2], message[-1]
+                try:
+                    sound = _load_sound(mixer.backend, command, message)
+                    conn.send(("mixer_siap", request_id, time.time()))
+                    mixer.play(sound, str(request_id), priority, volume,
+                               on_start=on_start(request_id), on_done=on_done(request_id))
+                except Exception as e:
+                    conn.send(("done", request_id, False, str(e)))
+
+        mixer.tick()
+        if mixer.active() and time.monotonic() - last_beat >= ENGINE_BEAT_INTERVAL:
+            last_beat = time.monotonic()
+            conn.send(("beat",))
+
+    mixer.shutdown()
+
+
+def load_pcm(path: str):
+    """Baca PCM mentah dari WAV yang formatnya sudah sama dengan mixer
+
+    Mengembalikan None untuk format lain; file tersebut di-decode oleh
+    proses engine sendiri.
+    """
+    if not path.lower().endswith(".wav"):
+        return None
+    try:
+        with wave.open(path, "rb") as wav:
+            if (wav.getframerate() != MIXER_FREQUENCY or wav.getsampwidth() != abs(MIXER_SIZE) // 8
+                    or wav.getnchannels() != MIXER_CHANNELS):
+                return None
+            return wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+
+class _Request:
+    __slots__ = ("trace", "shm", "event", "success")
+
+    def __init__(self, trace, shm):
+        self.trace = trace
+        self.shm = shm
+        self.event = threading.Event()
+        self.success = False
+
+
+class AudioEngine:
+    """Pemutar audio di proses terpisah; antarmuka sama dengan AudioPlayer
+
+    GUI yang sibuk, messagebox yang memblokir, atau crash SDL tidak lagi
+    menghentikan bel: proses engine dipantau dan dijalankan ulang jika mati.
+    """
+
+    def __init__(self):
+        self.currently_playing = False
+        self._send_lock = threading.Lock()
+        self._requests = {}
+        self._next_id = 0
+        self._stopping = False
+        self._conn = None
+        self._process = None
+        self._spawn()
+        self._monitor_thread = threading.Thread(target=self._monitor, daemon=True)
+        self._monitor_thread.start()
+        registry.gauge_fn("audio_playing", "1 jika audio sedang diputar",
+                          lambda: int(self.currently_playing))
+        registry.gauge_fn("audio_engine_alive", "1 jika proses audio engine hidup",
+                          lambda: int(self._process is not None and self._process.is_alive()))
+
+    def _spawn(self) -> None:
+        """Jalankan proses engine baru beserta thread pembaca pipe"""
+        parent_conn, child_conn = multiprocessing.Pipe()
+        config = MixerConfig.from_settings(data_manager).as_tuple()
+        process = multiprocessing.Process(target=_engine_main, args=(child_conn, config),
+                                          name="bell-audio-engine", daemon=True)
+        process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._process = process
+        threading.Thread(target=self._read_loop, args=(parent_conn,), daemon=True).start()
+        log_info(f"Audio engine berjalan di proses {process.pid}")
+
+    def _read_loop(self, conn) -> None:
+        """Terima balasan dari proses engine"""
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            kind = message[0]
+            if kind == "beat":
+                supervisor.heartbeat("audio")
+            elif kind in ("mixer_siap", "started"):
+                request = self._requests.get(message[1])
+                if request and request.trace:
+                    stage = STAGE_MIXER_READY if kind == "mixer_siap" else STAGE_FIRST_OUTPUT
+                    request.trace.mark(stage, message[2])
+                    if stage == STAGE_FIRST_OUTPUT:
+                        latency_tracker.record(request.trace)
+            elif kind == "done":
+                if not message[2]:
+                    log_error(f"Audio engine gagal memutar: {message[3]}")
+                request = self._requests.get(message[1])
+                if request and request.trace and STAGE_FIRST_OUTPUT not in request.trace.marks:
+                    # Tidak pernah terbukti berbunyi (dibatalkan atau gagal)
+                    latency_tracker.record(request.trace)
+                self._complete(message[1], message[2])
+
+    def _complete(self, request_id, success) -> None:
+        """Selesaikan permintaan dan lepaskan shared memory-nya"""
+        request = self._requests.pop(request_id, None)
+        if request is None:
+            return
+        if request.shm is not None:
+            request.shm.close()
+            request.shm.unlink()
+        request.success = success
+        request.event.set()
+        if not self._requests:
+            self.currently_playing = False
+
+    def _send(self, message) -> bool:
+        try:
+            with self._send_lock:
+                self._conn.send(message)
+            return True
+        except (OSError, ValueError) as e:
+            log_error(f"Gagal mengirim perintah ke audio engine: {e}")
+            return False
+
+    def play_audio(self, path: str, blocking: bool = False, trace=None, gain_db=None,
+                   priority: int = PRIORITY_BELL) -> bool:
+        """Putar file audio di proses engine
+
+        Kebijakan tumpang tindih dibaca saat engine dijalankan; perubahan
+        setting berlaku setelah engine direset.
+        """
+        if is_chime_path(path):
+            path = chime_library.resolve(path)
+            if path is None:
+                return False
+        if not os.path.exists(path):
+            log_error(f"File audio tidak ditemukan: {path}")
+            return False
+
+        volume = gain_to_volume(gain_db if gain_db is not None else loudness.gain_for(path))
+        cached = pcm_cache.lookup(path)
+        pcm = None
+        if cached is not None:
+            cached.close()
+        else:
+            pcm = load_pcm(path)
+        shm = None
+        with self._send_lock:
+            self._next_id += 1
+            request_id = self._next_id
+        if cached is not None:
+            # File cache dibuka sendiri oleh proses engine, tanpa salinan lewat pipe
+            message = ("play_cached", request_id, cached.path, volume, priority)
+        elif pcm is not None:
+            # PCM dikirim lewat shared memory, bukan di-pickle lewat pipe
+            shm = shared_memory.SharedMemory(create=True, size=len(pcm))
+            shm.buf[:len(pcm)] = pcm
+            message = ("play_pcm", request_id, shm.name, len(pcm), volume, priority)
+        else:
+            message = ("play_file", request_id, path, volume, priority)
+
+        request = _Request(trace, shm)
+        self._requests[request_id] = request
+        self.currently_playing = True
+        supervisor.heartbeat("audio")
+        if not self._send(message):
+            self._complete(request_id, False)
+            return False
+        log_info(f"Memutar audio: {os.path.basename(path)}")
+
+        if blocking:
+            request.event.wait()
+            return request.success
+        return True
+
+    def stop_audio(self):
+        """Hentikan audio yang sedang diputar"""
+        if self.currently_playing:
+            self._send(("stop",))
+            log_info("Audio dihentikan")
+
+    def _fail_pending(self) -> None:
+        for request_id in list(self._requests):
+            self._complete(request_id, False)
+        self.currently_playing = False
+
+    def _monitor(self) -> None:
+        """Jalankan ulang proses engine jika mati"""
+        while not self._stopping:
+            time.sleep(ENGINE_MONITOR_INTERVAL)
+            if self._stopping:
+                return
+            if not self._process.is_alive():
+                log_warning(f"Audio engine mati (exit code {self._process.exitcode}), menjalankan ulang")
+                self._fail_pending()
+                _respawns.inc()
+                try:
+                    self._spawn()
+                except Exception as e:
+                    log_error(f"Gagal menjalankan ulang audio engine: {e}")
+
+    def reset(self) -> None:
+        """Matikan proses engine yang macet; monitor akan menjalankan ulang"""
+        log_warning("Audio engine direset")
+        if self._process is not None and self._process.is_alive():
+            self._process.terminate()
+
+    def shutdown(self) -> None:
+        """Hentikan proses engine saat aplikasi ditutup"""
+        self._stopping = True
+        self._send(("quit",))
+        self._process.join(timeout=1.0)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._fail_pending()
+
+
+def benchmark(path: str, runs: int = 5) -> dict:
+    """Bandingkan latensi sampai audio keluar: AudioPlayer vs AudioEngine (ms)"""
+    from latency import FireTrace
+    from audio_player import AudioPlayer
+
+    results = {}
+    for name, factory in (("thread", AudioPlayer), ("proses", AudioEngine)):
+        player = factory()
+        if name == "proses":
+            time.sleep(1.0)  # Tunggu mixer di proses engine siap
+        samples = []
+        for _ in range(runs):
+            trace = FireTrace(time.time())
+            player.play_audio(path, blocking=True, trace=trace)
+            latency = trace.latencies_ms().get(STAGE_FIRST_OUTPUT)
+            if latency is not None:
+                samples.append(latency)
+        if hasattr(player, "shutdown"):
+            player.shutdown()
+        samples.sort()
+        results[name] = {
+            "runs": len(samples),
+            "min": samples[0] if samples else None,
+            "median": samples[len(samples) // 2] if samples else None,
+            "max": samples[-1] if samples else None,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Penggunaan: python audio_engine.py <file audio> [jumlah_putaran]")
+        sys.exit(1)
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    for engine, stats in benchmark(sys.argv[1], runs).items():
+        print(f"{engine:7s} min={stats['min']} median={stats['median']} max={stats['max']} ms")
@@ -1,67 +1,188 @@
 # audio_player.py
-import pygame
 import os
-import time
 import threading
+from audio_backend import create_backend
+from chime import chime_library, is_chime_path
+from data_manager import data_manager
 from logger import log_error, log_info
+from latency import latency_tracker, STAGE_MIXER_READY, STAGE_FIRST_OUTPUT
+from metrics import registry
+from mixer import Mixer, MixerConfig, PRIORITY_BELL, PRIORITY_ANNOUNCEMENT
+from pcm_cache import pcm_cache
+from loudness import loudness, gain_to_volume
+from watchdog import supervisor
+
+_load_timer = registry.histogram("audio_load_seconds", "Durasi memuat/decode file audio")
+_mixer_init_failures = registry.counter("audio_mixer_init_failures_total", "Kegagalan inisialisasi mixer")
 
 class AudioPlayer:
-    def __init__(self):
-        self.currently_playing = False
+    """Pemutar audio di proses aplikasi; beberapa audio dicampur lewat Mixer
+
+    `backend` default dipilih dari setting `audio_backend` ("pygame", "null"
+    atau "file"); backend null/file dipakai untuk uji dan benchmark tanpa
+    perangkat suara.
+    """
+
+    def __init__(self, backend=None):
         self.play_lock = threading.Lock()
+        if backend is None:
+            backend = create_backend(data_manager.get_setting("audio_backend"),
+                                     data_manager.get_setting("audio_sink_path"))
+        self._config = MixerConfig.from_settings(data_manager)
+        self._config_generation = data_manager.settings_generation  # settings_generation saat _config dibaca
+        self.mixer = Mixer(self._config, backend=backend)
+        self.mixer.start()
+        registry.gauge_fn("audio_playing", "1 jika audio sedang diputar",
+                          lambda: int(self.currently_playing))
+
+    def _mixer_config(self) -> MixerConfig:
+        """Konfigurasi mixer, dibaca ulang hanya jika ada setting yang berubah"""
+        generation = data_manager.settings_generation
+        if generation != self._config_generation:
+            self._config = MixerConfig.from_settings(data_manager)
+            self._config_generation = generation
+        return self._config
+
+    @property
+    def currently_playing(self) -> bool:
+        return self.mixer.active()
         
-    def play_audio(self, path: str, blocking: bool = False) -> bool:
-        """Putar file audio"""
+    def play_audio(self, path: str, blocking: bool = False, trace=None, gain_db=None,
+                   priority: int = PRIORITY_BELL) -> bool:
+        """Putar file audio
+
+        `trace` (FireTrace) diisi cap waktu mixer siap dan audio pertama keluar.
+        `gain_db` menimpa gain loudness tersimpan untuk file ini. Audio yang
+        tumpang tindih diatur oleh kebijakan mixer (setting `overlap_policy`).
+        """
+        if is_chime_path(path):
+            path = chime_library.resolve(path)
+            if path is None:
+                return False
         if not os.path.exists(path):
             log_error(f"File audio tidak ditemukan: {path}")
             return False
             
-        with self.play_lock:
-            if self.currently_playing:
-                log_info("Audio sedang diputar, menunggu selesai...")
-                
-            if blocking:
-                return self._play_audio_blocking(path)
-            else:
-                threading.Thread(target=self._play_audio_blocking, args=(path,), daemon=True).start()
-                return True
+        volume = gain_to_volume(gain_db if gain_db is not None else loudness.gain_for(path))
+        if blocking:
+            return self._play_audio_blocking(path, trace, volume, priority)
+        else:
+            threading.Thread(target=self._play_audio_blocking, args=(path, trace, volume, priority),
+                             daemon=True).start()
+            return True
                 
-    def _play_audio_blocking(self, path: str) -> bool:
-        """Putar audio dengan cara blocking"""
+    def _play_audio_blocking(self, path: str, trace=None, volume: float = 1.0,
+                             priority: int = PRIORITY_BELL) -> bool:
+        """Putar audio dan tunggu sampai selesai"""
         try:
-            self.currently_playing = True
-            
-            # Inisialisasi mixer
-            if pygame.mixer.get_init():
-                pygame.mixer.quit()
-            pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
-            
-            # Load dan putar
-            pygame.mixer.music.load(path)
-            pygame.mixer.music.play()
+            supervisor.heartbeat("audio")
+            with self.play_lock:
+                try:
+                    self.mixer.ensure_init()
+                except Exception:
+                    _mixer_init_failures.inc()
+                    raise
+                
+                # Load; PCM dari cache tidak perlu di-decode lagi
+                cached = pcm_cache.lookup(path)
+                with _load_timer.time():
+                    if cached is not None:
+                        sound = self._load_cached(cached)
+                    else:
+                        sound = self.mixer.backend.load(path)
+                if trace:
+                    trace.mark(STAGE_MIXER_READY)
+                
+                stream = self.mixer.play(
+                    sound, os.path.basename(path), priority, volume,
+                    on_start=lambda started: self._on_started(trace, started),
+                    config=self._mixer_config()
+                )
             log_info(f"Memutar audio: {os.path.basename(path)}")
             
-            # Tunggu sampai selesai
-            while pygame.mixer.music.get_busy():
-                time.sleep(0.1)
-                
-            pygame.mixer.quit()
-            self.currently_playing = False
-            return True
+            # Tunggu sampai selesai (termasuk waktu di antrian)
+            stream.done.wait()
+            if trace and STAGE_FIRST_OUTPUT not in trace.marks:
+                # Tidak pernah terbukti berbunyi (dibatalkan atau gagal)
+                latency_tracker.record(trace)
+            result = "ok" if stream.success else "batal"
+            registry.counter("audio_plays_total", "Pemutaran audio menurut hasil", {"result": result}).inc()
+            return stream.success
         except Exception as e:
             log_error(f"Gagal memutar audio {path}: {e}")
-            if pygame.mixer.get_init():
-                pygame.mixer.quit()
-            self.currently_playing = False
+            registry.counter("audio_plays_total", "Pemutaran audio menurut hasil", {"result": "gagal"}).inc()
+            if trace and STAGE_FIRST_OUTPUT not in trace.marks:
+                latency_tracker.record(trace)
+            return False
+
+    def play_stream(self, feed, name: str, priority: int = PRIORITY_ANNOUNCEMENT,
+                    blocking: bool = False) -> bool:
+        """Putar siaran dari `feed` (callable non-blocking yang mengembalikan blok PCM)
+
+        Blok disambung tanpa jeda oleh mixer dan mengikuti kebijakan tumpang
+        tindih yang sama dengan bel; None dari feed menandakan siaran selesai.
+        """
+        if blocking:
+            return self._play_stream_blocking(feed, name, priority)
+        threading.Thread(target=self._play_stream_blocking, args=(feed, name, priority),
+                         daemon=True).start()
+        return True
+
+    def _play_stream_blocking(self, feed, name: str, priority: int) -> bool:
+        try:
+            supervisor.heartbeat("audio")
+            with self.play_lock:
+                self.mixer.ensure_init()
+                first = feed()
+                if first is None:
+                    return False
+                stream = self.mixer.play(
+                    self.mixer.backend.load_buffer(first), name, priority,
+                    config=self._mixer_config(), feed=feed
+                )
+            log_info(f"Memutar siaran: {name}")
+            stream.done.wait()
+            result = "ok" if stream.success else "batal"
+            registry.counter("audio_plays_total", "Pemutaran audio menurut hasil", {"result": result}).inc()
+            return stream.success
+        except Exception as e:
+            log_error(f"Gagal memutar siaran {name}: {e}")
+            registry.counter("audio_plays_total", "Pemutaran audio menurut hasil", {"result": "gagal"}).inc()
             return False
+
+    def _load_cached(self, cached):
+        """Buat Sound dari PCM yang di-mmap; backend menyalin seluruh PCM ke Sound baru"""
+        view = cached.view()
+        try:
+            return self.mixer.backend.load_buffer(view)
+        finally:
+            view.release()
+            cached.close()
+
+    def _on_started(self, trace, stream) -> None:
+        """Catat latensi bel setelah loop mixer melihat channel berbunyi
+
+        Cap waktunya saat play() ditambah latensi buffer perangkat, sehingga
+        jeda polling loop mixer tidak ikut terhitung.
+        """
+        if trace:
+            trace.mark(STAGE_FIRST_OUTPUT, stream.output_at)
+            latency_tracker.record(trace)
     
+    def reset(self) -> None:
+        """Pulihkan status pemutar yang macet (dipanggil watchdog)"""
+        self.mixer.reset()
+        log_info("Audio player direset")
+
     def stop_audio(self):
         """Hentikan audio yang sedang diputar"""
         try:
-            if self.currently_playing and pygame.mixer.get_init():
-                pygame.mixer.music.stop()
-                pygame.mixer.quit()
-                self.currently_playing = False
+            if self.currently_playing:
+                self.mixer.stop_all()
                 log_info("Audio dihentikan")
         except Exception as e:
-            log_error(f"Gagal menghentikan audio: {e}")
\ No newline at end of file
+            log_error(f"Gagal menghentikan audio: {e}")
+
+    def shutdown(self) -> None:
+        """Hentikan loop mixer saat aplikasi ditutup"""
+        self.mixer.shutdown()
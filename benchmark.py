@@ -0,0 +1,598 @@
+# benchmark.py
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import data_manager as data_manager_module
+from data_manager import data_manager
+from constants import DAYS, VERSION
+from dataset_generator import write_clip, generate, DEFAULT_SEED, PROFILES
+
+DEFAULT_RUNS = 7
+DEFAULT_SCHEDULES = 200
+DEFAULT_THRESHOLD = 0.20   # median 20% lebih lambat dari baseline = regresi
+NOISE_FLOOR_MS = 0.05      # selisih di bawah ini dianggap noise pengukuran
+MEMORY_NOISE_FLOOR = 4096  # byte; cache kalender dan pool sqlite ikut berfluktuasi
+BULK_SIZE = 500
+FIRE_RECORD_BATCH = 1000
+HASH_FILE_MB = 32
+STARTUP_TIMEOUT = 60.0     # detik
+SCALING_YEARS = 1          # riwayat bel per dataset kurva skala
+# Benchmark yang bergantung pada ukuran data, dipakai mode --scale
+SCALING_BENCHMARKS = ["db_get_schedules_cold", "db_get_schedules_cached", "scheduler_tick",
+                      "scheduler_next_fire", "scheduler_memory", "gui_schedule_table", "startup_cold"]
+
+# Nama benchmark -> fungsi(ctx, runs) yang mengembalikan statistik (ms).
+# Urutan pendaftaran = urutan jalan; benchmark tulis database di akhir.
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Daftarkan fungsi benchmark ke suite"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def _stats(samples, **extra) -> dict:
+    """Ringkasan sampel (ms): runs, min, median, p95, max"""
+    samples = sorted(samples)
+    if not samples:
+        return dict(runs=0, **extra)
+    return dict(
+        runs=len(samples),
+        min=samples[0],
+        median=samples[len(samples) // 2],
+        p95=samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        max=samples[-1],
+        **extra
+    )
+
+
+def _measure(func, runs, setup=None, inner=1) -> dict:
+    """Jalankan func `inner` kali per putaran; sampel = ms per panggilan"""
+    samples = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(inner):
+            func()
+        samples.append((time.perf_counter() - start) * 1000 / inner)
+    return _stats(samples)
+
+
+class BenchContext:
+    """Database sementara berisi `schedules` jadwal (atau salinan `database`)
+
+    Selama konteks aktif data_manager menunjuk ke database sementara,
+    sehingga database aplikasi tidak tersentuh.
+    """
+
+    def __init__(self, schedules=DEFAULT_SCHEDULES, database=None, audio_backend=None):
+        self.schedules = schedules
+        self.database = database
+        self.audio_backend = audio_backend
+        self.workdir = None
+        self._original_db = None
+        self._tone = None
+        self.schedule_count = 0
+
+    def __enter__(self):
+        self.workdir = tempfile.mkdtemp(prefix="bell_benchmark_")
+        self._original_db = data_manager_module.DB_NAME
+        data_manager_module.DB_NAME = os.path.join(self.workdir, "benchmark.db")
+        if self.database:
+            shutil.copy2(self.database, data_manager_module.DB_NAME)
+        data_manager.init_db()
+        data_manager.reload()
+        if not self.database:
+            self._populate()
+        self.schedule_count = sum(len(items) for items in data_manager.get_schedules(force_refresh=True).values())
+        return self
+
+    def __exit__(self, *exc):
+        data_manager_module.DB_NAME = self._original_db
+        data_manager.reload()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        return False
+
+    @property
+    def db_path(self) -> str:
+        return data_manager_module.DB_NAME
+
+    def _populate(self) -> None:
+        """Jadwal tersebar rata di semua hari, satu menit per bel mulai 06:00"""
+        audio = self.tone()
+        for index in range(self.schedules):
+            minute = 6 * 60 + index // len(DAYS)
+            data_manager.add_schedule(DAYS[index % len(DAYS)],
+                                      f"{minute // 60 % 24:02d}:{minute % 60:02d}", audio)
+
+    def tone(self) -> str:
+        """Path WAV pendek untuk uji pemutaran"""
+        if self._tone is None:
+            self._tone = write_clip(os.path.join(self.workdir, "nada.wav"), 0.3, 880.0)
+        return self._tone
+
+    def data_file(self, size_mb: int) -> str:
+        """File acak berukuran `size_mb` MB untuk uji hash"""
+        path = os.path.join(self.workdir, f"data_{size_mb}mb.bin")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                for _ in range(size_mb):
+                    f.write(os.urandom(1024 * 1024))
+        return path
+
+    def scheduler(self):
+        """BellScheduler berjam tiruan tanpa thread, pada Senin pukul 05:00"""
+        from clock import SimulatedClock
+        from scheduler import BellScheduler
+        from simulation import RecordingPlayer
+        clock = SimulatedClock(datetime.datetime(2026, 1, 5, 5, 0))
+        return BellScheduler(RecordingPlayer(clock), clock=clock, notify=None, start=False)
+
+
+@benchmark("db_get_schedules_cold")
+def bench_get_schedules_cold(ctx, runs) -> dict:
+    return _measure(lambda: data_manager.get_schedules(force_refresh=True), runs)
+
+
+@benchmark("db_get_schedules_cached")
+def bench_get_schedules_cached(ctx, runs) -> dict:
+    data_manager.get_schedules()
+    return _measure(data_manager.get_schedules, runs, inner=1000)
+
+
+@benchmark("scheduler_tick")
+def bench_scheduler_tick(ctx, runs) -> dict:
+    scheduler = ctx.scheduler()
+    scheduler.tick()  # Heap disusun di tick pertama
+    stats = _measure(scheduler.tick, runs, inner=100)
+    scheduler.stop()
+    return stats
+
+
+@benchmark("scheduler_next_fire")
+def bench_scheduler_next_fire(ctx, runs) -> dict:
+    """Susun ulang heap bel berikutnya dari kalender dingin"""
+    scheduler = ctx.scheduler()
+    now = scheduler.clock.now()
+
+    def next_fire():
+        scheduler._rebuild_heap(now)
+        scheduler.next_bell()
+
+    stats = _measure(next_fire, runs, setup=scheduler.calendar.invalidate)
+    stats["heap_size"] = len(scheduler._heap)
+    scheduler.stop()
+    return stats
+
+
+@benchmark("file_hash")
+def bench_file_hash(ctx, runs) -> dict:
+    path = ctx.data_file(HASH_FILE_MB)
+    data_manager.calculate_file_hash(path)  # Panaskan page cache
+    stats = _measure(lambda: data_manager.calculate_file_hash(path), runs)
+    stats["mb_per_s"] = HASH_FILE_MB * 1000 / stats["median"]
+    return stats
+
+
+@benchmark("audio_first_sample")
+def bench_audio_first_sample(ctx, runs) -> dict:
+    """Latensi dari play_audio() sampai sampel pertama keluar dari mixer"""
+    from audio_backend import create_backend
+    from audio_player import AudioPlayer
+    from latency import FireTrace, STAGE_FIRST_OUTPUT
+    player = AudioPlayer(backend=create_backend(ctx.audio_backend, os.path.join(ctx.workdir, "sink.wav")))
+    try:
+        path = ctx.tone()
+        samples = []
+        for _ in range(runs):
+            trace = FireTrace(time.time())
+            if not player.play_audio(path, blocking=True, trace=trace):
+                raise RuntimeError("audio gagal diputar")
+            latency = trace.latencies_ms().get(STAGE_FIRST_OUTPUT)
+            if latency is not None:
+                samples.append(latency)
+        return _stats(samples, backend=type(player.mixer.backend).__name__)
+    finally:
+        player.shutdown()
+
+
+@benchmark("gui_schedule_table")
+def bench_schedule_table(ctx, runs) -> dict:
+    """ScheduleTable.update_data sampai widget selesai digambar"""
+    import tkinter as tk
+    from gui.components import ScheduleTable
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return {"skipped": f"tidak ada display: {e}"}
+    try:
+        schedules = data_manager.get_schedules()
+        rows = max([len(items) for items in schedules.values()] or [1])
+        table = ScheduleTable(root, rows=rows)
+        table.pack(fill="both", expand=True)
+        root.update()
+
+        def render():
+            table.update_data(schedules)
+            root.update_idletasks()
+
+        stats = _measure(render, runs)
+        stats["cells"] = table.get_cell_count()
+        return stats
+    finally:
+        root.destroy()
+
+
+@benchmark("startup_cold")
+def bench_startup(ctx, runs) -> dict:
+    """Proses baru sampai jendela utama siap, tanpa jeda splash screen
+
+    Probe memuat modul yang sama dengan main(), menginisialisasi database
+    dan (jika ada display) membuat SchoolBellApp. Jeda time.sleep splash
+    screen (~12 detik, tetap) tidak ikut diukur.
+    """
+    samples = []
+    phases = {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--startup-probe", ctx.db_path],
+            cwd=ctx.workdir, capture_output=True, text=True, timeout=STARTUP_TIMEOUT
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        lines = result.stdout.strip().splitlines()
+        if result.returncode != 0 or not lines:
+            detail = (result.stderr.strip().splitlines() or ["tanpa keluaran"])[-1]
+            raise RuntimeError(f"probe startup gagal: {detail}")
+        report = json.loads(lines[-1])
+        samples.append(elapsed)
+        for phase, value in report.items():
+            phases.setdefault(phase, []).append(value)
+    return _stats(samples, phases={phase: sorted(values)[len(values) // 2]
+                                   for phase, values in phases.items()})
+
+
+def _startup_probe(db_path) -> None:
+    """Dijalankan di proses anak oleh bench_startup; cetak durasi tiap fase (ms)"""
+    report = {}
+    start = time.perf_counter()
+    import tkinter as tk
+    from gui.main_window import SchoolBellApp
+    from gui.tray_icon import TrayIcon  # noqa: F401 - dimuat main() sebelum jendela dibuat
+    from watchdog import supervisor  # noqa: F401
+    report["impor"] = (time.perf_counter() - start) * 1000
+
+    phase = time.perf_counter()
+    data_manager_module.DB_NAME = db_path
+    data_manager.init_db()
+    data_manager.is_database_empty()
+    report["database"] = (time.perf_counter() - phase) * 1000
+
+    phase = time.perf_counter()
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        root = None
+    if root is not None:
+        root.withdraw()
+        SchoolBellApp(root)
+        root.update()
+        report["jendela"] = (time.perf_counter() - phase) * 1000
+    sys.stdout.write(json.dumps(report) + "\n")
+    sys.stdout.flush()
+    os._exit(0)  # Lewati thread scheduler/server dan mainloop
+
+
+@benchmark("scheduler_memory")
+def bench_scheduler_memory(ctx, runs) -> dict:
+    """Memori yang tertahan per hari simulasi scheduler (byte, diukur tracemalloc)
+
+    Setelah satu hari pemanasan, tiap putaran menjalankan satu hari penuh
+    dengan jam tiruan; catatan pemutaran harness (plays dan riwayat voice
+    NullBackend) dibuang sebelum diukur. Status bel yang sudah tercatat harus berukuran tetap, jadi
+    median idealnya mendekati 0.
+    """
+    import gc
+    import tracemalloc
+    scheduler = ctx.scheduler()
+    clock = scheduler.clock
+
+    def run_day() -> int:
+        end = clock.now() + datetime.timedelta(days=1)
+        ticks = 0
+        while clock.now() < end:
+            clock.wake_at = end
+            scheduler.step()
+            ticks += 1
+        scheduler.audio_player.plays.clear()
+        scheduler.audio_player.backend.voices.clear()
+        return ticks
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        run_day()
+        samples = []
+        ticks = 0
+        for _ in range(runs):
+            gc.collect()
+            before = tracemalloc.get_traced_memory()[0]
+            ticks += run_day()
+            gc.collect()
+            samples.append(tracemalloc.get_traced_memory()[0] - before)
+        tick_peak = None
+        if hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+            clock.wake_at = None
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            scheduler.tick()
+            tick_peak = tracemalloc.get_traced_memory()[1] - current
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+        scheduler.stop()
+    return _stats(samples, unit="byte", noise_floor=MEMORY_NOISE_FLOOR, ticks_per_day=ticks / max(runs, 1),
+                  tick_peak_bytes=tick_peak, state_bytes=scheduler.fire_log._fired.nbytes)
+
+
+@benchmark("db_add_schedule")
+def bench_add_schedule(ctx, runs) -> dict:
+    audio = ctx.tone()
+    slots = iter(range(runs))
+    return _measure(lambda: data_manager.add_schedule("Minggu", f"23:{next(slots) % 60:02d}", audio), runs)
+
+
+@benchmark("db_add_schedule_bulk")
+def bench_add_schedule_bulk(ctx, runs) -> dict:
+    """BULK_SIZE jadwal lewat add_schedule berturut-turut (misal impor jadwal)"""
+    audio = ctx.tone()
+
+    def bulk():
+        for index in range(BULK_SIZE):
+            data_manager.add_schedule(DAYS[index % len(DAYS)], f"22:{index % 60:02d}", audio)
+
+    stats = _measure(bulk, runs)
+    stats["per_item"] = stats["median"] / BULK_SIZE
+    return stats
+
+
+@benchmark("db_add_fire_records")
+def bench_add_fire_records(ctx, runs) -> dict:
+    """FIRE_RECORD_BATCH catatan fire_log dalam satu executemany"""
+    from fire_log import OUTCOME_PLAYED
+    audio = ctx.tone()
+    batches = iter(range(runs))
+    start = datetime.datetime(2020, 1, 1)
+
+    def insert():
+        base = next(batches) * FIRE_RECORD_BATCH
+        records = []
+        for index in range(base, base + FIRE_RECORD_BATCH):
+            moment = (start + datetime.timedelta(minutes=index)).isoformat(sep=" ")
+            records.append((moment, moment, OUTCOME_PLAYED, audio))
+        data_manager.add_fire_records(records)
+
+    stats = _measure(insert, runs)
+    stats["per_item"] = stats["median"] / FIRE_RECORD_BATCH
+    return stats
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(names=None, runs=DEFAULT_RUNS, schedules=DEFAULT_SCHEDULES, database=None,
+              audio_backend=None, progress=None) -> dict:
+    """Jalankan benchmark terpilih; hasil siap disimpan sebagai JSON
+
+    Benchmark yang gagal dicatat dengan "error", yang tidak bisa jalan di
+    mesin ini (misal tanpa display) dengan "skipped".
+    """
+    unknown = [name for name in names or [] if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Benchmark tidak dikenal: {', '.join(unknown)}")
+    results = {}
+    with BenchContext(schedules, database, audio_backend) as ctx:
+        for name, func in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+            try:
+                results[name] = func(ctx, runs)
+            except Exception as e:
+                results[name] = {"error": str(e)}
+            if progress:
+                progress(name, results[name])
+        schedules = ctx.schedule_count
+    return {
+        "meta": {
+            "version": VERSION,
+            "commit": _git_commit(),
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": runs,
+            "schedules": schedules,
+            "database": database,
+        },
+        "results": results,
+    }
+
+
+def run_scaling(sizes, names=None, runs=DEFAULT_RUNS, seed=DEFAULT_SEED, years=SCALING_YEARS,
+                audio_backend=None, progress=None, on_dataset=None) -> dict:
+    """Jalankan benchmark pada dataset sintetis berbagai ukuran (jumlah jadwal)
+
+    Tiap ukuran memakai dataset_generator dengan seed yang sama dan satu
+    file audio per lima jadwal. Hasil "curves" berisi median per benchmark
+    dalam urutan `sizes`, siap diplot.
+    """
+    names = names or SCALING_BENCHMARKS
+    results = {}
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix="bell_dataset_")
+        try:
+            manifest = generate(workdir, seed, schedules=size, audio_files=max(size // 5, len(PROFILES)),
+                                years=years)
+            if on_dataset:
+                on_dataset(size, manifest)
+            results[size] = run_suite(names, runs, database=manifest["database"],
+                                      audio_backend=audio_backend, progress=progress)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": dict(next(iter(results.values()))["meta"], database=None, schedules=None,
+                     seed=seed, years=years) if results else {},
+        "sizes": list(sizes),
+        "curves": {name: [results[size]["results"].get(name, {}).get("median") for size in sizes]
+                   for name in names},
+        "results": {str(size): results[size]["results"] for size in sizes},
+    }
+
+
+def compare(baseline: dict, current: dict, threshold=DEFAULT_THRESHOLD) -> list:
+    """Bandingkan median per benchmark: [(nama, status, baseline_ms, sekarang_ms)]
+
+    Status: "regresi", "lebih_cepat", "sama", "baru", "hilang" atau "gagal".
+    """
+    rows = []
+    base_results = baseline.get("results", {})
+    results = current.get("results", {})
+    for name in list(base_results) + [n for n in results if n not in base_results]:
+        before = base_results.get(name, {}).get("median")
+        after = results.get(name, {}).get("median")
+        noise_floor = results.get(name, {}).get("noise_floor", NOISE_FLOOR_MS)
+        if name not in results:
+            status = "hilang"
+        elif "error" in results[name]:
+            status = "gagal"
+        elif before is None or after is None:
+            status = "baru" if name not in base_results else "sama"
+        elif after > before * (1 + threshold) and after - before > noise_floor:
+            status = "regresi"
+        elif after < before / (1 + threshold) and before - after > noise_floor:
+            status = "lebih_cepat"
+        else:
+            status = "sama"
+        rows.append((name, status, before, after))
+    return rows
+
+
+def _format_ms(value) -> str:
+    return "-" if value is None else f"{value:.3f}"
+
+
+def format_result(name, stats) -> str:
+    if "error" in stats:
+        return f"{name:26s} GAGAL: {stats['error']}"
+    if "skipped" in stats:
+        return f"{name:26s} dilewati: {stats['skipped']}"
+    extra = ""
+    if "mb_per_s" in stats:
+        extra = f" ({stats['mb_per_s']:.0f} MB/s)"
+    if "state_bytes" in stats:
+        extra = f" (status bel {stats['state_bytes']} byte)"
+    return (f"{name:26s} median={_format_ms(stats.get('median'))} p95={_format_ms(stats.get('p95'))} "
+            f"min={_format_ms(stats.get('min'))} {stats.get('unit', 'ms')}{extra}")
+
+
+def _pop_option(args, name, default=None):
+    if name not in args:
+        return default
+    index = args.index(name)
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
+
+def run_cli(argv) -> int:
+    """python benchmark.py [--out hasil.json] [--runs N] [--schedules N] [--db path]
+                           [--only a,b] [--audio-backend null] [--compare baseline.json [--threshold 0.2]]
+       python benchmark.py --scale 500,1000,5000 [--seed N] [--years N] [--only a,b] [--out kurva.json]
+
+    Dengan --compare hasil dibandingkan ke baseline; kode keluar 1 jika ada regresi.
+    Dengan --scale suite dijalankan pada dataset sintetis tiap ukuran (kurva skala).
+    `python benchmark.py --compare baseline.json hasil.json` membandingkan dua file tanpa menjalankan suite.
+    """
+    args = list(argv)
+    if args[:1] == ["--startup-probe"]:
+        _startup_probe(args[1])
+        return 0
+    out = _pop_option(args, "--out")
+    runs = int(_pop_option(args, "--runs", DEFAULT_RUNS))
+    schedules = int(_pop_option(args, "--schedules", DEFAULT_SCHEDULES))
+    database = _pop_option(args, "--db")
+    only = _pop_option(args, "--only")
+    audio_backend = _pop_option(args, "--audio-backend")
+    baseline_path = _pop_option(args, "--compare")
+    threshold = float(_pop_option(args, "--threshold", DEFAULT_THRESHOLD))
+    scale = _pop_option(args, "--scale")
+    seed = int(_pop_option(args, "--seed", DEFAULT_SEED))
+    years = int(_pop_option(args, "--years", SCALING_YEARS))
+
+    import logging
+    logging.getLogger("bell_sekolah").setLevel(logging.WARNING)
+    if scale:
+        sizes = [int(size) for size in scale.split(",")]
+        curves = run_scaling(sizes, only.split(",") if only else None, runs, seed, years, audio_backend,
+                             progress=lambda name, stats: print(format_result(name, stats)),
+                             on_dataset=lambda size, manifest: print(
+                                 f"\n== {size} jadwal, {manifest['audio_files']} audio, "
+                                 f"{manifest['fire_records']} riwayat bel =="))
+        print(f"\n{'median (ms)':26s}" + "".join(f"{size:>12d}" for size in sizes))
+        for name, values in curves["curves"].items():
+            print(f"{name:26s}" + "".join(f"{_format_ms(value):>12s}" for value in values))
+        if out:
+            with open(out, "w", encoding="utf-8") as f:
+                json.dump(curves, f, ensure_ascii=False, indent=2)
+            print(f"Kurva disimpan ke {out}")
+        return 0
+    if baseline_path and args:
+        with open(args[0], encoding="utf-8") as f:
+            current = json.load(f)
+    else:
+        current = run_suite(only.split(",") if only else None, runs, schedules, database, audio_backend,
+                            progress=lambda name, stats: print(format_result(name, stats)))
+        if out:
+            with open(out, "w", encoding="utf-8") as f:
+                json.dump(current, f, ensure_ascii=False, indent=2)
+            print(f"Hasil disimpan ke {out}")
+    if not baseline_path:
+        return 0
+
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if only:
+        for data in (baseline, current):
+            data["results"] = {name: stats for name, stats in data.get("results", {}).items()
+                               if name in only.split(",")}
+    rows = compare(baseline, current, threshold)
+    print(f"\nDibandingkan dengan {baseline_path} (commit {baseline['meta'].get('commit')}, "
+          f"ambang {threshold:.0%}):")
+    for name, status, before, after in rows:
+        change = f"{(after / before - 1):+.1%}" if before and after else ""
+        unit = current.get("results", {}).get(name, {}).get("unit", "ms")
+        print(f"{name:26s} {_format_ms(before):>10s} -> {_format_ms(after):>10s} {unit:4s} {change:>8s}  "
+              f"{status.upper()}")
+    regressions = [row for row in rows if row[1] == "regresi"]
+    print(f"{len(regressions)} regresi" if regressions else "Tidak ada regresi")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(sys.argv[1:]))
@@ -0,0 +1,204 @@
+# chime.py
+import hashlib
+import json
+import os
+import re
+import threading
+import wave
+from constants import CHIME_CACHE_DIR, MIXER_FREQUENCY, MIXER_CHANNELS
+from logger import log_error, log_info
+
+try:
+    import numpy as np
+except ImportError:  # Chime tidak bisa dirender tanpa numpy
+    np = None
+
+# Awalan audio_path untuk chime sintetis, mis. "chime://Ding Dong"
+CHIME_PREFIX = "chime://"
+
+# Harmonik bel: (kelipatan frekuensi, amplitudo relatif, faktor peluruhan)
+PARTIALS = ((1.0, 1.0, 1.0), (2.0, 0.5, 1.6), (3.0, 0.25, 2.4), (4.2, 0.12, 3.5))
+
+_NOTE_OFFSETS = {"C": -9, "D": -7, "E": -5, "F": -4, "G": -2, "A": 0, "B": 2}
+_NOTE_PATTERN = re.compile(r"^([A-Ga-g])([#b]?)(-?\d)$")
+
+
+def is_chime_path(path: str) -> bool:
+    """True jika audio_path menunjuk chime sintetis"""
+    return bool(path) and path.startswith(CHIME_PREFIX)
+
+
+def chime_path(name: str) -> str:
+    return CHIME_PREFIX + name
+
+
+def note_frequency(token: str) -> float:
+    """Frekuensi (Hz) dari nama nada ("A4", "C#5", "Eb4") atau angka Hz"""
+    match = _NOTE_PATTERN.match(token)
+    if match is None:
+        frequency = float(token)
+        if frequency <= 0:
+            raise ValueError(f"Frekuensi harus positif: {token}")
+        return frequency
+    letter, accidental, octave = match.groups()
+    semitones = _NOTE_OFFSETS[letter.upper()] + (int(octave) - 4) * 12
+    semitones += {"#": 1, "b": -1}.get(accidental, 0)
+    return 440.0 * 2 ** (semitones / 12)
+
+
+def parse_notes(text: str) -> list:
+    """Urai "E5:600 C5:900 -:200" menjadi [(frekuensi atau None, durasi_ms)]"""
+    notes = []
+    for token in text.replace(",", " ").split():
+        pitch, _, duration = token.partition(":")
+        if not duration:
+            raise ValueError(f"Format nada harus NADA:DURASI_MS, bukan {token}")
+        duration_ms = int(duration)
+        if duration_ms <= 0:
+            raise ValueError(f"Durasi nada harus positif: {token}")
+        notes.append((None if pitch == "-" else note_frequency(pitch), duration_ms))
+    if not notes:
+        raise ValueError("Chime harus punya minimal satu nada")
+    return notes
+
+
+class Chime:
+    """Definisi chime: urutan nada, envelope dan pengulangan"""
+    __slots__ = ("id", "name", "notes", "attack_ms", "decay_ms", "repeats", "gap_ms", "volume")
+
+    def __init__(self, id, name, notes, attack_ms=5, decay_ms=400, repeats=1, gap_ms=500, volume=0.8):
+        self.id = id
+        self.name = name
+        self.notes = notes
+        self.attack_ms = attack_ms
+        self.decay_ms = decay_ms
+        self.repeats = repeats
+        self.gap_ms = gap_ms
+        self.volume = volume
+
+    @classmethod
+    def from_row(cls, row):
+        """Buat chime dari baris tabel chimes"""
+        return cls(*row)
+
+    def validate(self) -> None:
+        """Lempar ValueError jika chime tidak valid"""
+        if not self.name or not self.name.strip():
+            raise ValueError("Nama chime tidak boleh kosong")
+        parse_notes(self.notes)
+        if self.attack_ms < 0 or self.decay_ms <= 0:
+            raise ValueError("Attack tidak boleh negatif dan decay harus positif")
+        if not 1 <= self.repeats <= 10:
+            raise ValueError("Pengulangan harus 1-10 kali")
+        if self.gap_ms < 0:
+            raise ValueError("Jeda tidak boleh negatif")
+        if not 0 < self.volume <= 1:
+            raise ValueError("Volume harus di antara 0 dan 1")
+
+    def param_hash(self) -> str:
+        """Hash parameter render; nama dan id tidak ikut"""
+        params = [parse_notes(self.notes), self.attack_ms, self.decay_ms, self.repeats,
+                  self.gap_ms, self.volume, MIXER_FREQUENCY, MIXER_CHANNELS]
+        return hashlib.sha256(json.dumps(params).encode("utf-8")).hexdigest()[:24]
+
+    def render(self, rate: int = MIXER_FREQUENCY):
+        """PCM int16 berbentuk (frame, kanal) hasil sintesis"""
+        if np is None:
+            raise RuntimeError("numpy dibutuhkan untuk merender chime")
+        attack = max(self.attack_ms / 1000, 1 / rate)
+        decay = self.decay_ms / 1000
+        pieces = []
+        for frequency, duration_ms in parse_notes(self.notes):
+            frames = int(rate * duration_ms / 1000)
+            if frequency is None:
+                pieces.append(np.zeros(frames, dtype=np.float32))
+                continue
+            t = np.arange(frames, dtype=np.float32) / rate
+            wave_sum = np.zeros(frames, dtype=np.float32)
+            for ratio, amplitude, damping in PARTIALS:
+                if frequency * ratio >= rate / 2:
+                    continue  # Di atas Nyquist
+                wave_sum += amplitude * np.exp(-t * damping / decay) * np.sin(2 * np.pi * frequency * ratio * t)
+            envelope = np.minimum(t / attack, 1.0)
+            # Ekor 5 ms agar nada tidak berakhir dengan klik
+            tail = min(frames, int(rate * 0.005))
+            if tail:
+                envelope[-tail:] *= np.linspace(1.0, 0.0, tail)
+            pieces.append(wave_sum * envelope)
+        sequence = np.concatenate(pieces)
+        gap = np.zeros(int(rate * self.gap_ms / 1000), dtype=np.float32)
+        signal = np.concatenate([sequence] + [np.concatenate([gap, sequence])
+                                              for _ in range(self.repeats - 1)])
+        peak = float(np.max(np.abs(signal))) or 1.0
+        pcm = (signal / peak * self.volume * 32767).astype("<i2")
+        return np.repeat(pcm[:, None], MIXER_CHANNELS, axis=1)
+
+
+class ChimeLibrary:
+    """Render chime dari database ke WAV berformat mixer, di-cache per hash parameter
+
+    WAV hasil render disimpan di cache/chime dan diputar seperti file biasa
+    (di-mmap lewat cache PCM), jadi tidak ada decode dan chime tetap bisa
+    diputar walau folder audio/ rusak.
+    """
+
+    def __init__(self, cache_dir=CHIME_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+
+    def render_to_file(self, chime: Chime) -> str:
+        """Path WAV untuk chime; dirender hanya jika belum ada di cache"""
+        path = os.path.join(self.cache_dir, f"{chime.param_hash()}.wav")
+        with self._lock:
+            if os.path.exists(path):
+                return path
+            pcm = chime.render()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = path + ".tmp"
+            with wave.open(tmp, "wb") as wav:
+                wav.setnchannels(MIXER_CHANNELS)
+                wav.setsampwidth(2)
+                wav.setframerate(MIXER_FREQUENCY)
+                wav.writeframes(pcm.tobytes())
+            os.replace(tmp, path)
+        log_info(f"Chime {chime.name} dirender ({len(pcm) / MIXER_FREQUENCY:.1f} detik)")
+        return path
+
+    def resolve(self, path: str):
+        """WAV hasil render untuk "chime://nama", None jika chime tidak ada"""
+        from data_manager import data_manager
+        name = path[len(CHIME_PREFIX):]
+        chime = data_manager.get_chime(name)
+        if chime is None:
+            log_error(f"Chime tidak ditemukan: {name}")
+            return None
+        try:
+            return self.render_to_file(chime)
+        except Exception as e:
+            log_error(f"Gagal merender chime {name}: {e}")
+            return None
+
+    def prune(self, chimes) -> int:
+        """Hapus render lama yang tidak lagi dipakai chime mana pun"""
+        keep = {f"{chime.param_hash()}.wav" for chime in chimes}
+        removed = 0
+        if not os.path.isdir(self.cache_dir):
+            return removed
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".wav") and name not in keep:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+def duration_ms(chime: Chime) -> int:
+    """Durasi total chime (ms) tanpa merender"""
+    sequence = sum(duration for _, duration in parse_notes(chime.notes))
+    return sequence * chime.repeats + chime.gap_ms * (chime.repeats - 1)
+
+
+# Instance global
+chime_library = ChimeLibrary()
@@ -0,0 +1,101 @@
+# clock.py
+import datetime
+import time
+from clock_sync import clock_sync
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _boot_time():
+    """Jam monotonic yang tetap berjalan saat suspend (Linux), None jika tidak ada"""
+    clock_id = getattr(time, "CLOCK_BOOTTIME", None)
+    if clock_id is None:
+        return None
+    try:
+        return time.clock_gettime(clock_id)
+    except OSError:
+        return None
+
+
+class SystemClock:
+    """Jam sungguhan untuk scheduler
+
+    now() memakai jam terkoreksi clock_sync; time(), monotonic() dan
+    boot_time() adalah jam mentah sistem yang dibandingkan ClockMonitor.
+    """
+    realtime = True
+
+    def now(self) -> datetime.datetime:
+        return clock_sync.now()
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def boot_time(self):
+        return _boot_time()
+
+    def utc_offset(self) -> int:
+        return time.localtime().tm_gmtoff
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+
+class SimulatedClock:
+    """Jam tiruan: waktu hanya maju lewat sleep(), tanpa menunggu sungguhan
+
+    Anomali jam bisa disuntikkan untuk menguji scheduler:
+    - jump(): jam dinding diubah (NTP, ubah manual), monotonic tetap.
+    - suspend(): jam dinding dan jam boot maju, monotonic tetap (Linux).
+    - set_utc_offset(): transisi DST/zona waktu, jam lokal ikut bergeser.
+    """
+    realtime = False
+
+    def __init__(self, start: datetime.datetime, utc_offset: int = 0):
+        self._offset = utc_offset
+        self._utc = (start - EPOCH).total_seconds() - utc_offset
+        self._mono = 0.0
+        self._boot = 0.0
+        # sleep() berhenti paling lambat di waktu lokal ini, agar harness bisa
+        # menyisipkan kejadian (ubah jadwal, lompatan jam) tepat waktunya
+        self.wake_at = None
+
+    def now(self) -> datetime.datetime:
+        return EPOCH + datetime.timedelta(seconds=self._utc + self._offset)
+
+    def time(self) -> float:
+        return self._utc
+
+    def monotonic(self) -> float:
+        return self._mono
+
+    def boot_time(self) -> float:
+        return self._boot
+
+    def utc_offset(self) -> int:
+        return self._offset
+
+    def sleep(self, seconds: float) -> None:
+        if self.wake_at is not None:
+            seconds = min(seconds, (self.wake_at - self.now()).total_seconds())
+        seconds = max(0.0, seconds)
+        self._utc += seconds
+        self._mono += seconds
+        self._boot += seconds
+
+    def jump(self, seconds: float) -> None:
+        self._utc += seconds
+
+    def suspend(self, seconds: float) -> None:
+        self._utc += seconds
+        self._boot += seconds
+
+    def set_utc_offset(self, offset: int) -> None:
+        self._offset = offset
+
+
+# Instance global
+system_clock = SystemClock()
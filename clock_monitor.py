@@ -0,0 +1,83 @@
+# clock_monitor.py
+from clock import system_clock
+from constants import CLOCK_JUMP_THRESHOLD, SUSPEND_THRESHOLD
+
+# Jenis anomali jam
+EVENT_JUMP_FORWARD = "lompat_maju"
+EVENT_JUMP_BACKWARD = "lompat_mundur"
+EVENT_SUSPEND = "suspend"
+EVENT_UTC_OFFSET = "zona_waktu"
+
+
+class ClockEvent:
+    """Anomali jam yang terdeteksi di antara dua tick"""
+    __slots__ = ("kind", "magnitude")
+
+    def __init__(self, kind, magnitude):
+        self.kind = kind
+        self.magnitude = magnitude  # detik, bertanda
+
+    def describe(self) -> str:
+        """Pesan log yang memuat besar anomali"""
+        labels = {
+            EVENT_JUMP_FORWARD: "Jam sistem melompat maju",
+            EVENT_JUMP_BACKWARD: "Jam sistem melompat mundur",
+            EVENT_SUSPEND: "Sistem suspend/resume",
+            EVENT_UTC_OFFSET: "Offset zona waktu (DST) berubah",
+        }
+        return f"{labels[self.kind]}: {self.magnitude:+.1f} detik"
+
+
+class ClockMonitor:
+    """Bandingkan jam dinding dengan jam monotonic setiap tick
+
+    - Selisih jam dinding vs monotonic di atas ambang = lompatan jam
+      (NTP, ubah manual), kecuali jam boot ikut maju = suspend.
+    - Monotonic yang maju jauh melebihi waktu tidur yang diminta juga
+      dianggap suspend (Windows: monotonic ikut berjalan saat sleep).
+    - Perubahan offset UTC lokal = transisi DST/zona waktu.
+    """
+
+    def __init__(self, jump_threshold=CLOCK_JUMP_THRESHOLD, suspend_threshold=SUSPEND_THRESHOLD, clock=None):
+        self.clock = clock or system_clock
+        self.jump_threshold = jump_threshold
+        self.suspend_threshold = suspend_threshold
+        self.drift = 0.0  # Akumulasi selisih kecil jam dinding vs monotonic
+        self.events = 0
+        self._last = None
+
+    def _sample(self):
+        clock = self.clock
+        return clock.time(), clock.monotonic(), clock.boot_time(), clock.utc_offset()
+
+    def tick(self, expected_elapsed=None):
+        """Ambil sampel jam; kembalikan ClockEvent jika ada anomali"""
+        sample = self._sample()
+        last, self._last = self._last, sample
+        if last is None:
+            return None
+
+        wall, mono, boot, offset = sample
+        last_wall, last_mono, last_boot, last_offset = last
+        wall_delta = wall - last_wall
+        mono_delta = mono - last_mono
+        drift = wall_delta - mono_delta
+
+        event = None
+        if offset != last_offset:
+            event = ClockEvent(EVENT_UTC_OFFSET, offset - last_offset)
+        elif abs(drift) > self.jump_threshold:
+            if boot is not None and last_boot is not None and \
+               abs(wall_delta - (boot - last_boot)) <= self.jump_threshold:
+                event = ClockEvent(EVENT_SUSPEND, (boot - last_boot) - mono_delta)
+            else:
+                kind = EVENT_JUMP_FORWARD if drift > 0 else EVENT_JUMP_BACKWARD
+                event = ClockEvent(kind, drift)
+        else:
+            self.drift += drift
+            if expected_elapsed is not None and mono_delta - expected_elapsed > self.suspend_threshold:
+                event = ClockEvent(EVENT_SUSPEND, mono_delta - expected_elapsed)
+
+        if event is not None:
+            self.events += 1
+        return event
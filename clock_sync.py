@@ -0,0 +1,206 @@
+# clock_sync.py
+import datetime
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from constants import (
+    CLOCK_SYNC_PORT, CLOCK_SYNC_INTERVAL, CLOCK_SYNC_SAMPLES,
+    CLOCK_SYNC_TIMEOUT, CLOCK_SYNC_STEP
+)
+from logger import log_error, log_info, log_warning
+from metrics import registry
+
+# Paket probe dan balasan berukuran sama agar server tidak bisa dipakai
+# untuk amplifikasi: magic, versi, t1 (kirim klien), t2 (terima server),
+# t3 (kirim server). Probe mengisi t2/t3 dengan 0.
+_PACKET = struct.Struct("!4sB3xddd")
+MAGIC = b"BELS"
+VERSION = 1
+
+_offset_gauge = registry.gauge("clock_sync_offset_seconds", "Koreksi jam lokal terhadap PC referensi")
+_jitter_gauge = registry.gauge("clock_sync_jitter_seconds", "Sebaran offset antar putaran pengukuran")
+_delay_gauge = registry.gauge("clock_sync_delay_seconds", "RTT probe terpilih ke PC referensi")
+_probes = {}
+
+
+def _count(result) -> None:
+    counter = _probes.get(result)
+    if counter is None:
+        counter = _probes[result] = registry.counter(
+            "clock_sync_probes_total", "Probe sinkronisasi jam menurut hasil", {"result": result})
+    counter.inc()
+
+
+def parse_address(value, default_port=CLOCK_SYNC_PORT) -> tuple:
+    """Ubah "host" atau "host:port" menjadi (host, port)"""
+    host, _, port = value.strip().rpartition(":")
+    if not host or not port.isdigit():
+        return value.strip(), default_port
+    return host, int(port)
+
+
+class ClockSyncServer:
+    """PC referensi: jawab probe dengan cap waktu terima dan kirim"""
+
+    def __init__(self, host="0.0.0.0", port=CLOCK_SYNC_PORT, clock=time.time):
+        self.host = host
+        self.port = port
+        self.clock = clock
+        self.sock = None
+        self.thread = None
+        self._stop = threading.Event()
+
+    def start(self) -> bool:
+        """Buka socket UDP dan layani probe di thread daemon"""
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind((self.host, self.port))
+            self.sock.settimeout(1.0)
+            self.port = self.sock.getsockname()[1]
+        except OSError as e:
+            log_error(f"Gagal membuka server sinkronisasi jam: {e}")
+            self.sock = None
+            return False
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+        log_info(f"Referensi jam aktif di UDP {self.host}:{self.port}")
+        return True
+
+    def _serve(self) -> None:
+        while not self._stop.is_set():
+            try:
+                data, address = self.sock.recvfrom(64)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            received = self.clock()
+            if len(data) != _PACKET.size:
+                continue
+            magic, version, sent, _, _ = _PACKET.unpack(data)
+            if magic != MAGIC or version != VERSION:
+                continue
+            try:
+                self.sock.sendto(_PACKET.pack(MAGIC, VERSION, sent, received, self.clock()), address)
+            except OSError:
+                pass
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class ClockSync:
+    """Jam terkoreksi: jam lokal ditambah offset terhadap PC referensi
+
+    Tiap putaran mengirim beberapa probe dan memakai sampel dengan RTT
+    terkecil, karena sampel itulah yang paling sedikit terganggu antrian
+    jaringan. Dari beberapa putaran terakhir dipilih lagi RTT terkecil,
+    lalu offset dihaluskan agar jadwal tidak tersentak oleh noise. Selisih
+    di atas CLOCK_SYNC_STEP (misal saat pertama kali sinkron) langsung
+    diloncati. Tanpa referensi offset tetap 0 dan now() sama dengan jam lokal.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.offset = 0.0
+        self.jitter = 0.0
+        self.delay = None
+        self.reference = None
+        self.thread = None
+        self._history = deque(maxlen=CLOCK_SYNC_SAMPLES)  # (offset, delay) per putaran
+        self._stop = threading.Event()
+
+    def now(self) -> datetime.datetime:
+        """Waktu lokal naif menurut jam referensi"""
+        return datetime.datetime.fromtimestamp(self.clock() + self.offset)
+
+    def start(self, reference, interval=CLOCK_SYNC_INTERVAL) -> None:
+        """Ukur offset terhadap `reference` ("host:port") secara berkala"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.reference = parse_address(reference)
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._loop, args=(interval,), daemon=True)
+        self.thread.start()
+        log_info(f"Jam diselaraskan ke {self.reference[0]}:{self.reference[1]}")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self, interval) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+            except Exception as e:
+                log_warning(f"Sinkronisasi jam gagal: {e}")
+            self._stop.wait(interval)
+
+    def _probe(self, sock) -> tuple:
+        """(offset, delay) satu probe; None jika tidak dibalas"""
+        sent = self.clock()
+        start = time.perf_counter()
+        sock.sendto(_PACKET.pack(MAGIC, VERSION, sent, 0.0, 0.0), self.reference)
+        deadline = start + CLOCK_SYNC_TIMEOUT
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            sock.settimeout(remaining)
+            try:
+                data = sock.recv(64)
+            except socket.timeout:
+                return None
+            # t4 dari perf_counter agar RTT tidak terpengaruh lompatan jam dinding
+            elapsed = time.perf_counter() - start
+            if len(data) != _PACKET.size:
+                continue
+            magic, version, echo, received, replied = _PACKET.unpack(data)
+            if magic != MAGIC or echo != sent:
+                continue  # Balasan probe sebelumnya yang terlambat
+            arrived = sent + elapsed
+            offset = ((received - sent) + (replied - arrived)) / 2
+            delay = elapsed - (replied - received)
+            return offset, max(delay, 0.0)
+
+    def sync_once(self, samples=CLOCK_SYNC_SAMPLES) -> bool:
+        """Satu putaran pengukuran; False jika tidak ada probe yang dibalas"""
+        results = []
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for _ in range(samples):
+                result = self._probe(sock)
+                _count("ok" if result else "timeout")
+                if result:
+                    results.append(result)
+        if not results:
+            log_warning(f"Referensi jam {self.reference[0]}:{self.reference[1]} tidak menjawab")
+            return False
+        self.update(min(results, key=lambda r: r[1]))
+        return True
+
+    def update(self, sample) -> None:
+        """Masukkan hasil satu putaran (offset, delay) ke filter"""
+        if abs(sample[0] - self.offset) > CLOCK_SYNC_STEP:
+            self._history.clear()  # Jam lokal atau referensi diubah, sampel lama tidak berlaku
+        self._history.append(sample)
+        offset, delay = min(self._history, key=lambda r: r[1])
+        if len(self._history) > 1:
+            self.jitter = (sum((o - offset) ** 2 for o, _ in self._history) / (len(self._history) - 1)) ** 0.5
+        if self.delay is None or abs(offset - self.offset) > CLOCK_SYNC_STEP:
+            log_info(f"Offset jam diloncati {self.offset:+.3f} -> {offset:+.3f} detik")
+            self.offset = offset
+        else:
+            self.offset += (offset - self.offset) / 4
+        self.delay = delay
+        _offset_gauge.set(self.offset)
+        _jitter_gauge.set(self.jitter)
+        _delay_gauge.set(delay)
+
+
+# Instance global
+clock_sync = ClockSync()
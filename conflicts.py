@@ -0,0 +1,160 @@
+# conflicts.py
+import heapq
+import os
+import sys
+from constants import DAYS, MIXER_MAX_STREAMS, NEAR_COLLISION_SECONDS
+from audio_backend import estimate_duration, known_durations
+from chime import is_chime_path, duration_ms, CHIME_PREFIX
+from recurrence import parse_minutes
+
+# Jenis temuan; "tumpang" dan "hilang" membuat cek CLI gagal
+KIND_OVERLAP = "tumpang"
+KIND_NEAR = "berdekatan"
+KIND_DUPLICATE = "ganda"
+KIND_MISSING = "hilang"
+ERROR_KINDS = (KIND_OVERLAP, KIND_MISSING)
+
+
+class BellSlot:
+    """Satu bel di timeline mingguan beserta perkiraan durasinya"""
+    __slots__ = ("day", "time", "path", "source", "start", "end")
+
+    def __init__(self, day, time, path, source, start, duration):
+        self.day = day
+        self.time = time
+        self.path = path
+        self.source = source  # "jadwal" atau "berulang (<jenis>)"
+        self.start = start    # detik sejak tengah malam
+        self.end = start + (duration or 0.0)
+
+
+class Conflict:
+    """Satu temuan analisis; `other` adalah bel pembanding (jika ada)"""
+    __slots__ = ("kind", "slot", "other", "detail")
+
+    def __init__(self, kind, slot, other=None, detail=""):
+        self.kind = kind
+        self.slot = slot
+        self.other = other
+        self.detail = detail
+
+    @property
+    def is_error(self) -> bool:
+        return self.kind in ERROR_KINDS
+
+    def describe(self) -> str:
+        text = f"{self.slot.day} {self.slot.time} {os.path.basename(self.slot.path)}"
+        if self.other is not None:
+            text += f" <-> {self.other.time} {os.path.basename(self.other.path)}"
+        return f"[{self.kind}] {text}: {self.detail}"
+
+
+class ConflictAnalyzer:
+    """Gabungkan timeline mingguan dengan durasi audio lalu cari konflik
+
+    Durasi diambil tanpa decode (metadata loudness, header WAV, parameter
+    chime, atau perkiraan ukuran file), lalu satu sweep-line per hari
+    menemukan bel yang masih berbunyi saat bel berikutnya mulai. Total
+    biaya O(n log n) untuk n bel seminggu.
+    """
+
+    def __init__(self, data_manager, near_seconds=NEAR_COLLISION_SECONDS, max_streams=MIXER_MAX_STREAMS):
+        self.data_manager = data_manager
+        self.near_seconds = near_seconds
+        self.max_streams = max_streams
+
+    def timeline(self) -> tuple:
+        """(slot per hari, temuan file hilang/jadwal ganda) dari jadwal dan aturan berulang
+
+        Aturan mingguan/bulanan ikut dihitung karena pada minggu tertentu
+        aturan tersebut benar-benar berbunyi bersama jadwal biasa.
+        """
+        durations = known_durations()
+        chimes = {chime.name: chime for chime in self.data_manager.get_chimes()}
+        lengths = {}
+        issues = []
+
+        def duration_for(path):
+            if path not in lengths:
+                if is_chime_path(path):
+                    chime = chimes.get(path[len(CHIME_PREFIX):])
+                    lengths[path] = duration_ms(chime) / 1000 if chime else None
+                elif os.path.exists(path):
+                    lengths[path] = estimate_duration(path, durations)
+                else:
+                    lengths[path] = None
+            return lengths[path]
+
+        entries = {day: [] for day in DAYS}
+        for day, schedules in self.data_manager.get_schedules().items():
+            for schedule_time, path in schedules:
+                entries.setdefault(day, []).append((schedule_time, path, "jadwal"))
+        for rule in self.data_manager.get_recurrence_rules():
+            for schedule_time in rule.iter_times():
+                entries[rule.day].append((schedule_time, rule.audio_path, f"berulang ({rule.kind})"))
+
+        timeline = {}
+        for day, day_entries in entries.items():
+            slots = []
+            seen = {}
+            for schedule_time, path, source in day_entries:
+                duration = duration_for(path)
+                slot = BellSlot(day, schedule_time, path, source, parse_minutes(schedule_time) * 60, duration)
+                if duration is None:
+                    issues.append(Conflict(KIND_MISSING, slot, detail="file audio atau chime tidak ditemukan"))
+                first = seen.setdefault(schedule_time, slot)
+                if first is not slot:
+                    # Scheduler hanya memutar satu audio per jam, sisanya diabaikan
+                    issues.append(Conflict(KIND_DUPLICATE, slot, first, "jam sama, hanya satu yang diputar"))
+                    continue
+                slots.append(slot)
+            timeline[day] = slots
+        return timeline, issues
+
+    def sweep(self, slots) -> list:
+        """Sweep-line satu hari: tumpang tindih dan jeda terlalu dekat"""
+        issues = []
+        active = []    # min-heap akhir bel yang masih berbunyi
+        latest = None  # bel sebelumnya yang selesai paling akhir
+        for slot in sorted(slots, key=lambda s: s.start):
+            while active and active[0] <= slot.start:
+                heapq.heappop(active)
+            if latest is not None:
+                if latest.end > slot.start:
+                    overlap = latest.end - slot.start
+                    detail = f"bel sebelumnya masih berbunyi {overlap:.0f} detik"
+                    if len(active) + 1 > self.max_streams:
+                        detail += f", {len(active) + 1} stream melebihi batas mixer {self.max_streams}"
+                    issues.append(Conflict(KIND_OVERLAP, slot, latest, detail))
+                elif slot.start - latest.end < self.near_seconds:
+                    gap = slot.start - latest.end
+                    issues.append(Conflict(KIND_NEAR, slot, latest, f"jeda hanya {gap:.0f} detik"))
+            heapq.heappush(active, slot.end)
+            if latest is None or slot.end > latest.end:
+                latest = slot
+        return issues
+
+    def analyze(self) -> list:
+        """Semua temuan, diurutkan per hari lalu jam"""
+        timeline, issues = self.timeline()
+        for slots in timeline.values():
+            issues.extend(self.sweep(slots))
+        day_order = {day: index for index, day in enumerate(DAYS)}
+        issues.sort(key=lambda c: (day_order.get(c.slot.day, len(DAYS)), c.slot.start, c.kind))
+        return issues
+
+
+def check(data_manager=None) -> int:
+    """Cetak laporan konflik; kode keluar 1 jika ada tumpang tindih atau file hilang"""
+    if data_manager is None:
+        from data_manager import data_manager
+    issues = ConflictAnalyzer(data_manager).analyze()
+    for issue in issues:
+        print(issue.describe())
+    errors = sum(1 for issue in issues if issue.is_error)
+    print(f"{len(issues)} temuan, {errors} error")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(check())
@@ -7,10 +7,15 @@ ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 AUDIO_DIR = os.path.join(BASE_DIR, "audio")
 DEFAULT_AUDIO_DIR = os.path.join(BASE_DIR, "audio", "default")
 LOGS_DIR = BASE_DIR
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+PCM_CACHE_DIR = os.path.join(CACHE_DIR, "pcm")
+CHIME_CACHE_DIR = os.path.join(CACHE_DIR, "chime")
+ORIGINAL_AUDIO_DIR = os.path.join(AUDIO_DIR, "asli")
 
 # File
 DB_NAME = os.path.join(BASE_DIR, "bell_sekolah.db")
 LOG_FILE = os.path.join(BASE_DIR, "bell_sekolah.log")
+LOCK_FILE = os.path.join(BASE_DIR, "bell_sekolah.lock")  # Kunci satu instance per PC
 
 # Icon
 BELL_ICON = "logo.ico"
@@ -18,12 +23,108 @@ BELL_ICON = "logo.ico"
 # Audio
 AUDIO_FORMATS = ['.mp3', '.wav', '.ogg', '.flac']
 
+# Mixer pygame
+MIXER_FREQUENCY = 22050
+MIXER_SIZE = -16
+MIXER_CHANNELS = 2
+MIXER_BUFFER = 512
+
+# Mixing beberapa stream: "antri" = tunggu giliran, "campur" = diputar bersamaan
+# dengan ducking, "potong" = stream lama di-fade out
+MIXER_MAX_STREAMS = 8
+OVERLAP_POLICIES = ["antri", "campur", "potong"]
+DEFAULT_OVERLAP_POLICY = "campur"
+DEFAULT_FADE_IN_MS = 0
+DEFAULT_FADE_OUT_MS = 300
+DEFAULT_DUCK_DB = -12.0
+DUCK_RAMP_MS = 200
+
+# Cache PCM hasil decode
+PCM_CACHE_MAX_MB = 512
+
+# Upload audio di-transcode ke WAV berformat mixer; file asli disimpan di audio/asli
+INGEST_KEEP_ORIGINAL = False
+
+# Chime bawaan: (nama, nada NADA:DURASI_MS, attack_ms, decay_ms, ulang, jeda_ms, volume)
+DEFAULT_CHIMES = [
+    ("Ding Dong", "E5:700 C5:1100", 5, 500, 1, 400, 0.8),
+    ("Westminster", "E5:500 C5:500 D5:500 G4:900 -:300 G4:500 D5:500 E5:500 C5:1100", 5, 450, 1, 0, 0.8),
+    ("Tiga Nada", "C5:350 E5:350 G5:800", 5, 350, 2, 600, 0.8),
+]
+
+# Normalisasi loudness
+LOUDNESS_TARGET_LUFS = -16.0
+LOUDNESS_PEAK_CEILING_DB = -1.0
+
 # Jadwal
 DAYS = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
 
+# Analisis konflik: bel yang mulai kurang dari sekian detik setelah bel
+# sebelumnya selesai dilaporkan sebagai "berdekatan"
+NEAR_COLLISION_SECONDS = 10
+
+# Kalender pengecualian: "libur" = tanpa bel, "khusus" = pakai jadwal hari lain
+EXCEPTION_KINDS = ["libur", "khusus"]
+
 # Waktu
 SCHEDULE_CHECK_INTERVAL = 30  # detik
 
+# Riwayat bel & susulan setelah restart/resume
+# "lewati" = catat sebagai terlewat, "jendela" = bunyikan yang terakhir jika
+# masih dalam CATCHUP_WINDOW detik, "terakhir" = selalu bunyikan yang terakhir
+CATCHUP_POLICIES = ["lewati", "jendela", "terakhir"]
+DEFAULT_CATCHUP_POLICY = "jendela"
+DEFAULT_CATCHUP_WINDOW = 120  # detik
+CATCHUP_MAX_DAYS = 7  # batas mundur pencarian bel terlewat
+FIRE_LOG_BATCH_SIZE = 20
+FIRE_WINDOW_DAYS = CATCHUP_MAX_DAYS + 2  # jendela bitset bel yang sudah tercatat
+
+# Deteksi lompatan jam & suspend
+CLOCK_JUMP_THRESHOLD = 2.0  # detik selisih jam dinding vs monotonic
+SUSPEND_THRESHOLD = 10.0  # detik keterlambatan tidur yang dianggap suspend
+
+# Watchdog
+WATCHDOG_INTERVAL = 5  # detik antar pemeriksaan
+SCHEDULER_STALL_DEADLINE = SCHEDULE_CHECK_INTERVAL * 3  # detik tanpa heartbeat
+AUDIO_STALL_DEADLINE = 15  # detik tanpa heartbeat saat audio diputar
+
+# Endpoint metrik (format Prometheus)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+
+# API kontrol HTTP/JSON; host "0.0.0.0" membuka akses dari LAN (pakai api_token)
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+API_MAX_BODY = 64 * 1024  # byte
+
+# Replikasi jadwal antar PC bel: primary mencatat perubahan, replica menarik delta
+REPLICATED_TABLES = {
+    "schedules": "id",
+    "settings": "key",
+    "date_exceptions": "id",
+    "recurrence_rules": "id",
+    "chimes": "id",
+}
+# Awalan setting milik masing-masing PC yang tidak ikut direplikasi
+LOCAL_SETTING_PREFIXES = ("replication_", "api_", "metrics_", "audio_backend", "audio_sink_path",
+                          "audio_engine", "pcm_cache_", "ingest_", "clock_", "stream_", "autostart")
+REPLICATION_INTERVAL = 10        # detik antar tarikan delta
+REPLICATION_LOG_KEEP = 1000      # entri change log yang disimpan setelah compaction
+REPLICATION_MAX_CHANGES = 500    # entri per respon delta
+
+# Penyelarasan jam antar PC bel lewat UDP; satu PC "referensi", sisanya "klien"
+CLOCK_SYNC_PORT = 8766
+CLOCK_SYNC_INTERVAL = 32      # detik antar putaran pengukuran
+CLOCK_SYNC_SAMPLES = 8        # probe per putaran, dipilih yang RTT-nya terkecil
+CLOCK_SYNC_TIMEOUT = 0.5      # detik menunggu balasan satu probe
+CLOCK_SYNC_STEP = 1.0         # selisih offset (detik) yang langsung diloncati, bukan dihaluskan
+
+# Siaran pengumuman dari PC kantor ke PC gedung lewat TCP
+STREAM_PORT = 8767
+STREAM_FRAME_MS = 100         # durasi PCM per frame jaringan (= satu blok mixer)
+STREAM_LEAD = 0.5             # detik antara frame pertama dikirim dan mulai diputar serentak
+STREAM_MAX_FRAME = 256 * 1024  # byte payload maksimum per frame
+
 # GitHub
 REPO_URL = "https://github.com/username/bell-sekolah-audio.git"
 
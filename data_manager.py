@@ -4,11 +4,36 @@ import os
 import shutil
 import subprocess
 import hashlib
+import datetime
+import json
+import ntpath
 import time as time_module
 from constants import (
-    DB_NAME, DEFAULT_AUDIO_DIR, REPO_URL, DAYS, AUDIO_DIR
+    DB_NAME, DEFAULT_AUDIO_DIR, REPO_URL, DAYS, AUDIO_DIR, EXCEPTION_KINDS, DEFAULT_CHIMES,
+    REPLICATED_TABLES, LOCAL_SETTING_PREFIXES, REPLICATION_LOG_KEEP, REPLICATION_MAX_CHANGES
 )
 from logger import log_error, log_info, log_warning
+from recurrence import RecurrenceRule
+from chime import Chime, CHIME_PREFIX
+from metrics import registry, timed, cache_counters
+
+DB_QUERY_HELP = "Durasi query SQLite (detik)"
+_schedule_cache_hits, _schedule_cache_misses = cache_counters("jadwal")
+_get_schedules_timer = registry.histogram("db_query_seconds", DB_QUERY_HELP,
+                                          {"operation": "get_schedules"})
+
+
+def is_local_setting(key: str) -> bool:
+    """True untuk setting milik PC ini yang tidak ikut direplikasi"""
+    return key.startswith(LOCAL_SETTING_PREFIXES)
+
+
+def _local_audio_path(path):
+    """Path audio dari node lain dipetakan ke folder audio/ di PC ini"""
+    if not path or path.startswith(CHIME_PREFIX):
+        return path
+    # ntpath mengenali pemisah "\\" (Windows) maupun "/"
+    return os.path.join(AUDIO_DIR, ntpath.basename(path))
 
 class DataManager:
     def __init__(self):
@@ -16,7 +41,30 @@ class DataManager:
         self._settings_cache = {}
         self._last_cache_update = None
         self._cache_lifetime = 60  # detik
-        
+        self._cache_generation = 0  # Naik setiap kali jadwal/kalender berubah
+        self._settings_generation = 0  # Naik setiap kali setting disimpan
+
+    @property
+    def cache_generation(self) -> int:
+        """Nomor generasi cache, berubah setiap ada perubahan jadwal"""
+        return self._cache_generation
+
+    @property
+    def settings_generation(self) -> int:
+        """Nomor generasi setting, berubah setiap set_setting"""
+        return self._settings_generation
+
+    def _invalidate_cache(self) -> None:
+        """Kosongkan cache jadwal dan naikkan generasi"""
+        self._schedule_cache = {}
+        self._last_cache_update = None
+        self._cache_generation += 1
+
+    def reload(self) -> None:
+        """Buang cache agar perubahan database dari luar aplikasi terbaca"""
+        self._invalidate_cache()
+        self._settings_generation += 1
+
     def init_db(self) -> None:
         """Inisialisasi database"""
         try:
@@ -26,13 +74,75 @@ class DataManager:
                          (id INTEGER PRIMARY KEY, day TEXT, time TEXT, audio_path TEXT)''')
             c.execute('''CREATE TABLE IF NOT EXISTS settings
                          (key TEXT PRIMARY KEY, value TEXT)''')
+            c.execute('''CREATE TABLE IF NOT EXISTS date_exceptions
+                         (id INTEGER PRIMARY KEY, start_date TEXT, end_date TEXT,
+                          kind TEXT, plan_day TEXT, description TEXT)''')
+            c.execute('''CREATE INDEX IF NOT EXISTS idx_date_exceptions_range
+                         ON date_exceptions (start_date, end_date)''')
+            c.execute('''CREATE TABLE IF NOT EXISTS recurrence_rules
+                         (id INTEGER PRIMARY KEY, kind TEXT, day TEXT, start_time TEXT,
+                          end_time TEXT, interval_minutes INTEGER, week_interval INTEGER,
+                          anchor_date TEXT, nth INTEGER, audio_path TEXT)''')
+            c.execute('''CREATE TABLE IF NOT EXISTS fire_log
+                         (id INTEGER PRIMARY KEY, scheduled_at TEXT, fired_at TEXT,
+                          outcome TEXT, audio_path TEXT)''')
+            c.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_fire_log_scheduled
+                         ON fire_log (scheduled_at)''')
+            c.execute('''CREATE TABLE IF NOT EXISTS latency_daily
+                         (date TEXT, stage TEXT, count INTEGER, p50 REAL, p95 REAL,
+                          p99 REAL, max_ms REAL, buckets TEXT, PRIMARY KEY (date, stage))''')
+            c.execute('''CREATE TABLE IF NOT EXISTS audio_metadata
+                         (path TEXT PRIMARY KEY, hash TEXT, duration REAL, lufs REAL,
+                          peak_db REAL, analyzed_at TEXT, gain_db REAL)''')
+            c.execute('''CREATE TABLE IF NOT EXISTS chimes
+                         (id INTEGER PRIMARY KEY, name TEXT UNIQUE, notes TEXT, attack_ms INTEGER,
+                          decay_ms INTEGER, repeats INTEGER, gap_ms INTEGER, volume REAL)''')
+            c.executemany('''INSERT OR IGNORE INTO chimes
+                             (name, notes, attack_ms, decay_ms, repeats, gap_ms, volume)
+                             VALUES (?, ?, ?, ?, ?, ?, ?)''', DEFAULT_CHIMES)
+            # Migrasi: gain per jadwal (NULL = pakai gain hasil analisis)
+            columns = [row[1] for row in c.execute("PRAGMA table_info(schedules)")]
+            if "gain_db" not in columns:
+                c.execute("ALTER TABLE schedules ADD COLUMN gain_db REAL")
+            c.execute('''CREATE TABLE IF NOT EXISTS change_log
+                         (version INTEGER PRIMARY KEY AUTOINCREMENT, tbl TEXT, op TEXT,
+                          row_key TEXT, data TEXT)''')
+            self._install_change_triggers(c)
             conn.commit()
             conn.close()
             log_info("Database diinisialisasi")
+            # Compaction juga di PC tanpa peran primary (mandiri atau replica),
+            # agar change_log tidak tumbuh tanpa batas
+            self.compact_change_log()
         except Exception as e:
             log_error(f"Gagal inisialisasi database: {e}")
             raise
 
+    def _install_change_triggers(self, c) -> None:
+        """Trigger yang mencatat setiap perubahan tabel replikasi ke change_log
+
+        Dibuat ulang setiap init_db agar kolom hasil migrasi ikut tercatat.
+        Setting lokal PC (LOCAL_SETTING_PREFIXES) tidak dicatat.
+        """
+        for table, key in REPLICATED_TABLES.items():
+            columns = [row[1] for row in c.execute(f"PRAGMA table_info({table})")]
+            for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+                name = f"change_log_{table}_{event.lower()}"
+                data = "NULL"
+                if row == "NEW":
+                    data = "json_object(" + ", ".join(f"'{col}', NEW.{col}" for col in columns) + ")"
+                when = ""
+                if table == "settings":
+                    when = " WHEN " + " AND ".join(f"substr({row}.key, 1, {len(prefix)}) != '{prefix}'"
+                                                   for prefix in LOCAL_SETTING_PREFIXES)
+                c.execute(f"DROP TRIGGER IF EXISTS {name}")
+                c.execute(f'''CREATE TRIGGER {name} AFTER {event} ON {table}{when}
+                              BEGIN
+                                  INSERT INTO change_log (tbl, op, row_key, data)
+                                  VALUES ('{table}', '{event[0]}', {row}.{key}, {data});
+                              END''')
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="is_database_empty")
     def is_database_empty(self) -> bool:
         """Cek apakah database kosong"""
         try:
@@ -160,12 +270,14 @@ class DataManager:
             self._last_cache_update is None or 
             now - self._last_cache_update > self._cache_lifetime):
             
+            _schedule_cache_misses.inc()
             try:
-                conn = sqlite3.connect(DB_NAME)
-                c = conn.cursor()
-                c.execute("SELECT day, time, audio_path FROM schedules ORDER BY day, time")
-                rows = c.fetchall()
-                conn.close()
+                with _get_schedules_timer.time():
+                    conn = sqlite3.connect(DB_NAME)
+                    c = conn.cursor()
+                    c.execute("SELECT day, time, audio_path FROM schedules ORDER BY day, time")
+                    rows = c.fetchall()
+                    conn.close()
                 
                 schedule = {}
                 for day, schedule_time, path in rows:
@@ -178,24 +290,41 @@ class DataManager:
                 log_error(f"Gagal mengambil jadwal: {e}")
                 return self._schedule_cache
         else:
+            _schedule_cache_hits.inc()
             return self._schedule_cache
 
-    def add_schedule(self, day: str, schedule_time: str, path: str) -> bool:
-        """Tambah jadwal baru"""
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="add_schedule")
+    def add_schedule(self, day: str, schedule_time: str, path: str, gain_db: float = None) -> bool:
+        """Tambah jadwal baru; gain_db menimpa gain hasil analisis loudness"""
         try:
             conn = sqlite3.connect(DB_NAME)
             c = conn.cursor()
-            c.execute("INSERT INTO schedules (day, time, audio_path) VALUES (?, ?, ?)",
-                      (day, schedule_time, path))
+            c.execute("INSERT INTO schedules (day, time, audio_path, gain_db) VALUES (?, ?, ?, ?)",
+                      (day, schedule_time, path, gain_db))
             conn.commit()
             conn.close()
             log_info(f"Jadwal ditambahkan: {day} {schedule_time} -> {path}")
-            self._schedule_cache = {}  # Invalidate cache
+            self._invalidate_cache()
             return True
         except Exception as e:
             log_error(f"Gagal tambah jadwal: {e}")
             return False
 
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="get_schedule_gains")
+    def get_schedule_gains(self, day: str) -> dict:
+        """Gain khusus jadwal satu hari: {"HH:MM": gain_db}"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute("SELECT time, gain_db FROM schedules WHERE day=? AND gain_db IS NOT NULL", (day,))
+            rows = c.fetchall()
+            conn.close()
+            return dict(rows)
+        except Exception as e:
+            log_error(f"Gagal mengambil gain jadwal {day}: {e}")
+            return {}
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="delete_day")
     def delete_day(self, day: str) -> bool:
         """Hapus semua jadwal hari tertentu"""
         try:
@@ -205,12 +334,13 @@ class DataManager:
             conn.commit()
             conn.close()
             log_info(f"Jadwal hari {day} dihapus")
-            self._schedule_cache = {}  # Invalidate cache
+            self._invalidate_cache()
             return True
         except Exception as e:
             log_error(f"Gagal hapus jadwal hari {day}: {e}")
             return False
 
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="delete_schedule")
     def delete_schedule(self, day: str, schedule_time: str, audio_path: str) -> bool:
         """Hapus jadwal spesifik"""
         try:
@@ -221,12 +351,13 @@ class DataManager:
             conn.commit()
             conn.close()
             log_info(f"Jadwal dihapus: {day} {schedule_time} -> {audio_path}")
-            self._schedule_cache = {}  # Invalidate cache
+            self._invalidate_cache()
             return True
         except Exception as e:
             log_error(f"Gagal hapus jadwal: {e}")
             return False
 
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="get_setting")
     def get_setting(self, key: str) -> str:
         """Ambil setting"""
         try:
@@ -240,6 +371,21 @@ class DataManager:
             log_error(f"Gagal ambil setting {key}: {e}")
             return None
 
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="get_settings")
+    def get_settings(self) -> dict:
+        """Ambil semua setting sebagai dict"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute("SELECT key, value FROM settings ORDER BY key")
+            rows = c.fetchall()
+            conn.close()
+            return dict(rows)
+        except Exception as e:
+            log_error(f"Gagal mengambil setting: {e}")
+            return {}
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="set_setting")
     def set_setting(self, key: str, value: str) -> bool:
         """Simpan setting"""
         try:
@@ -249,11 +395,462 @@ class DataManager:
             conn.commit()
             conn.close()
             log_info(f"Setting disimpan: {key} = {value}")
+            self._settings_generation += 1
             return True
         except Exception as e:
             log_error(f"Gagal simpan setting: {e}")
             return False
 
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="add_date_exception")
+    def add_date_exception(self, start_date: str, end_date: str, kind: str,
+                           plan_day: str = None, description: str = "") -> bool:
+        """Tambah pengecualian tanggal (libur atau hari khusus)"""
+        try:
+            if kind not in EXCEPTION_KINDS:
+                raise ValueError(f"Jenis pengecualian tidak dikenal: {kind}")
+            if kind == "khusus" and plan_day not in DAYS:
+                raise ValueError(f"Hari rencana tidak valid: {plan_day}")
+            if end_date < start_date:
+                raise ValueError("Tanggal selesai sebelum tanggal mulai")
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute('''INSERT INTO date_exceptions
+                         (start_date, end_date, kind, plan_day, description)
+                         VALUES (?, ?, ?, ?, ?)''',
+                      (start_date, end_date, kind, plan_day, description))
+            conn.commit()
+            conn.close()
+            log_info(f"Pengecualian tanggal ditambahkan: {start_date} s/d {end_date} ({kind})")
+            self._invalidate_cache()
+            return True
+        except Exception as e:
+            log_error(f"Gagal tambah pengecualian tanggal: {e}")
+            return False
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="delete_date_exception")
+    def delete_date_exception(self, exception_id: int) -> bool:
+        """Hapus pengecualian tanggal"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute("DELETE FROM date_exceptions WHERE id=?", (exception_id,))
+            conn.commit()
+            conn.close()
+            log_info(f"Pengecualian tanggal dihapus: {exception_id}")
+            self._invalidate_cache()
+            return True
+        except Exception as e:
+            log_error(f"Gagal hapus pengecualian tanggal: {e}")
+            return False
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="get_date_exceptions")
+    def get_date_exceptions(self) -> list:
+        """Ambil semua pengecualian tanggal, urut tanggal mulai"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute('''SELECT id, start_date, end_date, kind, plan_day, description
+                         FROM date_exceptions ORDER BY start_date, end_date''')
+            rows = c.fetchall()
+            conn.close()
+            return rows
+        except Exception as e:
+            log_error(f"Gagal mengambil pengecualian tanggal: {e}")
+            return []
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="find_date_exception")
+    def find_date_exception(self, date_str: str):
+        """Cari pengecualian yang berlaku pada tanggal (YYYY-MM-DD)"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            # Rentang yang dimulai paling akhir menang jika ada yang tumpang tindih
+            c.execute('''SELECT id, start_date, end_date, kind, plan_day, description
+                         FROM date_exceptions
+                         WHERE start_date <= ? AND end_date >= ?
+                         ORDER BY start_date DESC, id DESC LIMIT 1''',
+                      (date_str, date_str))
+            row = c.fetchone()
+            conn.close()
+            return row
+        except Exception as e:
+            log_error(f"Gagal cari pengecualian tanggal {date_str}: {e}")
+            return None
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="add_recurrence_rule")
+    def add_recurrence_rule(self, rule: RecurrenceRule) -> bool:
+        """Tambah aturan jadwal berulang"""
+        try:
+            rule.validate()
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute('''INSERT INTO recurrence_rules
+                         (kind, day, start_time, end_time, interval_minutes,
+                          week_interval, anchor_date, nth, audio_path)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                      (rule.kind, rule.day, rule.start_time, rule.end_time,
+                       rule.interval_minutes, rule.week_interval, rule.anchor_date,
+                       rule.nth, rule.audio_path))
+            rule.id = c.lastrowid
+            conn.commit()
+            conn.close()
+            log_info(f"Aturan berulang ditambahkan: {rule.kind} {rule.day} {rule.start_time}")
+            self._invalidate_cache()
+            return True
+        except Exception as e:
+            log_error(f"Gagal tambah aturan berulang: {e}")
+            return False
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="delete_recurrence_rule")
+    def delete_recurrence_rule(self, rule_id: int) -> bool:
+        """Hapus aturan jadwal berulang"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute("DELETE FROM recurrence_rules WHERE id=?", (rule_id,))
+            conn.commit()
+            conn.close()
+            log_info(f"Aturan berulang dihapus: {rule_id}")
+            self._invalidate_cache()
+            return True
+        except Exception as e:
+            log_error(f"Gagal hapus aturan berulang: {e}")
+            return False
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="get_recurrence_rules")
+    def get_recurrence_rules(self) -> list:
+        """Ambil semua aturan jadwal berulang"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute('''SELECT id, kind, day, start_time, end_time, interval_minutes,
+                                week_interval, anchor_date, nth, audio_path
+                         FROM recurrence_rules ORDER BY day, start_time''')
+            rows = c.fetchall()
+            conn.close()
+            return [RecurrenceRule.from_row(row) for row in rows]
+        except Exception as e:
+            log_error(f"Gagal mengambil aturan berulang: {e}")
+            return []
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="add_chime")
+    def add_chime(self, chime: Chime) -> bool:
+        """Tambah atau perbarui chime (nama unik)"""
+        try:
+            chime.validate()
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute('''INSERT OR REPLACE INTO chimes
+                         (name, notes, attack_ms, decay_ms, repeats, gap_ms, volume)
+                         VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                      (chime.name, chime.notes, chime.attack_ms, chime.decay_ms,
+                       chime.repeats, chime.gap_ms, chime.volume))
+            chime.id = c.lastrowid
+            conn.commit()
+            conn.close()
+            log_info(f"Chime disimpan: {chime.name} ({chime.notes})")
+            self._invalidate_cache()
+            return True
+        except Exception as e:
+            log_error(f"Gagal simpan chime: {e}")
+            return False
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="delete_chime")
+    def delete_chime(self, chime_id: int) -> bool:
+        """Hapus chime"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute("DELETE FROM chimes WHERE id=?", (chime_id,))
+            conn.commit()
+            conn.close()
+            log_info(f"Chime dihapus: {chime_id}")
+            self._invalidate_cache()
+            return True
+        except Exception as e:
+            log_error(f"Gagal hapus chime: {e}")
+            return False
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="get_chimes")
+    def get_chimes(self) -> list:
+        """Ambil semua chime"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute('''SELECT id, name, notes, attack_ms, decay_ms, repeats, gap_ms, volume
+                         FROM chimes ORDER BY name''')
+            rows = c.fetchall()
+            conn.close()
+            return [Chime.from_row(row) for row in rows]
+        except Exception as e:
+            log_error(f"Gagal mengambil chime: {e}")
+            return []
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="get_chime")
+    def get_chime(self, name: str):
+        """Ambil satu chime menurut nama, None jika tidak ada"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute('''SELECT id, name, notes, attack_ms, decay_ms, repeats, gap_ms, volume
+                         FROM chimes WHERE name=?''', (name,))
+            row = c.fetchone()
+            conn.close()
+            return Chime.from_row(row) if row else None
+        except Exception as e:
+            log_error(f"Gagal mengambil chime {name}: {e}")
+            return None
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="add_fire_records")
+    def add_fire_records(self, records: list) -> bool:
+        """Simpan banyak catatan bel sekaligus dalam satu transaksi
+
+        Tiap record: (scheduled_at, fired_at, outcome, audio_path) dengan
+        waktu dalam format ISO. Bel yang sudah tercatat diabaikan.
+        """
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.executemany('''INSERT OR IGNORE INTO fire_log
+                             (scheduled_at, fired_at, outcome, audio_path)
+                             VALUES (?, ?, ?, ?)''', records)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            log_error(f"Gagal simpan riwayat bel: {e}")
+            return False
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="get_fire_records")
+    def get_fire_records(self, since: str) -> list:
+        """Ambil catatan bel dengan jadwal sejak waktu ISO tertentu"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute('''SELECT scheduled_at, fired_at, outcome, audio_path
+                         FROM fire_log WHERE scheduled_at >= ?
+                         ORDER BY scheduled_at''', (since,))
+            rows = c.fetchall()
+            conn.close()
+            return rows
+        except Exception as e:
+            log_error(f"Gagal mengambil riwayat bel: {e}")
+            return []
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="save_latency_daily")
+    def save_latency_daily(self, rows: list) -> bool:
+        """Simpan ringkasan histogram latensi harian (menimpa hari yang sama)"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.executemany('''INSERT OR REPLACE INTO latency_daily
+                             (date, stage, count, p50, p95, p99, max_ms, buckets)
+                             VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            log_error(f"Gagal simpan statistik latensi: {e}")
+            return False
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="get_latency_daily")
+    def get_latency_daily(self, days: int = 30) -> list:
+        """Ambil ringkasan latensi harian beberapa hari terakhir"""
+        try:
+            since = (datetime.date.today() - datetime.timedelta(days=days)).isoformat()
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute('''SELECT date, stage, count, p50, p95, p99, max_ms
+                         FROM latency_daily WHERE date >= ?
+                         ORDER BY date DESC, stage''', (since,))
+            rows = c.fetchall()
+            conn.close()
+            return rows
+        except Exception as e:
+            log_error(f"Gagal mengambil statistik latensi: {e}")
+            return []
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="save_audio_metadata")
+    def save_audio_metadata(self, path: str, file_hash: str, duration: float,
+                            lufs: float, peak_db: float, gain_db: float) -> bool:
+        """Simpan hasil analisis loudness satu file audio"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute('''INSERT OR REPLACE INTO audio_metadata
+                         (path, hash, duration, lufs, peak_db, analyzed_at, gain_db)
+                         VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                      (path, file_hash, duration, lufs, peak_db,
+                       datetime.datetime.now().isoformat(sep=" ", timespec="seconds"), gain_db))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            log_error(f"Gagal simpan metadata audio {path}: {e}")
+            return False
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="get_audio_metadata")
+    def get_audio_metadata(self) -> list:
+        """Semua metadata audio: (path, hash, duration, lufs, peak_db, analyzed_at, gain_db)"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute('''SELECT path, hash, duration, lufs, peak_db, analyzed_at, gain_db
+                         FROM audio_metadata ORDER BY path''')
+            rows = c.fetchall()
+            conn.close()
+            return rows
+        except Exception as e:
+            log_error(f"Gagal mengambil metadata audio: {e}")
+            return []
+
+    def _change_log_version(self, c) -> int:
+        row = c.execute("SELECT seq FROM sqlite_sequence WHERE name='change_log'").fetchone()
+        return row[0] if row else 0
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="change_log_version")
+    def change_log_version(self) -> int:
+        """Versi perubahan terakhir di change_log"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            version = self._change_log_version(conn.cursor())
+            conn.close()
+            return version
+        except Exception as e:
+            log_error(f"Gagal membaca versi change log: {e}")
+            return 0
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="get_changes")
+    def get_changes(self, since: int, limit: int = REPLICATION_MAX_CHANGES) -> tuple:
+        """(versi terkini, [(versi, tabel, op, kunci, data)]) setelah versi `since`
+
+        Daftar perubahan bernilai None jika entri setelah `since` sudah
+        di-compact; replica harus memuat snapshot.
+        """
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            version = self._change_log_version(c)
+            oldest = c.execute("SELECT MIN(version) FROM change_log").fetchone()[0]
+            if since < version and (oldest is None or oldest > since + 1):
+                conn.close()
+                return version, None
+            c.execute('''SELECT version, tbl, op, row_key, data FROM change_log
+                         WHERE version > ? ORDER BY version LIMIT ?''', (since, limit))
+            rows = c.fetchall()
+            conn.close()
+            return version, rows
+        except Exception as e:
+            log_error(f"Gagal mengambil change log: {e}")
+            return 0, []
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="compact_change_log")
+    def compact_change_log(self, keep: int = REPLICATION_LOG_KEEP) -> int:
+        """Hapus entri change log lama, sisakan `keep` entri terakhir"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            c.execute('''DELETE FROM change_log WHERE version <=
+                         (SELECT MAX(version) FROM change_log) - ?''', (keep,))
+            removed = c.rowcount
+            conn.commit()
+            conn.close()
+            if removed:
+                log_info(f"Change log di-compact: {removed} entri dihapus")
+            return removed
+        except Exception as e:
+            log_error(f"Gagal compact change log: {e}")
+            return 0
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="export_snapshot")
+    def export_snapshot(self) -> dict:
+        """Isi semua tabel replikasi beserta versi change log saat ini"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            conn.row_factory = sqlite3.Row
+            c = conn.cursor()
+            version = self._change_log_version(c)
+            tables = {}
+            for table in REPLICATED_TABLES:
+                rows = [dict(r) for r in c.execute(f"SELECT * FROM {table}")]
+                if table == "settings":
+                    rows = [r for r in rows if not is_local_setting(r["key"])]
+                tables[table] = rows
+            conn.close()
+            return {"version": version, "tables": tables}
+        except Exception as e:
+            log_error(f"Gagal membuat snapshot: {e}")
+            return None
+
+    def _write_row(self, c, table, data) -> None:
+        if "audio_path" in data:
+            data = dict(data, audio_path=_local_audio_path(data["audio_path"]))
+        columns = ", ".join(data)
+        marks = ", ".join("?" for _ in data)
+        c.execute(f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({marks})", tuple(data.values()))
+
+    def _finish_replication(self, c, version, logged_before) -> None:
+        # Perubahan dari primary tidak dicatat ulang di change_log replica
+        c.execute("DELETE FROM change_log WHERE version > ?", (logged_before,))
+        c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('replication_version', ?)",
+                  (str(version),))
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="import_snapshot")
+    def import_snapshot(self, snapshot: dict) -> bool:
+        """Ganti isi tabel replikasi dengan snapshot dari primary"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            logged_before = self._change_log_version(c)
+            for table, rows in snapshot["tables"].items():
+                if table not in REPLICATED_TABLES:
+                    continue
+                if table == "settings":
+                    for (key,) in c.execute("SELECT key FROM settings").fetchall():
+                        if not is_local_setting(key):
+                            c.execute("DELETE FROM settings WHERE key=?", (key,))
+                else:
+                    c.execute(f"DELETE FROM {table}")
+                for row in rows:
+                    self._write_row(c, table, row)
+            self._finish_replication(c, snapshot["version"], logged_before)
+            conn.commit()
+            conn.close()
+            log_info(f"Snapshot replikasi dimuat (versi {snapshot['version']})")
+            self._invalidate_cache()
+            self._settings_generation += 1
+            return True
+        except Exception as e:
+            log_error(f"Gagal memuat snapshot replikasi: {e}")
+            return False
+
+    @timed("db_query_seconds", DB_QUERY_HELP, operation="apply_changes")
+    def apply_changes(self, changes: list, version: int) -> bool:
+        """Terapkan delta dari primary dalam satu transaksi"""
+        try:
+            conn = sqlite3.connect(DB_NAME)
+            c = conn.cursor()
+            logged_before = self._change_log_version(c)
+            for _, table, op, row_key, data in changes:
+                if table not in REPLICATED_TABLES:
+                    continue
+                if table == "settings" and is_local_setting(row_key):
+                    continue
+                if op == "D":
+                    c.execute(f"DELETE FROM {table} WHERE {REPLICATED_TABLES[table]}=?", (row_key,))
+                else:
+                    self._write_row(c, table, json.loads(data))
+            self._finish_replication(c, version, logged_before)
+            conn.commit()
+            conn.close()
+            if changes:
+                self._invalidate_cache()
+                self._settings_generation += 1
+            return True
+        except Exception as e:
+            log_error(f"Gagal menerapkan delta replikasi: {e}")
+            return False
+
     def reset_to_default(self) -> bool:
         """Reset ke konfigurasi default"""
         try:
@@ -282,7 +879,7 @@ class DataManager:
 
             self.insert_dummy_data()
             log_info("Aplikasi direset ke konfigurasi default.")
-            self._schedule_cache = {}  # Invalidate cache
+            self._invalidate_cache()
             return True
         except Exception as e:
             log_error(f"Gagal reset ke default: {e}")
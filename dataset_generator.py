@@ -0,0 +1,310 @@
+# dataset_generator.py
+import array
+import datetime
+import hashlib
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import wave
+import data_manager as data_manager_module
+from data_manager import data_manager
+from constants import DAYS, MIXER_FREQUENCY, MIXER_CHANNELS
+from fire_log import OUTCOME_PLAYED, OUTCOME_CATCHUP, OUTCOME_FAILED, OUTCOME_MISSED
+from loudness import compute_gain
+
+DEFAULT_SEED = 2026
+DEFAULT_SCHEDULES = 5000
+DEFAULT_AUDIO_FILES = 1000
+DEFAULT_YEARS = 3
+DEFAULT_RULES = 40
+DEFAULT_START = datetime.date(2023, 7, 17)  # Awal tahun ajaran
+
+# Profil jadwal: (nama, menit mulai, menit selesai). Tabel schedules tidak
+# punya kolom profil, jadi tiap profil menjadi kelompok baris dengan
+# rentang jam dan pustaka audio sendiri, ditambah aturan berulang dan hari
+# khusus yang memindahkan tanggal ke rencana hari lain.
+PROFILES = [
+    ("reguler", 6 * 60 + 30, 15 * 60),
+    ("ujian", 7 * 60, 12 * 60 + 30),
+    ("ramadan", 7 * 60 + 30, 13 * 60),
+    ("ekstra", 14 * 60, 18 * 60),
+    ("asrama", 4 * 60 + 30, 22 * 60),
+]
+
+# Proporsi hasil di riwayat bel
+OUTCOME_WEIGHTS = [(OUTCOME_PLAYED, 0.96), (OUTCOME_CATCHUP, 0.02), (OUTCOME_FAILED, 0.01),
+                   (OUTCOME_MISSED, 0.01)]
+NOTES = [261.63, 293.66, 329.63, 392.00, 440.00, 523.25, 587.33, 659.25, 783.99, 880.00]
+
+
+def write_clip(path, seconds, frequency, rate=MIXER_FREQUENCY, channels=MIXER_CHANNELS,
+               amplitude=0.3, decay=None) -> str:
+    """Tulis WAV 16-bit berisi nada sinus (dengan harmonik ke-2 dan peluruhan jika `decay`)"""
+    frames = int(rate * seconds)
+    step = 2 * math.pi * frequency / rate
+    damping = math.exp(-1.0 / (decay * rate)) if decay else 1.0
+    level = amplitude * 32767
+    samples = array.array("h")
+    for i in range(frames):
+        value = int(level * (0.8 * math.sin(step * i) + 0.2 * math.sin(2 * step * i)))
+        samples.extend((value,) * channels)
+        level *= damping
+    if sys.byteorder == "big":
+        samples.byteswap()
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+    return path
+
+
+def _file_hash(path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _clock(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class DatasetGenerator:
+    """Database dan pustaka audio sintetis yang besar, dapat diulang dari seed
+
+    Isi: jadwal beberapa profil, pustaka klip WAV pendek (sebagian dalam
+    format mixer, sebagian 44.1 kHz mono agar jalur decode ikut teruji),
+    metadata loudness, aturan berulang, libur dan hari khusus bertahun-tahun
+    serta riwayat bel (fire_log) untuk seluruh rentang itu. Seed dan
+    parameter yang sama menghasilkan isi yang sama persis.
+    """
+
+    def __init__(self, seed=DEFAULT_SEED, schedules=DEFAULT_SCHEDULES, audio_files=DEFAULT_AUDIO_FILES,
+                 years=DEFAULT_YEARS, rules=DEFAULT_RULES, start=DEFAULT_START, history=True):
+        if schedules > len(DAYS) * 24 * 60:
+            raise ValueError(f"Maksimal {len(DAYS) * 24 * 60} jadwal (satu per menit per hari)")
+        if audio_files < len(PROFILES):
+            raise ValueError(f"Minimal {len(PROFILES)} file audio (satu per profil)")
+        self.seed = seed
+        self.schedules = schedules
+        self.audio_files = audio_files
+        self.years = years
+        self.rules = rules
+        self.start = start
+        self.end = start + datetime.timedelta(days=365 * years)
+        self.history = history
+        self.rng = random.Random(seed)
+
+    def generate(self, output_dir) -> dict:
+        """Buat `output_dir`/bell_sekolah.db dan `output_dir`/audio; kembalikan manifest"""
+        audio_dir = os.path.join(output_dir, "audio")
+        os.makedirs(audio_dir, exist_ok=True)
+        database = os.path.join(output_dir, "bell_sekolah.db")
+        if os.path.exists(database):
+            os.remove(database)
+
+        library = self._audio_library(audio_dir)
+        schedules = self._schedules(library)
+        exceptions = self._date_exceptions()
+
+        # Skema dibuat oleh data_manager agar sama dengan aplikasi
+        original_db = data_manager_module.DB_NAME
+        data_manager_module.DB_NAME = database
+        try:
+            data_manager.init_db()
+        finally:
+            data_manager_module.DB_NAME = original_db
+            data_manager.reload()
+
+        conn = sqlite3.connect(database)
+        c = conn.cursor()
+        c.executemany("INSERT INTO schedules (day, time, audio_path) VALUES (?, ?, ?)", schedules)
+        c.executemany('''INSERT INTO audio_metadata
+                         (path, hash, duration, lufs, peak_db, analyzed_at, gain_db)
+                         VALUES (?, ?, ?, ?, ?, ?, ?)''', self._audio_metadata(library))
+        c.executemany('''INSERT INTO recurrence_rules
+                         (kind, day, start_time, end_time, interval_minutes,
+                          week_interval, anchor_date, nth, audio_path)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', self._recurrence_rules(library))
+        c.executemany('''INSERT INTO date_exceptions (start_date, end_date, kind, plan_day, description)
+                         VALUES (?, ?, ?, ?, ?)''', exceptions)
+        fire_records = 0
+        if self.history:
+            for batch in self._fire_history(schedules, exceptions):
+                c.executemany('''INSERT OR IGNORE INTO fire_log
+                                 (scheduled_at, fired_at, outcome, audio_path)
+                                 VALUES (?, ?, ?, ?)''', batch)
+                fire_records += len(batch)
+        conn.commit()
+        conn.close()
+
+        manifest = {
+            "seed": self.seed,
+            "database": database,
+            "audio_dir": audio_dir,
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "profiles": [name for name, _, _ in PROFILES],
+            "schedules": len(schedules),
+            "audio_files": sum(len(clips) for clips in library.values()),
+            "recurrence_rules": self.rules,
+            "date_exceptions": len(exceptions),
+            "fire_records": fire_records,
+        }
+        with open(os.path.join(output_dir, "dataset.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest
+
+    def _audio_library(self, audio_dir) -> dict:
+        """{profil: [(path, durasi, lufs, peak)]}; klip dibagi rata ke tiap profil"""
+        library = {name: [] for name, _, _ in PROFILES}
+        for index in range(self.audio_files):
+            profile = PROFILES[index % len(PROFILES)][0]
+            seconds = round(self.rng.uniform(0.2, 0.8), 3)
+            frequency = self.rng.choice(NOTES)
+            amplitude = round(self.rng.uniform(0.1, 0.9), 3)
+            native = self.rng.random() < 0.8
+            path = os.path.join(audio_dir, f"{profile}_{index:04d}.wav")
+            write_clip(path, seconds, frequency,
+                       rate=MIXER_FREQUENCY if native else 44100,
+                       channels=MIXER_CHANNELS if native else 1,
+                       amplitude=amplitude, decay=seconds / 2)
+            # Perkiraan kasar dari amplitudo; cukup untuk mengisi tabel metadata
+            peak = 20 * math.log10(amplitude)
+            library[profile].append((path, seconds, round(peak - 3 - self.rng.uniform(0, 6), 2), round(peak, 2)))
+        return library
+
+    def _audio_metadata(self, library):
+        analyzed_at = f"{self.start.isoformat()} 00:00:00"
+        for clips in library.values():
+            for path, seconds, lufs, peak in clips:
+                yield (path, _file_hash(path), seconds, lufs, peak, analyzed_at, round(compute_gain(lufs, peak), 2))
+
+    def _schedules(self, library) -> list:
+        """(hari, jam, path) unik per hari per menit, bergiliran antar profil dan hari"""
+        taken = {day: set() for day in DAYS}
+        rows = []
+        for index in range(self.schedules):
+            name, first, last = PROFILES[index % len(PROFILES)]
+            day = DAYS[(index // len(PROFILES)) % len(DAYS)]
+            minute = self.rng.randint(first, last)
+            while minute in taken[day]:
+                minute = (minute + 1) % (24 * 60)
+            taken[day].add(minute)
+            path = self.rng.choice(library[name])[0]
+            rows.append((day, _clock(minute), path))
+        rows.sort(key=lambda row: (DAYS.index(row[0]), row[1]))
+        return rows
+
+    def _recurrence_rules(self, library):
+        anchor = self.start.isoformat()
+        for index in range(self.rules):
+            name, first, last = PROFILES[index % len(PROFILES)]
+            day = self.rng.choice(DAYS[:6])
+            path = self.rng.choice(library[name])[0]
+            kind = ("interval", "mingguan", "bulanan")[index % 3]
+            start = self.rng.randint(first, max(first, last - 60))
+            if kind == "interval":
+                yield (kind, day, _clock(start), _clock(min(start + 120, 24 * 60 - 1)),
+                       self.rng.choice((15, 20, 30)), 1, None, None, path)
+            elif kind == "mingguan":
+                yield (kind, day, _clock(start), None, None, 2, anchor, None, path)
+            else:
+                yield (kind, day, _clock(start), None, None, 1, None, self.rng.choice((1, 2, -1)), path)
+
+    def _date_exceptions(self) -> list:
+        """Per tahun: libur semester, libur nasional dan beberapa hari khusus"""
+        rows = []
+        for year in range(self.start.year, self.end.year + 1):
+            for month, day, length, description in ((6, 20, 21, "Libur kenaikan kelas"),
+                                                    (12, 18, 14, "Libur semester ganjil")):
+                first = datetime.date(year, month, day)
+                rows.append((first.isoformat(), (first + datetime.timedelta(days=length - 1)).isoformat(),
+                             "libur", None, f"{description} {year}"))
+            for number in range(15):
+                date = datetime.date(year, 1, 1) + datetime.timedelta(days=self.rng.randrange(365))
+                rows.append((date.isoformat(), date.isoformat(), "libur", None, f"Libur nasional {year}-{number + 1}"))
+            for number in range(10):
+                date = datetime.date(year, 1, 1) + datetime.timedelta(days=self.rng.randrange(365))
+                rows.append((date.isoformat(), date.isoformat(), "khusus", self.rng.choice(DAYS[:6]),
+                             f"Hari khusus {year}-{number + 1}"))
+        rows.sort()
+        return rows
+
+    def _fire_history(self, schedules, exceptions, batch_size=50000):
+        """Batch catatan fire_log dari awal rentang sampai akhir, melewati hari libur"""
+        by_day = {day: [] for day in DAYS}
+        for day, time_str, path in schedules:
+            by_day[day].append((time_str, path))
+        holidays = set()
+        special = {}
+        for start, end, kind, plan_day, _ in exceptions:
+            date = datetime.date.fromisoformat(start)
+            while date <= datetime.date.fromisoformat(end):
+                if kind == "libur":
+                    holidays.add(date)
+                else:
+                    special[date] = plan_day
+                date += datetime.timedelta(days=1)
+        outcomes = [outcome for outcome, _ in OUTCOME_WEIGHTS]
+        weights = [weight for _, weight in OUTCOME_WEIGHTS]
+
+        batch = []
+        date = self.start
+        while date < self.end:
+            if date not in holidays:
+                day = special.get(date, DAYS[date.weekday()])
+                for time_str, path in by_day[day]:
+                    scheduled_at = datetime.datetime.combine(date, datetime.time.fromisoformat(time_str))
+                    outcome = self.rng.choices(outcomes, weights)[0]
+                    if outcome == OUTCOME_MISSED:
+                        fired_at = None
+                    elif outcome == OUTCOME_CATCHUP:
+                        fired_at = scheduled_at + datetime.timedelta(seconds=self.rng.randint(60, 600))
+                    else:
+                        fired_at = scheduled_at + datetime.timedelta(milliseconds=self.rng.randint(0, 1500))
+                    batch.append((scheduled_at.isoformat(sep=" ", timespec="seconds"),
+                                  fired_at.isoformat(sep=" ", timespec="seconds") if fired_at else None,
+                                  outcome, path))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+            date += datetime.timedelta(days=1)
+        if batch:
+            yield batch
+
+
+def generate(output_dir, seed=DEFAULT_SEED, **options) -> dict:
+    """Buat dataset sintetis di `output_dir`; lihat DatasetGenerator untuk opsi"""
+    return DatasetGenerator(seed, **options).generate(output_dir)
+
+
+def run_cli(argv) -> int:
+    """python dataset_generator.py <folder> [--seed N] [--schedules N] [--audio N] [--years N]
+                                   [--rules N] [--no-history]"""
+    args = list(argv)
+    options = {}
+    for flag, key in (("--seed", "seed"), ("--schedules", "schedules"), ("--audio", "audio_files"),
+                      ("--years", "years"), ("--rules", "rules")):
+        if flag in args:
+            index = args.index(flag)
+            options[key] = int(args[index + 1])
+            del args[index:index + 2]
+    if "--no-history" in args:
+        args.remove("--no-history")
+        options["history"] = False
+    if len(args) != 1:
+        print(run_cli.__doc__)
+        return 1
+    import logging
+    logging.getLogger("bell_sekolah").setLevel(logging.WARNING)
+    manifest = generate(args[0], **options)
+    for key, value in manifest.items():
+        print(f"{key:18s} {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(sys.argv[1:]))
@@ -0,0 +1,131 @@
+# fire_log.py
+import threading
+import datetime
+from constants import FIRE_LOG_BATCH_SIZE, FIRE_WINDOW_DAYS
+from logger import log_error
+from metrics import registry
+
+# Hasil pemutaran bel
+OUTCOME_PLAYED = "diputar"
+OUTCOME_CATCHUP = "susulan"
+OUTCOME_FAILED = "gagal"
+OUTCOME_MISSED = "terlewat"
+
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _iso(moment: datetime.datetime) -> str:
+    """Format waktu untuk kolom fire_log"""
+    return moment.isoformat(sep=" ", timespec="seconds")
+
+
+def _minute_index(moment: datetime.datetime) -> int:
+    """Nomor menit sejak 0001-01-01; jadwal bel selalu tepat di awal menit"""
+    return (moment.toordinal() * 24 + moment.hour) * 60 + moment.minute
+
+
+class FiredMinutes:
+    """Bitset ukuran tetap: satu bit per menit untuk jadwal yang sudah tercatat
+
+    Jendela mencakup `days` hari sampai menit tercatat terakhir dan disimpan
+    melingkar (indeks = menit mod ukuran), jadi mencatat menit baru hanya
+    menghapus bit menit yang keluar jendela. Memori tetap (1,6 KB untuk
+    9 hari) berapa lama pun aplikasi berjalan, dan cek maupun catat tidak
+    membuat objek baru. Jendela lebih panjang dari CATCHUP_MAX_DAYS, batas
+    mundur susulan, sehingga menit di luarnya tidak pernah ditanyakan.
+    """
+
+    def __init__(self, days: int = FIRE_WINDOW_DAYS):
+        self.size = days * MINUTES_PER_DAY
+        self._bits = bytearray(self.size // 8)
+        self.base = None  # Menit pertama di jendela
+
+    def __contains__(self, moment: datetime.datetime) -> bool:
+        minute = _minute_index(moment)
+        if self.base is None or not self.base <= minute < self.base + self.size:
+            return False
+        index = minute % self.size
+        return bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    @property
+    def nbytes(self) -> int:
+        """Ukuran bitset (byte), tetap sejak dibuat"""
+        return len(self._bits)
+
+    def __len__(self) -> int:
+        """Jumlah menit tercatat di jendela (untuk laporan, bukan jalur panas)"""
+        return bin(int.from_bytes(self._bits, "little")).count("1")
+
+    def add(self, moment: datetime.datetime) -> None:
+        minute = _minute_index(moment)
+        if self.base is None or minute < self.base:
+            # Awal, atau jam dimundurkan melewati jendela: mulai dari menit ini
+            self._bits = bytearray(len(self._bits))
+            self.base = minute - self.size + 1
+        elif minute >= self.base + self.size:
+            self._advance(minute - self.size + 1)
+        index = minute % self.size
+        self._bits[index >> 3] |= 1 << (index & 7)
+
+    def _advance(self, base: int) -> None:
+        """Geser awal jendela ke `base` dan hapus bit menit yang keluar"""
+        if base - self.base >= self.size:
+            self._bits = bytearray(len(self._bits))
+        else:
+            for minute in range(self.base, base):
+                index = minute % self.size
+                self._bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+        self.base = base
+
+
+class FireLog:
+    """Riwayat bel yang disimpan ke SQLite secara batch
+
+    Catatan dikumpulkan di memori lalu ditulis dengan satu `executemany`
+    saat `flush()` dipanggil (scheduler memanggilnya di akhir tiap tick)
+    atau saat antrian mencapai FIRE_LOG_BATCH_SIZE.
+    """
+
+    def __init__(self, data_manager, batch_size=FIRE_LOG_BATCH_SIZE):
+        self.data_manager = data_manager
+        self.batch_size = batch_size
+        self._pending = []
+        self._fired = FiredMinutes()  # Jadwal yang sudah tercatat
+        self._lock = threading.Lock()
+        registry.gauge_fn("fire_log_pending", "Catatan bel yang belum ditulis ke database",
+                          lambda: len(self._pending))
+
+    def load(self, since: datetime.datetime) -> None:
+        """Muat jadwal yang sudah tercatat sejak waktu tertentu"""
+        rows = self.data_manager.get_fire_records(_iso(since))
+        with self._lock:
+            for scheduled_at, _, _, _ in rows:
+                self._fired.add(datetime.datetime.fromisoformat(scheduled_at))
+
+    def has_fired(self, scheduled_at: datetime.datetime) -> bool:
+        """True jika jadwal ini sudah diputar atau sudah dicatat terlewat"""
+        return scheduled_at in self._fired
+
+    def record(self, scheduled_at: datetime.datetime, fired_at, outcome: str, audio_path: str) -> None:
+        """Catat hasil satu jadwal; ditulis ke database pada flush berikutnya"""
+        registry.counter("bell_fires_total", "Jadwal bel menurut hasil",
+                         {"outcome": outcome}).inc()
+        with self._lock:
+            self._fired.add(scheduled_at)
+            self._pending.append((_iso(scheduled_at), _iso(fired_at) if fired_at else None,
+                                  outcome, audio_path))
+            should_flush = len(self._pending) >= self.batch_size
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """Tulis semua catatan yang tertunda dalam satu transaksi"""
+        with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+        if not self.data_manager.add_fire_records(batch):
+            log_error(f"{len(batch)} catatan bel dikembalikan ke antrian")
+            with self._lock:
+                self._pending = batch + self._pending
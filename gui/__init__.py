@@ -1,4 +1,5 @@
 # gui/__init__.py
 from .main_window import SchoolBellApp
 from .tray_icon import TrayIcon
-from .components import ClockFace, ScheduleTable, StatusBar
\ No newline at end of file
+from .components import ClockFace, ScheduleTable, StatusBar
+from .dialogs import HolidayDialog, RecurrenceDialog, LatencyDialog, ChimeDialog, ConflictDialog
\ No newline at end of file
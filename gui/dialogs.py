@@ -0,0 +1,475 @@
+# gui/dialogs.py
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import os
+from datetime import datetime
+from data_manager import data_manager
+from latency import latency_tracker, export_latency_csv
+from logger import log_error
+from recurrence import RecurrenceRule, RULE_KINDS
+from conflicts import ConflictAnalyzer
+from chime import Chime, chime_library, chime_path, duration_ms, is_chime_path
+from mixer import PRIORITY_MANUAL
+from constants import AUDIO_DIR, DAYS, EXCEPTION_KINDS
+
+
+class HolidayDialog(tk.Toplevel):
+    """Dialog pengelolaan hari libur dan hari khusus"""
+
+    def __init__(self, parent, on_change=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.title("Kalender Libur & Hari Khusus")
+        self.geometry("640x400")
+        self.resizable(False, False)
+        self.transient(parent)
+        self.on_change = on_change
+
+        self._setup_ui()
+        self.load_exceptions()
+
+    def _setup_ui(self):
+        """Susun form input dan daftar pengecualian"""
+        form = tk.Frame(self, padx=10, pady=10)
+        form.pack(fill="x")
+
+        tk.Label(form, text="Mulai (YYYY-MM-DD):").grid(row=0, column=0, sticky="w")
+        self.start_var = tk.StringVar(value=datetime.now().strftime("%Y-%m-%d"))
+        tk.Entry(form, textvariable=self.start_var, width=12).grid(row=0, column=1, padx=(0, 10))
+
+        tk.Label(form, text="Selesai:").grid(row=0, column=2, sticky="w")
+        self.end_var = tk.StringVar(value=datetime.now().strftime("%Y-%m-%d"))
+        tk.Entry(form, textvariable=self.end_var, width=12).grid(row=0, column=3, padx=(0, 10))
+
+        tk.Label(form, text="Jenis:").grid(row=0, column=4, sticky="w")
+        self.kind_var = tk.StringVar(value=EXCEPTION_KINDS[0])
+        ttk.Combobox(form, textvariable=self.kind_var, values=EXCEPTION_KINDS,
+                     state="readonly", width=8).grid(row=0, column=5)
+
+        tk.Label(form, text="Pakai jadwal:").grid(row=1, column=0, sticky="w", pady=(8, 0))
+        self.plan_day_var = tk.StringVar(value=DAYS[0])
+        ttk.Combobox(form, textvariable=self.plan_day_var, values=DAYS,
+                     state="readonly", width=10).grid(row=1, column=1, pady=(8, 0))
+
+        tk.Label(form, text="Keterangan:").grid(row=1, column=2, sticky="w", pady=(8, 0))
+        self.desc_var = tk.StringVar()
+        tk.Entry(form, textvariable=self.desc_var, width=30).grid(
+            row=1, column=3, columnspan=3, sticky="we", pady=(8, 0))
+
+        buttons = tk.Frame(self, padx=10)
+        buttons.pack(fill="x")
+        tk.Button(buttons, text="Tambah", command=self.add_exception).pack(side="left")
+        tk.Button(buttons, text="Hapus Terpilih", command=self.delete_selected).pack(side="left", padx=10)
+
+        columns = ("mulai", "selesai", "jenis", "jadwal", "keterangan")
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=12)
+        for col, width in zip(columns, (90, 90, 70, 80, 260)):
+            self.tree.heading(col, text=col.capitalize())
+            self.tree.column(col, width=width, anchor="w")
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+    def load_exceptions(self):
+        """Muat ulang daftar pengecualian dari database"""
+        self.tree.delete(*self.tree.get_children())
+        for exc_id, start, end, kind, plan_day, desc in data_manager.get_date_exceptions():
+            self.tree.insert("", "end", iid=str(exc_id),
+                             values=(start, end, kind, plan_day or "-", desc or ""))
+
+    def add_exception(self):
+        """Validasi input lalu simpan pengecualian baru"""
+        try:
+            start = self.start_var.get().strip()
+            end = self.end_var.get().strip() or start
+            try:
+                datetime.strptime(start, "%Y-%m-%d")
+                datetime.strptime(end, "%Y-%m-%d")
+            except ValueError:
+                messagebox.showerror("Format Tanggal Salah",
+                                     "Format tanggal harus YYYY-MM-DD", parent=self)
+                return
+
+            kind = self.kind_var.get()
+            plan_day = self.plan_day_var.get() if kind == "khusus" else None
+            if data_manager.add_date_exception(start, end, kind, plan_day, self.desc_var.get().strip()):
+                self.load_exceptions()
+                if self.on_change:
+                    self.on_change()
+            else:
+                messagebox.showerror("Error", "Gagal menyimpan. Cek log untuk detail.", parent=self)
+        except Exception as e:
+            log_error(f"Gagal tambah pengecualian: {e}")
+            messagebox.showerror("Error", f"Gagal menambahkan:\n{str(e)}", parent=self)
+
+    def delete_selected(self):
+        """Hapus pengecualian yang dipilih di daftar"""
+        for iid in self.tree.selection():
+            data_manager.delete_date_exception(int(iid))
+        self.load_exceptions()
+        if self.on_change:
+            self.on_change()
+
+
+class RecurrenceDialog(tk.Toplevel):
+    """Dialog pengelolaan aturan jadwal berulang"""
+
+    def __init__(self, parent, audio_files, on_change=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.title("Jadwal Berulang")
+        self.geometry("760x420")
+        self.resizable(False, False)
+        self.transient(parent)
+        self.audio_files = audio_files
+        self.on_change = on_change
+
+        self._setup_ui()
+        self.load_rules()
+
+    def _setup_ui(self):
+        """Susun form input dan daftar aturan"""
+        form = tk.Frame(self, padx=10, pady=10)
+        form.pack(fill="x")
+
+        tk.Label(form, text="Jenis:").grid(row=0, column=0, sticky="w")
+        self.kind_var = tk.StringVar(value=RULE_KINDS[0])
+        ttk.Combobox(form, textvariable=self.kind_var, values=RULE_KINDS,
+                     state="readonly", width=9).grid(row=0, column=1, padx=(0, 10))
+
+        tk.Label(form, text="Hari:").grid(row=0, column=2, sticky="w")
+        self.day_var = tk.StringVar(value=DAYS[0])
+        ttk.Combobox(form, textvariable=self.day_var, values=DAYS,
+                     state="readonly", width=9).grid(row=0, column=3, padx=(0, 10))
+
+        tk.Label(form, text="Mulai:").grid(row=0, column=4, sticky="w")
+        self.start_var = tk.StringVar(value="07:00")
+        tk.Entry(form, textvariable=self.start_var, width=6).grid(row=0, column=5, padx=(0, 10))
+
+        tk.Label(form, text="Selesai:").grid(row=0, column=6, sticky="w")
+        self.end_var = tk.StringVar(value="14:00")
+        tk.Entry(form, textvariable=self.end_var, width=6).grid(row=0, column=7, padx=(0, 10))
+
+        tk.Label(form, text="Tiap (menit):").grid(row=0, column=8, sticky="w")
+        self.interval_var = tk.StringVar(value="45")
+        tk.Entry(form, textvariable=self.interval_var, width=4).grid(row=0, column=9)
+
+        tk.Label(form, text="Tiap N minggu:").grid(row=1, column=0, sticky="w", pady=(8, 0))
+        self.week_var = tk.StringVar(value="2")
+        tk.Entry(form, textvariable=self.week_var, width=4).grid(row=1, column=1, sticky="w", pady=(8, 0))
+
+        tk.Label(form, text="Acuan:").grid(row=1, column=2, sticky="w", pady=(8, 0))
+        self.anchor_var = tk.StringVar(value=datetime.now().strftime("%Y-%m-%d"))
+        tk.Entry(form, textvariable=self.anchor_var, width=11).grid(row=1, column=3, pady=(8, 0))
+
+        tk.Label(form, text="Ke- (bulan):").grid(row=1, column=4, sticky="w", pady=(8, 0))
+        self.nth_var = tk.StringVar(value="1")
+        tk.Entry(form, textvariable=self.nth_var, width=4).grid(row=1, column=5, sticky="w", pady=(8, 0))
+
+        tk.Label(form, text="Audio:").grid(row=1, column=6, sticky="w", pady=(8, 0))
+        self.audio_var = tk.StringVar(value=self.audio_files[0] if self.audio_files else "")
+        ttk.Combobox(form, textvariable=self.audio_var, values=self.audio_files,
+                     state="readonly", width=24).grid(row=1, column=7, columnspan=3, pady=(8, 0))
+
+        buttons = tk.Frame(self, padx=10)
+        buttons.pack(fill="x")
+        tk.Button(buttons, text="Tambah", command=self.add_rule).pack(side="left")
+        tk.Button(buttons, text="Hapus Terpilih", command=self.delete_selected).pack(side="left", padx=10)
+
+        columns = ("jenis", "hari", "jam", "pola", "audio")
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=12)
+        for col, width in zip(columns, (80, 80, 110, 170, 270)):
+            self.tree.heading(col, text=col.capitalize())
+            self.tree.column(col, width=width, anchor="w")
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+    def load_rules(self):
+        """Muat ulang daftar aturan dari database"""
+        self.tree.delete(*self.tree.get_children())
+        for rule in data_manager.get_recurrence_rules():
+            hours = rule.start_time
+            if rule.interval_minutes:
+                hours = f"{rule.start_time}-{rule.end_time}"
+            pattern = []
+            if rule.interval_minutes:
+                pattern.append(f"tiap {rule.interval_minutes} menit")
+            if rule.kind == "mingguan":
+                pattern.append(f"tiap {rule.week_interval} minggu")
+            if rule.kind == "bulanan":
+                pattern.append("terakhir" if rule.nth == -1 else f"ke-{rule.nth}")
+            self.tree.insert("", "end", iid=str(rule.id),
+                             values=(rule.kind, rule.day, hours, ", ".join(pattern),
+                                     os.path.basename(rule.audio_path)))
+
+    def add_rule(self):
+        """Bangun aturan dari form lalu simpan"""
+        try:
+            kind = self.kind_var.get()
+            interval = self.interval_var.get().strip()
+            rule = RecurrenceRule(
+                None, kind, self.day_var.get(), self.start_var.get().strip(),
+                self.end_var.get().strip() if interval else None,
+                int(interval) if interval else None,
+                int(self.week_var.get()) if kind == "mingguan" else 1,
+                self.anchor_var.get().strip() if kind == "mingguan" else None,
+                int(self.nth_var.get()) if kind == "bulanan" else None,
+                self._audio_path(self.audio_var.get())
+            )
+            rule.validate()
+        except ValueError as e:
+            messagebox.showerror("Input Tidak Valid", str(e), parent=self)
+            return
+
+        if data_manager.add_recurrence_rule(rule):
+            self.load_rules()
+            if self.on_change:
+                self.on_change()
+        else:
+            messagebox.showerror("Error", "Gagal menyimpan. Cek log untuk detail.", parent=self)
+
+    def _audio_path(self, value):
+        """Path audio dari pilihan combobox; chime disimpan apa adanya"""
+        return value if is_chime_path(value) else os.path.join(AUDIO_DIR, value)
+
+    def delete_selected(self):
+        """Hapus aturan yang dipilih di daftar"""
+        for iid in self.tree.selection():
+            data_manager.delete_recurrence_rule(int(iid))
+        self.load_rules()
+        if self.on_change:
+            self.on_change()
+
+
+class LatencyDialog(tk.Toplevel):
+    """Dialog statistik keterlambatan bel per tahap"""
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.title("Statistik Latensi Bel")
+        self.geometry("620x420")
+        self.resizable(False, False)
+        self.transient(parent)
+
+        self._setup_ui()
+        self.refresh()
+
+    def _setup_ui(self):
+        """Susun tabel hari ini, riwayat harian dan tombol ekspor"""
+        columns = ("tanggal", "tahap", "jumlah", "p50", "p95", "p99", "max")
+        tk.Label(self, text="Latensi dari waktu terjadwal (ms)", font=("Arial", 10, "bold")).pack(
+            anchor="w", padx=10, pady=(10, 0))
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=15)
+        for col, width in zip(columns, (90, 110, 60, 80, 80, 80, 80)):
+            self.tree.heading(col, text=col.capitalize())
+            self.tree.column(col, width=width, anchor="w")
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        buttons = tk.Frame(self, padx=10)
+        buttons.pack(fill="x", pady=(0, 10))
+        tk.Button(buttons, text="Muat Ulang", command=self.refresh).pack(side="left")
+        tk.Button(buttons, text="Ekspor CSV", command=self.export_csv).pack(side="left", padx=10)
+
+    def refresh(self):
+        """Tampilkan histogram hari ini lalu ringkasan harian tersimpan"""
+        self.tree.delete(*self.tree.get_children())
+        today = datetime.now().strftime("%Y-%m-%d")
+        for stage, stats in latency_tracker.summary().items():
+            self.tree.insert("", "end", values=(
+                f"{today} *", stage, stats["count"], f"{stats['p50']:.1f}",
+                f"{stats['p95']:.1f}", f"{stats['p99']:.1f}", f"{stats['max']:.1f}"))
+        for date, stage, count, p50, p95, p99, max_ms in data_manager.get_latency_daily():
+            if date == today:
+                continue
+            self.tree.insert("", "end", values=(
+                date, stage, count, f"{p50:.1f}", f"{p95:.1f}", f"{p99:.1f}", f"{max_ms:.1f}"))
+
+    def export_csv(self):
+        """Simpan riwayat latensi ke file CSV pilihan pengguna"""
+        latency_tracker.flush(data_manager)
+        path = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".csv", filetypes=[("CSV files", "*.csv")],
+            initialfile=f"latensi_bel_{datetime.now():%Y%m%d}.csv")
+        if not path:
+            return
+        if export_latency_csv(data_manager, path):
+            messagebox.showinfo("Sukses", f"Statistik diekspor ke:\n{path}", parent=self)
+        else:
+            messagebox.showerror("Error", "Gagal ekspor. Cek log untuk detail.", parent=self)
+
+
+class ChimeDialog(tk.Toplevel):
+    """Dialog pengelolaan chime sintetis"""
+
+    def __init__(self, parent, audio_player, on_change=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.title("Chime Sintetis")
+        self.geometry("720x420")
+        self.resizable(False, False)
+        self.transient(parent)
+        self.audio_player = audio_player
+        self.on_change = on_change
+
+        self._setup_ui()
+        self.load_chimes()
+
+    def _setup_ui(self):
+        """Susun form input dan daftar chime"""
+        form = tk.Frame(self, padx=10, pady=10)
+        form.pack(fill="x")
+
+        tk.Label(form, text="Nama:").grid(row=0, column=0, sticky="w")
+        self.name_var = tk.StringVar()
+        tk.Entry(form, textvariable=self.name_var, width=16).grid(row=0, column=1, padx=(0, 10))
+
+        tk.Label(form, text="Nada:").grid(row=0, column=2, sticky="w")
+        self.notes_var = tk.StringVar(value="E5:600 C5:900")
+        tk.Entry(form, textvariable=self.notes_var, width=40).grid(row=0, column=3, columnspan=7, sticky="w")
+
+        tk.Label(form, text="Attack (ms):").grid(row=1, column=0, sticky="w", pady=(8, 0))
+        self.attack_var = tk.StringVar(value="5")
+        tk.Entry(form, textvariable=self.attack_var, width=5).grid(row=1, column=1, sticky="w", pady=(8, 0))
+
+        tk.Label(form, text="Decay (ms):").grid(row=1, column=2, sticky="w", pady=(8, 0))
+        self.decay_var = tk.StringVar(value="400")
+        tk.Entry(form, textvariable=self.decay_var, width=5).grid(row=1, column=3, sticky="w", pady=(8, 0))
+
+        tk.Label(form, text="Ulang:").grid(row=1, column=4, sticky="w", pady=(8, 0))
+        self.repeats_var = tk.StringVar(value="1")
+        tk.Entry(form, textvariable=self.repeats_var, width=3).grid(row=1, column=5, padx=(0, 10), pady=(8, 0))
+
+        tk.Label(form, text="Jeda (ms):").grid(row=1, column=6, sticky="w", pady=(8, 0))
+        self.gap_var = tk.StringVar(value="500")
+        tk.Entry(form, textvariable=self.gap_var, width=5).grid(row=1, column=7, padx=(0, 10), pady=(8, 0))
+
+        tk.Label(form, text="Volume:").grid(row=1, column=8, sticky="w", pady=(8, 0))
+        self.volume_var = tk.StringVar(value="0.8")
+        tk.Entry(form, textvariable=self.volume_var, width=4).grid(row=1, column=9, pady=(8, 0))
+
+        tk.Label(form, text="Format nada: NADA:DURASI_MS, mis. A4:500 C#5:300, '-' untuk diam",
+                 fg="gray").grid(row=2, column=0, columnspan=10, sticky="w", pady=(6, 0))
+
+        buttons = tk.Frame(self, padx=10)
+        buttons.pack(fill="x")
+        tk.Button(buttons, text="Simpan", command=self.save_chime).pack(side="left")
+        tk.Button(buttons, text="Hapus Terpilih", command=self.delete_selected).pack(side="left", padx=10)
+        tk.Button(buttons, text="▶ Coba", command=self.preview).pack(side="left")
+
+        columns = ("nama", "nada", "ulang", "durasi")
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=12)
+        for col, width in zip(columns, (140, 370, 60, 80)):
+            self.tree.heading(col, text=col.capitalize())
+            self.tree.column(col, width=width, anchor="w")
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+
+    def load_chimes(self):
+        """Muat ulang daftar chime dari database"""
+        self.tree.delete(*self.tree.get_children())
+        for chime in data_manager.get_chimes():
+            self.tree.insert("", "end", iid=str(chime.id),
+                             values=(chime.name, chime.notes, chime.repeats,
+                                     f"{duration_ms(chime) / 1000:.1f} s"))
+
+    def on_select(self, event=None):
+        """Isi form dengan chime yang dipilih agar bisa diubah"""
+        selection = self.tree.selection()
+        if not selection:
+            return
+        name = self.tree.item(selection[0], "values")[0]
+        chime = data_manager.get_chime(name)
+        if chime is None:
+            return
+        self.name_var.set(chime.name)
+        self.notes_var.set(chime.notes)
+        self.attack_var.set(str(chime.attack_ms))
+        self.decay_var.set(str(chime.decay_ms))
+        self.repeats_var.set(str(chime.repeats))
+        self.gap_var.set(str(chime.gap_ms))
+        self.volume_var.set(str(chime.volume))
+
+    def _chime_from_form(self):
+        chime = Chime(None, self.name_var.get().strip(), self.notes_var.get().strip(),
+                      int(self.attack_var.get()), int(self.decay_var.get()),
+                      int(self.repeats_var.get()), int(self.gap_var.get()),
+                      float(self.volume_var.get()))
+        chime.validate()
+        return chime
+
+    def save_chime(self):
+        """Simpan chime dari form (nama yang sama ditimpa)"""
+        try:
+            chime = self._chime_from_form()
+        except ValueError as e:
+            messagebox.showerror("Input Tidak Valid", str(e), parent=self)
+            return
+
+        if data_manager.add_chime(chime):
+            chime_library.prune(data_manager.get_chimes())
+            self.load_chimes()
+            if self.on_change:
+                self.on_change()
+        else:
+            messagebox.showerror("Error", "Gagal menyimpan. Cek log untuk detail.", parent=self)
+
+    def delete_selected(self):
+        """Hapus chime yang dipilih di daftar"""
+        for iid in self.tree.selection():
+            data_manager.delete_chime(int(iid))
+        chime_library.prune(data_manager.get_chimes())
+        self.load_chimes()
+        if self.on_change:
+            self.on_change()
+
+    def preview(self):
+        """Putar chime yang dipilih di daftar"""
+        selection = self.tree.selection()
+        if not selection:
+            messagebox.showwarning("Peringatan", "Pilih chime di daftar dulu!", parent=self)
+            return
+        name = self.tree.item(selection[0], "values")[0]
+        self.audio_player.play_audio(chime_path(name), priority=PRIORITY_MANUAL)
+
+
+class ConflictDialog(tk.Toplevel):
+    """Dialog hasil analisis tumpang tindih jadwal"""
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.title("Cek Konflik Jadwal")
+        self.geometry("760x420")
+        self.resizable(False, False)
+        self.transient(parent)
+
+        self._setup_ui()
+        self.refresh()
+
+    def _setup_ui(self):
+        """Susun tabel temuan dan tombol muat ulang"""
+        self.summary_var = tk.StringVar()
+        tk.Label(self, textvariable=self.summary_var, font=("Arial", 10, "bold")).pack(
+            anchor="w", padx=10, pady=(10, 0))
+
+        columns = ("jenis", "hari", "jam", "audio", "bentrok", "keterangan")
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=15)
+        for col, width in zip(columns, (80, 70, 60, 170, 170, 190)):
+            self.tree.heading(col, text=col.capitalize())
+            self.tree.column(col, width=width, anchor="w")
+        self.tree.tag_configure("error", foreground="#c0392b")
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        buttons = tk.Frame(self, padx=10)
+        buttons.pack(fill="x", pady=(0, 10))
+        tk.Button(buttons, text="Muat Ulang", command=self.refresh).pack(side="left")
+
+    def refresh(self):
+        """Jalankan analisis ulang dan tampilkan temuan"""
+        self.tree.delete(*self.tree.get_children())
+        issues = ConflictAnalyzer(data_manager).analyze()
+        for issue in issues:
+            other = ""
+            if issue.other is not None:
+                other = f"{issue.other.time} {os.path.basename(issue.other.path)}"
+            self.tree.insert("", "end", tags=("error",) if issue.is_error else (), values=(
+                issue.kind, issue.slot.day, issue.slot.time, os.path.basename(issue.slot.path),
+                other, issue.detail))
+        errors = sum(1 for issue in issues if issue.is_error)
+        if issues:
+            self.summary_var.set(f"{len(issues)} temuan, {errors} perlu diperbaiki")
+        else:
+            self.summary_var.set("Tidak ada konflik jadwal")
@@ -2,7 +2,6 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-import shutil
 import threading
 from datetime import datetime
 import math
@@ -10,10 +9,27 @@ import sys
 import pygame
 from data_manager import data_manager
 from audio_player import AudioPlayer
+from mixer import PRIORITY_MANUAL
+from chime import chime_path, is_chime_path
+from conflicts import ConflictAnalyzer
 from logger import log_error, log_info
-from constants import AUDIO_DIR, AUDIO_FORMATS, DAYS, ASSETS_DIR
+from metrics import MetricsServer
+from api_server import ApiServer
+from replication import ReplicationPublisher, ReplicaSync
+from clock_sync import ClockSyncServer, clock_sync
+from streaming import AnnouncementSender, StreamReceiver
+from single_instance import COMMAND_SHOW, COMMAND_RING, COMMAND_RELOAD
+from pcm_cache import pcm_cache
+from ingest import audio_ingest
+from loudness import loudness
+from watchdog import supervisor
+from constants import (
+    AUDIO_DIR, AUDIO_FORMATS, DAYS, ASSETS_DIR, METRICS_HOST, METRICS_PORT, API_HOST, API_PORT,
+    CLOCK_SYNC_PORT, STREAM_PORT, SCHEDULER_STALL_DEADLINE, AUDIO_STALL_DEADLINE
+)
 from utils import resource_path
 from .components import ClockFace, ScheduleTable, StatusBar
+from .dialogs import HolidayDialog, RecurrenceDialog, LatencyDialog, ChimeDialog, ConflictDialog
 
 class SchoolBellApp:
     def __init__(self, root):
@@ -42,14 +58,88 @@ class SchoolBellApp:
         # Variables
         self.audio_path = tk.StringVar()
         self.path_display_var = tk.StringVar()
+        self._conflict_run = 0  # Nomor analisis konflik terbaru; hasil yang lebih lama dibuang
         
-        # Audio player
-        self.audio_player = AudioPlayer()
+        # Audio player; "proses" = engine terisolasi di proses terpisah
+        if data_manager.get_setting("audio_engine") == "proses":
+            from audio_engine import AudioEngine
+            self.audio_player = AudioEngine()
+        else:
+            self.audio_player = AudioPlayer()
+        
+        # Penyelarasan jam antar PC: "referensi" menjawab probe UDP, "klien"
+        # menjalankan scheduler dengan jam yang dikoreksi ke clock_reference
+        self.clock_server = None
+        clock_role = data_manager.get_setting("clock_role")
+        if clock_role == "referensi":
+            self.clock_server = ClockSyncServer(
+                port=int(data_manager.get_setting("clock_port") or CLOCK_SYNC_PORT))
+            self.clock_server.start()
+        elif clock_role == "klien" and data_manager.get_setting("clock_reference"):
+            clock_sync.start(data_manager.get_setting("clock_reference"))
         
         # Inisialisasi scheduler
         from scheduler import BellScheduler
         self.scheduler = BellScheduler(self.audio_player)
         
+        # Watchdog untuk scheduler dan audio; tray didaftarkan setelah dibuat
+        supervisor.register(
+            "scheduler", self.scheduler.restart, deadline=SCHEDULER_STALL_DEADLINE,
+            is_alive=lambda: self.scheduler.thread.is_alive()
+        )
+        supervisor.register(
+            "audio", self.audio_player.reset, deadline=AUDIO_STALL_DEADLINE,
+            is_active=lambda: self.audio_player.currently_playing
+        )
+        supervisor.start()
+        
+        # Endpoint metrik lokal (format Prometheus)
+        self.metrics_server = None
+        if data_manager.get_setting("metrics_enabled") != "0":
+            port = int(data_manager.get_setting("metrics_port") or METRICS_PORT)
+            self.metrics_server = MetricsServer(METRICS_HOST, port)
+            self.metrics_server.start()
+        
+        # Replikasi jadwal antar PC: "primary" menyajikan delta lewat API kontrol,
+        # "replica" menarik delta dari replication_primary
+        role = data_manager.get_setting("replication_role")
+        publisher = ReplicationPublisher(data_manager) if role == "primary" else None
+        if publisher and data_manager.get_setting("api_enabled") != "1":
+            log_error("Replikasi primary membutuhkan api_enabled = 1")
+        self.replica_sync = None
+        if role == "replica" and data_manager.get_setting("replication_primary"):
+            self.replica_sync = ReplicaSync(
+                data_manager, data_manager.get_setting("replication_primary"),
+                token=data_manager.get_setting("replication_token")
+            )
+            self.replica_sync.start()
+        
+        # API kontrol HTTP/JSON (nonaktif kecuali api_enabled = 1)
+        self.api_server = None
+        if data_manager.get_setting("api_enabled") == "1":
+            self.api_server = ApiServer(
+                data_manager, self.audio_player,
+                host=data_manager.get_setting("api_host") or API_HOST,
+                port=int(data_manager.get_setting("api_port") or API_PORT),
+                token=data_manager.get_setting("api_token"),
+                publisher=publisher
+            )
+            self.api_server.start()
+        
+        # Penerima siaran pengumuman dari PC kantor (nonaktif kecuali stream_enabled = 1)
+        self.stream_receiver = None
+        if data_manager.get_setting("stream_enabled") == "1":
+            if hasattr(self.audio_player, "play_stream"):
+                self.stream_receiver = StreamReceiver(
+                    self.audio_player,
+                    host=data_manager.get_setting("stream_host") or "0.0.0.0",
+                    port=int(data_manager.get_setting("stream_port") or STREAM_PORT),
+                    token=data_manager.get_setting("stream_token")
+                )
+                self.stream_receiver.start()
+            else:
+                log_error("Siaran membutuhkan audio_engine selain 'proses'")
+        
         # Setup UI
         self._setup_ui()
         
@@ -197,6 +287,16 @@ class SchoolBellApp:
             fg="#ecf0f1"
         )
         version_label.pack(side="right", padx=20, pady=15)
+        
+        latency_btn = self._create_styled_button(
+            header_frame, "📊 Latensi", self.secondary_color, self.open_latency_dialog
+        )
+        latency_btn.pack(side="right", pady=18)
+        
+        conflict_btn = self._create_styled_button(
+            header_frame, "⚠ Konflik", self.warning_color, self.open_conflict_dialog
+        )
+        conflict_btn.pack(side="right", padx=(0, 10), pady=18)
 
         # Main container
         main_container = tk.Frame(self.root, bg=self.bg_color)
@@ -252,6 +352,13 @@ class SchoolBellApp:
         self.mp3_combobox.grid(row=0, column=5, padx=(0, 10))
         self.mp3_combobox.bind("<<ComboboxSelected>>", self.on_combobox_select)
         
+        tk.Label(row1, text="Gain (dB):", font=("Arial", 10), bg=self.white_color, fg=self.text_color).grid(row=0, column=6, sticky="w", padx=(0, 5))
+        
+        # Kosong = pakai gain hasil analisis loudness
+        self.gain_var = tk.StringVar(value="")
+        gain_entry = tk.Entry(row1, textvariable=self.gain_var, width=6, font=("Arial", 10))
+        gain_entry.grid(row=0, column=7)
+        
         # Row 2 - Buttons
         row2 = tk.Frame(card_content, bg=self.white_color)
         row2.pack(fill="x")
@@ -272,6 +379,26 @@ class SchoolBellApp:
         )
         self.add_btn.pack(side="left")
         
+        self.holiday_btn = self._create_styled_button(
+            row2, "📅 Hari Libur", self.info_color, self.open_holiday_dialog
+        )
+        self.holiday_btn.pack(side="left", padx=(10, 0))
+        
+        self.recurrence_btn = self._create_styled_button(
+            row2, "🔁 Berulang", self.warning_color, self.open_recurrence_dialog
+        )
+        self.recurrence_btn.pack(side="left", padx=(10, 0))
+        
+        self.chime_btn = self._create_styled_button(
+            row2, "🎵 Chime", self.secondary_color, self.open_chime_dialog
+        )
+        self.chime_btn.pack(side="left", padx=(10, 0))
+        
+        self.broadcast_btn = self._create_styled_button(
+            row2, "📢 Siaran", self.danger_color, self.broadcast_audio
+        )
+        self.broadcast_btn.pack(side="left", padx=(10, 0))
+        
         # Right panel - Clock (no background card)
         clock_frame = tk.Frame(top_section, bg=self.bg_color, width=180, height=180)
         clock_frame.pack(side="right", fill="none")
@@ -418,13 +545,17 @@ class SchoolBellApp:
                 audio_files.extend([f for f in os.listdir(AUDIO_DIR) if f.lower().endswith(ext)])
             
             audio_files.sort()
+            # Chime sintetis ikut dipilih seperti file audio biasa
+            audio_files.extend(chime_path(chime.name) for chime in data_manager.get_chimes())
             self.mp3_combobox['values'] = audio_files
             
+            # Decode dan analisis loudness file baru di latar belakang
+            threading.Thread(target=self._prepare_audio_library, daemon=True).start()
+            
             if audio_files:
                 self.mp3_combobox.current(0)
                 selected_file = audio_files[0]
-                full_path = os.path.join(AUDIO_DIR, selected_file)
-                self.audio_path.set(full_path)
+                self.audio_path.set(self._audio_full_path(selected_file))
                 self.path_display_var.set(selected_file)
                 self.play_button.config(state="normal")
             else:
@@ -436,19 +567,30 @@ class SchoolBellApp:
             log_error(f"Gagal load audio files: {e}")
             messagebox.showerror("Error", f"Gagal memuat file audio:\n{str(e)}")
 
+    def _prepare_audio_library(self):
+        """Siapkan cache PCM dan gain loudness untuk semua file audio"""
+        try:
+            pcm_cache.warm_library()
+            loudness.analyze_library()
+        except Exception as e:
+            log_error(f"Gagal menyiapkan pustaka audio: {e}")
+
     def on_combobox_select(self, event=None):
         """Saat file dipilih dari combobox"""
         try:
             filename = self.mp3_combobox.get()
             if filename:
-                full_path = os.path.join(AUDIO_DIR, filename)
-                self.audio_path.set(full_path)
+                self.audio_path.set(self._audio_full_path(filename))
                 self.path_display_var.set(filename)
                 self.play_button.config(state="normal")
         except Exception as e:
             log_error(f"Gagal pilih file: {e}")
             messagebox.showerror("Error", f"Gagal memilih file:\n{str(e)}")
 
+    def _audio_full_path(self, value):
+        """Path audio dari pilihan combobox; chime disimpan apa adanya"""
+        return value if is_chime_path(value) else os.path.join(AUDIO_DIR, value)
+
     def upload_audio(self):
         """Upload file audio dari luar ke folder audio/"""
         try:
@@ -457,25 +599,37 @@ class SchoolBellApp:
             if not path:
                 return
             
-            filename = os.path.basename(path)
-            dest_path = os.path.join(AUDIO_DIR, filename)
-            
-            os.makedirs(AUDIO_DIR, exist_ok=True)
+            dest_path = audio_ingest.target_path(path)
+            filename = os.path.basename(dest_path)
+
             if os.path.exists(dest_path):
                 if not messagebox.askyesno("Timpa?", f"File '{filename}' sudah ada. Timpa?"):
                     return
-            
-            shutil.copy2(path, dest_path)
-            messagebox.showinfo("Sukses", f"File berhasil di-upload ke folder 'audio'.")
-            self.load_audio_files()  # Refresh combobox
-            
-            # Pilih file yang baru di-upload
-            idx = self.mp3_combobox['values'].index(filename)
-            self.mp3_combobox.current(idx)
-            self.on_combobox_select()
+
+            # Transcode ke format mixer di proses terpisah agar GUI tetap responsif
+            self.upload_btn.config(state="disabled", text="⏳ Memproses...")
+            audio_ingest.submit(path, on_done=lambda result: self.root.after(0, self._on_upload_done, result))
         except Exception as e:
             log_error(f"Gagal upload file: {e}")
             messagebox.showerror("Error", f"Gagal upload file:\n{str(e)}")
+            self.upload_btn.config(state="normal", text="📁 Upload Audio")
+
+    def _on_upload_done(self, result):
+        """Dipanggil di thread GUI setelah file upload selesai diproses"""
+        self.upload_btn.config(state="normal", text="📁 Upload Audio")
+        if not result.ok:
+            messagebox.showerror("Error", f"Gagal upload file:\n{result.error}")
+            return
+
+        messagebox.showinfo("Sukses", f"File berhasil di-upload ke folder 'audio'.\n{result.summary()}")
+        self.load_audio_files()  # Refresh combobox
+
+        # Pilih file yang baru di-upload
+        filename = os.path.basename(result.path)
+        if filename in self.mp3_combobox['values']:
+            idx = self.mp3_combobox['values'].index(filename)
+            self.mp3_combobox.current(idx)
+            self.on_combobox_select()
 
     def play_audio(self):
         """Putar file audio yang dipilih"""
@@ -485,7 +639,7 @@ class SchoolBellApp:
                 messagebox.showwarning("Peringatan", "Belum ada file audio yang dipilih.")
                 return
             
-            if not os.path.exists(path):
+            if not is_chime_path(path) and not os.path.exists(path):
                 messagebox.showerror("Error", f"File tidak ditemukan:\n{path}")
                 return
             
@@ -507,7 +661,7 @@ class SchoolBellApp:
     def _play_audio_thread(self, path):
         """Putar audio di thread terpisah"""
         try:
-            success = self.audio_player.play_audio(path, blocking=True)
+            success = self.audio_player.play_audio(path, blocking=True, priority=PRIORITY_MANUAL)
             
             # Kembalikan state tombol play
             self.root.after(0, lambda: self.play_button.config(
@@ -546,8 +700,17 @@ class SchoolBellApp:
                 messagebox.showerror("Format Waktu Salah", "Format waktu harus HH:MM (contoh: 07:30)")
                 return
             
+            # Validasi gain (opsional)
+            gain_db = None
+            if self.gain_var.get().strip():
+                try:
+                    gain_db = float(self.gain_var.get().strip().replace(",", "."))
+                except ValueError:
+                    messagebox.showerror("Gain Salah", "Gain harus berupa angka dB (contoh: -6)")
+                    return
+            
             # Tambah ke database
-            if data_manager.add_schedule(day, time_str, path):
+            if data_manager.add_schedule(day, time_str, path, gain_db):
                 messagebox.showinfo("Sukses", f"Jadwal berhasil ditambahkan:\n{day} {time_str}")
                 self.load_schedule()  # Refresh tabel
             else:
@@ -556,6 +719,84 @@ class SchoolBellApp:
             log_error(f"Gagal tambah jadwal: {e}")
             messagebox.showerror("Error", f"Gagal menambahkan jadwal:\n{str(e)}")
 
+    def broadcast_audio(self):
+        """Siarkan file audio terpilih ke PC gedung (setting stream_targets)"""
+        try:
+            path = self.audio_path.get()
+            if not path:
+                messagebox.showwarning("Peringatan", "Belum ada file audio yang dipilih.")
+                return
+            targets = [t for t in (data_manager.get_setting("stream_targets") or "").split(",") if t.strip()]
+            if not targets:
+                messagebox.showwarning("Peringatan", "Setting stream_targets (host:port PC gedung) belum diisi.")
+                return
+            sender = AnnouncementSender(targets, token=data_manager.get_setting("stream_token"))
+            self.broadcast_btn.config(state="disabled", text="⏳ Menyiarkan...")
+
+            def run():
+                try:
+                    result = sender.send_file(path)
+                except Exception as e:
+                    log_error(f"Gagal menyiarkan {path}: {e}")
+                    result = {"error": str(e)}
+                self.root.after(0, self._on_broadcast_done, result)
+
+            threading.Thread(target=run, daemon=True).start()
+        except Exception as e:
+            log_error(f"Gagal memulai siaran: {e}")
+            messagebox.showerror("Error", f"Gagal memulai siaran:\n{str(e)}")
+
+    def _on_broadcast_done(self, result):
+        """Dipanggil di thread GUI setelah siaran selesai dikirim"""
+        self.broadcast_btn.config(state="normal", text="📢 Siaran")
+        if "error" in result:
+            messagebox.showerror("Error", f"Gagal menyiarkan:\n{result['error']}")
+        elif result["completed"] < result["targets"]:
+            messagebox.showwarning("Siaran", f"Siaran hanya sampai ke {result['completed']} dari "
+                                             f"{result['targets']} PC gedung.")
+        else:
+            messagebox.showinfo("Siaran", f"Siaran terkirim ke {result['targets']} PC gedung.")
+
+    def open_holiday_dialog(self):
+        """Buka dialog kalender libur dan hari khusus"""
+        try:
+            HolidayDialog(self.root, on_change=self.load_schedule)
+        except Exception as e:
+            log_error(f"Gagal membuka kalender libur: {e}")
+            messagebox.showerror("Error", f"Gagal membuka kalender libur:\n{str(e)}")
+
+    def open_recurrence_dialog(self):
+        """Buka dialog aturan jadwal berulang"""
+        try:
+            RecurrenceDialog(self.root, list(self.mp3_combobox['values']), on_change=self.load_schedule)
+        except Exception as e:
+            log_error(f"Gagal membuka jadwal berulang: {e}")
+            messagebox.showerror("Error", f"Gagal membuka jadwal berulang:\n{str(e)}")
+
+    def open_chime_dialog(self):
+        """Buka dialog chime sintetis"""
+        try:
+            ChimeDialog(self.root, self.audio_player, on_change=self.load_audio_files)
+        except Exception as e:
+            log_error(f"Gagal membuka dialog chime: {e}")
+            messagebox.showerror("Error", f"Gagal membuka dialog chime:\n{str(e)}")
+
+    def open_conflict_dialog(self):
+        """Buka dialog hasil cek konflik jadwal"""
+        try:
+            ConflictDialog(self.root)
+        except Exception as e:
+            log_error(f"Gagal membuka cek konflik: {e}")
+            messagebox.showerror("Error", f"Gagal membuka cek konflik:\n{str(e)}")
+
+    def open_latency_dialog(self):
+        """Buka dialog statistik latensi bel"""
+        try:
+            LatencyDialog(self.root)
+        except Exception as e:
+            log_error(f"Gagal membuka statistik latensi: {e}")
+            messagebox.showerror("Error", f"Gagal membuka statistik latensi:\n{str(e)}")
+
     def load_schedule(self):
         """Muat jadwal dari database ke tabel"""
         try:
@@ -564,10 +805,32 @@ class SchoolBellApp:
             
             # Update status bar
             total_schedules = sum(len(day_schedules) for day_schedules in schedules.values())
-            self.status_bar.update_status(f"Total jadwal: {total_schedules}")
+            status = f"Total jadwal: {total_schedules}"
+            self.status_bar.update_status(status)
         except Exception as e:
             log_error(f"Gagal load jadwal: {e}")
             messagebox.showerror("Error", f"Gagal memuat jadwal:\n{str(e)}")
+            return
+
+        # Analisis konflik membaca metadata dan header setiap file audio,
+        # jadi dijalankan di thread lain agar GUI tidak tertahan
+        self._conflict_run += 1
+        threading.Thread(target=self._count_conflicts, args=(self._conflict_run, status),
+                         daemon=True).start()
+
+    def _count_conflicts(self, run, status):
+        """Hitung konflik jadwal di latar belakang lalu tampilkan di status bar"""
+        try:
+            errors = sum(1 for issue in ConflictAnalyzer(data_manager).analyze() if issue.is_error)
+        except Exception as e:
+            log_error(f"Gagal menganalisis konflik jadwal: {e}")
+            return
+        if errors:
+            self.root.after(0, self._show_conflicts, run, status, errors)
+
+    def _show_conflicts(self, run, status, errors):
+        if run == self._conflict_run:
+            self.status_bar.update_status(f"{status} | ⚠ {errors} konflik jadwal")
 
     def _update_vertical_scrollbar(self, first, last):
         """Update vertical scrollbar visibility"""
@@ -599,16 +862,60 @@ class SchoolBellApp:
         """Handle mouse wheel scrolling on Windows"""
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
 
+    def handle_instance_command(self, command, arg=""):
+        """Perintah dari peluncuran kedua (thread socket), dijalankan di thread GUI"""
+        self.root.after(0, self._run_instance_command, command, arg)
+
+    def _run_instance_command(self, command, arg):
+        try:
+            log_info(f"Perintah dari instance kedua: {command} {arg}".rstrip())
+            if command == COMMAND_SHOW:
+                self.root.deiconify()
+                self.root.lift()
+                self.root.focus_force()
+            elif command == COMMAND_RING:
+                path = arg
+                if not path:
+                    # Tanpa argumen: bunyikan audio bel berikutnya sekarang
+                    upcoming = self.scheduler.next_bell()
+                    path = upcoming[1] if upcoming else None
+                elif not is_chime_path(path) and not os.path.exists(path):
+                    path = os.path.join(AUDIO_DIR, os.path.basename(path))
+                if path:
+                    self.audio_player.play_audio(path, priority=PRIORITY_MANUAL)
+                else:
+                    log_error("Tidak ada bel berikutnya untuk dibunyikan")
+            elif command == COMMAND_RELOAD:
+                data_manager.reload()
+                self.load_audio_files()
+                self.load_schedule()
+        except Exception as e:
+            log_error(f"Gagal menjalankan perintah {command}: {e}")
+
     def on_close(self):
         """Tangani penutupan jendela utama dengan benar"""
         try:
             # Tampilkan dialog konfirmasi
             if messagebox.askyesno("Konfirmasi", "Apakah Anda yakin ingin keluar dari aplikasi?"):
                 # Hentikan scheduler jika ada
+                supervisor.stop()
                 if hasattr(self, 'scheduler') and self.scheduler:
                     log_info("Menghentikan scheduler...")
                     self.scheduler.stop()
                 
+                # Hentikan endpoint metrik dan API kontrol
+                if getattr(self, 'metrics_server', None):
+                    self.metrics_server.stop()
+                if getattr(self, 'api_server', None):
+                    self.api_server.stop()
+                if getattr(self, 'replica_sync', None):
+                    self.replica_sync.stop()
+                if getattr(self, 'stream_receiver', None):
+                    self.stream_receiver.stop()
+                if getattr(self, 'clock_server', None):
+                    self.clock_server.stop()
+                clock_sync.stop()
+                
                 # Hentikan tray icon jika ada
                 if hasattr(self, 'tray_icon') and self.tray_icon:
                     log_info("Menghentikan tray icon...")
@@ -618,6 +925,13 @@ class SchoolBellApp:
                 if hasattr(self, 'audio_player'):
                     log_info("Menghentikan audio player...")
                     self.audio_player.stop_audio()
+                    if hasattr(self.audio_player, 'shutdown'):
+                        self.audio_player.shutdown()
+                
+                # Hentikan transcoder cache PCM, ingest upload dan analisis loudness
+                pcm_cache.shutdown()
+                audio_ingest.shutdown()
+                loudness.shutdown()
                 
                 # Log penutupan aplikasi
                 log_info("Aplikasi ditutup oleh pengguna")
@@ -93,6 +93,23 @@ class TrayIcon:
         except Exception as e:
             print(f"Error in icon thread: {e}")
     
+    def is_alive(self):
+        """True jika thread tray masih berjalan atau memang sudah dihentikan"""
+        if not self.running:
+            return True
+        return self.icon_thread is not None and self.icon_thread.is_alive()
+
+    def restart(self):
+        """Buat ulang dan jalankan tray icon (dipanggil watchdog)"""
+        try:
+            if self.icon:
+                self.icon.stop()
+        except Exception as e:
+            print(f"Error stopping tray icon: {e}")
+        self.running = False
+        if self.setup():
+            self.run()
+
     def stop(self):
         """Hentikan system tray"""
         if self.icon and self.running:
@@ -0,0 +1,96 @@
+# holiday_calendar.py
+import threading
+import datetime
+from constants import DAYS
+from logger import log_info
+from metrics import cache_counters
+
+_plan_cache_hits, _plan_cache_misses = cache_counters("kalender")
+
+# Jumlah tanggal yang disimpan di cache resolver (hari ini + beberapa hari ke depan)
+MAX_CACHED_DAYS = 7
+
+
+class DayPlan:
+    """Rencana bel efektif untuk satu tanggal"""
+    __slots__ = ("date", "day_name", "bells", "exception", "gains")
+
+    def __init__(self, date, day_name, bells, exception=None, gains=None):
+        self.date = date
+        self.day_name = day_name
+        self.bells = bells  # {"HH:MM": audio_path}, lookup O(1)
+        self.exception = exception
+        self.gains = gains or {}  # {"HH:MM": gain_db} khusus jadwal ini
+
+    def get(self, time_str: str):
+        """Ambil audio untuk jam tertentu, None jika tidak ada bel"""
+        return self.bells.get(time_str)
+
+    def is_holiday(self) -> bool:
+        """True jika tanggal ini libur karena pengecualian"""
+        return self.exception is not None and self.exception[3] == "libur"
+
+
+class CalendarResolver:
+    """Menghitung rencana bel efektif per tanggal dan menyimpannya di cache"""
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        self._plans = {}
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def plan_for(self, date: datetime.date) -> DayPlan:
+        """Rencana bel untuk tanggal; dihitung sekali lalu diambil dari cache"""
+        with self._lock:
+            generation = self.data_manager.cache_generation
+            if generation != self._generation:
+                self._plans = {}
+                self._generation = generation
+
+            plan = self._plans.get(date)
+            if plan is not None:
+                _plan_cache_hits.inc()
+            else:
+                _plan_cache_misses.inc()
+                plan = self._resolve(date)
+                if len(self._plans) >= MAX_CACHED_DAYS:
+                    # Buang tanggal paling lama
+                    del self._plans[min(self._plans)]
+                self._plans[date] = plan
+            return plan
+
+    def invalidate(self) -> None:
+        """Paksa hitung ulang rencana pada pemanggilan berikutnya"""
+        with self._lock:
+            self._plans = {}
+
+    def _resolve(self, date: datetime.date) -> DayPlan:
+        """Gabungkan jadwal mingguan dengan kalender pengecualian"""
+        exception = self.data_manager.find_date_exception(date.isoformat())
+        day_name = DAYS[date.weekday()]
+
+        if exception is not None and exception[3] == "libur":
+            log_info(f"{date.isoformat()}: libur ({exception[5] or 'tanpa keterangan'})")
+            return DayPlan(date, day_name, {}, exception)
+
+        if exception is not None and exception[3] == "khusus":
+            day_name = exception[4]
+            log_info(f"{date.isoformat()}: hari khusus, memakai jadwal {day_name} "
+                     f"({exception[5] or 'tanpa keterangan'})")
+        elif date.weekday() == 6:
+            # Minggu tidak ada bel kecuali ada hari khusus
+            return DayPlan(date, day_name, {}, None)
+
+        bells = {}
+        for schedule_time, path in self.data_manager.get_schedules().get(day_name, []):
+            # Jika ada jam ganda, jadwal pertama yang dipakai
+            bells.setdefault(schedule_time, path)
+        # Aturan berulang hanya diekspansi untuk tanggal ini saja
+        for rule in self.data_manager.get_recurrence_rules():
+            if rule.applies_on(date, day_name):
+                for schedule_time in rule.iter_times():
+                    bells.setdefault(schedule_time, rule.audio_path)
+        bells = dict(sorted(bells.items()))
+        gains = self.data_manager.get_schedule_gains(day_name)
+        return DayPlan(date, day_name, bells, exception, gains)
@@ -0,0 +1,166 @@
+# ingest.py
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from constants import (
+    AUDIO_DIR, ORIGINAL_AUDIO_DIR, INGEST_KEEP_ORIGINAL,
+    MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER
+)
+from data_manager import data_manager
+from logger import log_error, log_info
+from metrics import registry
+from pcm_cache import CachedPcm, _init_decoder, _decode_to_wav, _shutdown_pool
+
+_transcode_timer = registry.histogram("ingest_transcode_seconds", "Durasi transcode file upload",
+                                      buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+_saved_bytes = registry.counter("ingest_bytes_saved_total", "Selisih ukuran file upload sebelum dan sesudah transcode")
+
+
+def _is_normalized(path: str) -> bool:
+    """True jika file sudah WAV berformat mixer"""
+    if not path.lower().endswith(".wav"):
+        return False
+    try:
+        pcm = CachedPcm(path)
+    except (OSError, ValueError):
+        return False
+    try:
+        return pcm.matches_mixer
+    finally:
+        pcm.close()
+
+
+def _transcode(source: str, dest: str) -> dict:
+    """Transcode satu file ke WAV berformat mixer (dijalankan di proses worker)"""
+    start = time.perf_counter()
+    if _is_normalized(source):
+        shutil.copy2(source, dest + ".tmp")
+        os.replace(dest + ".tmp", dest)
+    else:
+        _decode_to_wav(source, dest)
+    return {"before": os.path.getsize(source), "after": os.path.getsize(dest),
+            "seconds": time.perf_counter() - start}
+
+
+class IngestResult:
+    """Hasil ingest satu file upload"""
+    __slots__ = ("source", "path", "original", "before", "after", "error")
+
+    def __init__(self, source, path=None, original=None, before=0, after=0, error=None):
+        self.source = source
+        self.path = path          # File di audio/ yang dipakai jadwal
+        self.original = original  # Salinan asli di audio/asli, None jika tidak disimpan
+        self.before = before
+        self.after = after
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def summary(self) -> str:
+        """Ringkasan ukuran untuk ditampilkan ke pengguna"""
+        return f"{os.path.basename(self.path)}: {self.before / 1024:.0f} KB -> {self.after / 1024:.0f} KB"
+
+
+class AudioIngest:
+    """Tahap ingest upload: transcode ke format mixer di proses terpisah
+
+    File pilihan pengguna (MP3 320 kbps, FLAC besar, WAV 48 kHz, ...) diubah
+    sekali ke WAV 16 bit dengan sample rate dan jumlah kanal mixer. File hasil
+    langsung di-memory-map oleh cache PCM, jadi tidak ada decode maupun
+    resample saat bel berbunyi dan tidak perlu salinan kedua di cache/pcm.
+    """
+
+    def __init__(self, audio_dir=AUDIO_DIR, original_dir=ORIGINAL_AUDIO_DIR):
+        self.audio_dir = audio_dir
+        self.original_dir = original_dir
+        self._executor = None
+        self._futures = set()  # Transcode yang belum selesai, dibatalkan saat shutdown
+        self._lock = threading.Lock()
+
+    def enabled(self) -> bool:
+        return data_manager.get_setting("ingest_enabled") != "0"
+
+    def keep_original(self) -> bool:
+        value = data_manager.get_setting("ingest_keep_original")
+        return INGEST_KEEP_ORIGINAL if value in (None, "") else value == "1"
+
+    def target_path(self, source: str) -> str:
+        """Lokasi file di audio/ untuk upload ini"""
+        name = os.path.basename(source)
+        if self.enabled():
+            name = os.path.splitext(name)[0] + ".wav"
+        return os.path.join(self.audio_dir, name)
+
+    def submit(self, source: str, on_done=None):
+        """Transcode `source` ke audio/ di latar belakang; on_done(IngestResult) dipanggil setelahnya"""
+        dest = self.target_path(source)
+        os.makedirs(self.audio_dir, exist_ok=True)
+        original = None
+        if self.keep_original():
+            os.makedirs(self.original_dir, exist_ok=True)
+            original = os.path.join(self.original_dir, os.path.basename(source))
+            shutil.copy2(source, original)
+
+        if not self.enabled():
+            shutil.copy2(source, dest)
+            size = os.path.getsize(dest)
+            result = IngestResult(source, dest, original, size, size)
+            if on_done:
+                on_done(result)
+            return None
+
+        with self._lock:
+            if self._executor is None:
+                settings = (MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=max(1, min(2, (os.cpu_count() or 2) - 1)),
+                    initializer=_init_decoder, initargs=(settings,))
+            executor = self._executor
+        future = executor.submit(_transcode, original or source, dest)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(lambda f: self._on_done(f, source, dest, original, on_done))
+        return future
+
+    def _on_done(self, future, source, dest, original, on_done) -> None:
+        with self._lock:
+            self._futures.discard(future)
+        if future.cancelled():
+            return
+        try:
+            stats = future.result()
+            _transcode_timer.observe(stats["seconds"])
+            _saved_bytes.inc(max(0, stats["before"] - stats["after"]))
+            result = IngestResult(source, dest, original, stats["before"], stats["after"])
+            log_info(f"Upload di-transcode: {result.summary()}")
+        except Exception as e:
+            # File tidak bisa di-decode: simpan apa adanya agar upload tetap berhasil
+            log_error(f"Gagal transcode {source}, disalin apa adanya: {e}")
+            try:
+                fallback = os.path.join(self.audio_dir, os.path.basename(source))
+                shutil.copy2(source, fallback)
+                size = os.path.getsize(fallback)
+                result = IngestResult(source, fallback, original, size, size)
+            except OSError as copy_error:
+                result = IngestResult(source, original=original, error=str(copy_error))
+        if on_done:
+            try:
+                on_done(result)
+            except Exception as e:
+                log_error(f"Error di callback ingest: {e}")
+
+    def shutdown(self) -> None:
+        """Hentikan proses transcoder"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            futures, self._futures = self._futures, set()
+        if executor is not None:
+            _shutdown_pool(executor, futures)
+
+
+# Instance global
+audio_ingest = AudioIngest()
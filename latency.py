@@ -0,0 +1,155 @@
+# latency.py
+import csv
+import json
+import math
+import threading
+import time
+import datetime
+from logger import log_error, log_info
+from metrics import registry
+
+# Tahap pemutaran bel, diukur dari waktu terjadwal
+STAGE_WAKEUP = "bangun"            # scheduler bangun untuk bel ini
+STAGE_NOTIFY = "notifikasi"        # notifikasi desktop dikirim
+STAGE_MIXER_READY = "mixer_siap"   # mixer siap dan file termuat
+STAGE_FIRST_OUTPUT = "audio_keluar"  # sampel audio pertama keluar
+STAGES = [STAGE_WAKEUP, STAGE_NOTIFY, STAGE_MIXER_READY, STAGE_FIRST_OUTPUT]
+
+# Batas bucket histogram (ms), geometris x1.25 dari 0.5 ms s/d ~2 menit
+BUCKET_BOUNDS_MS = [0.5 * 1.25 ** i for i in range(57)]
+
+# Bucket histogram Prometheus untuk latensi bel (detik)
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class FireTrace:
+    """Cap waktu tiap tahap untuk satu kali bel berbunyi"""
+    __slots__ = ("scheduled_at", "marks")
+
+    def __init__(self, scheduled_at: float):
+        self.scheduled_at = scheduled_at  # epoch detik
+        self.marks = {}
+
+    def mark(self, stage: str, moment: float = None) -> None:
+        """Catat waktu tahap (hanya yang pertama dipakai)"""
+        self.marks.setdefault(stage, moment if moment is not None else time.time())
+
+    def latencies_ms(self) -> dict:
+        """Keterlambatan tiap tahap relatif terhadap waktu terjadwal"""
+        return {stage: max(0.0, (moment - self.scheduled_at) * 1000)
+                for stage, moment in self.marks.items()}
+
+
+class LatencyHistogram:
+    """Histogram bucket tetap; ukuran memori tidak bergantung jumlah sampel"""
+
+    def __init__(self, counts=None, maximum=0.0):
+        self.counts = counts or [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = sum(self.counts)
+        self.maximum = maximum
+
+    def add(self, value_ms: float) -> None:
+        """Tambah satu sampel"""
+        if value_ms <= BUCKET_BOUNDS_MS[0]:
+            index = 0
+        else:
+            index = min(int(math.ceil(math.log(value_ms / BUCKET_BOUNDS_MS[0], 1.25))),
+                        len(BUCKET_BOUNDS_MS))
+        self.counts[index] += 1
+        self.count += 1
+        self.maximum = max(self.maximum, value_ms)
+
+    def percentile(self, q: float) -> float:
+        """Perkiraan persentil (batas atas bucket), dibatasi nilai maksimum"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                if index < len(BUCKET_BOUNDS_MS):
+                    return min(BUCKET_BOUNDS_MS[index], self.maximum)
+                break
+        return self.maximum
+
+    def summary(self) -> dict:
+        """Jumlah sampel, p50/p95/p99 dan maksimum (ms)"""
+        return {
+            "count": self.count,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.maximum,
+        }
+
+
+class LatencyTracker:
+    """Kumpulkan latensi bel per tahap dan simpan ringkasan harian"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._date = datetime.date.today()
+        self._histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self._dirty = False
+
+    def record(self, trace: FireTrace) -> None:
+        """Masukkan satu trace ke histogram hari ini"""
+        latencies = trace.latencies_ms()
+        for stage, value in latencies.items():
+            registry.histogram("bell_fire_latency_seconds", "Latensi bel dari waktu terjadwal per tahap",
+                               {"stage": stage}, METRIC_BUCKETS).observe(value / 1000)
+        with self._lock:
+            for stage, value in latencies.items():
+                if stage in self._histograms:
+                    self._histograms[stage].add(value)
+            self._dirty = True
+        if STAGE_FIRST_OUTPUT in latencies:
+            log_info(f"Latensi bel: {latencies[STAGE_FIRST_OUTPUT]:.0f} ms sampai audio keluar")
+
+    def summary(self) -> dict:
+        """Ringkasan p50/p95/p99/max per tahap untuk hari ini"""
+        with self._lock:
+            return {stage: hist.summary() for stage, hist in self._histograms.items()}
+
+    def flush(self, data_manager, today: datetime.date = None) -> None:
+        """Simpan histogram ke database; ganti hari jika tanggal berubah"""
+        today = today or datetime.date.today()
+        with self._lock:
+            rows = None
+            if self._dirty:
+                rows = self._rows()
+                self._dirty = False
+            if today != self._date:
+                self._date = today
+                self._histograms = {stage: LatencyHistogram() for stage in STAGES}
+        if rows:
+            data_manager.save_latency_daily(rows)
+
+    def _rows(self) -> list:
+        rows = []
+        for stage, hist in self._histograms.items():
+            stats = hist.summary()
+            rows.append((self._date.isoformat(), stage, stats["count"], stats["p50"],
+                         stats["p95"], stats["p99"], stats["max"], json.dumps(hist.counts)))
+        return rows
+
+
+def export_latency_csv(data_manager, path: str, days: int = 90) -> bool:
+    """Ekspor ringkasan latensi harian ke file CSV"""
+    try:
+        rows = data_manager.get_latency_daily(days)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["tanggal", "tahap", "jumlah", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+            for row in rows:
+                writer.writerow([row[0], row[1], row[2]] + [f"{value:.1f}" for value in row[3:7]])
+        log_info(f"Statistik latensi diekspor ke {path}")
+        return True
+    except Exception as e:
+        log_error(f"Gagal ekspor statistik latensi: {e}")
+        return False
+
+
+# Instance global
+latency_tracker = LatencyTracker()
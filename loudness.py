@@ -0,0 +1,277 @@
+# loudness.py
+import math
+import os
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from constants import (
+    AUDIO_DIR, AUDIO_FORMATS, MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER,
+    LOUDNESS_TARGET_LUFS, LOUDNESS_PEAK_CEILING_DB
+)
+from data_manager import data_manager
+from logger import log_error, log_info, log_warning
+from metrics import registry
+from pcm_cache import pcm_cache, _init_decoder, _shutdown_pool
+
+try:
+    import numpy as np
+except ImportError:  # Analisis loudness dinonaktifkan tanpa numpy
+    np = None
+
+# Blok pengukuran ITU-R BS.1770: 400 ms dengan overlap 75%
+BLOCK_SECONDS = 0.4
+HOP_SECONDS = 0.1
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+# Jumlah blok yang di-FFT sekaligus (membatasi memori untuk file panjang)
+BLOCKS_PER_CHUNK = 128
+
+_analysis_timer = registry.histogram("loudness_analysis_seconds", "Durasi analisis loudness per file",
+                                     buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+
+def _biquad_power(b, a, z1, z2):
+    """|H|^2 filter biquad pada titik z^-1, z^-2"""
+    response = (b[0] + b[1] * z1 + b[2] * z2) / (a[0] + a[1] * z1 + a[2] * z2)
+    return np.abs(response) ** 2
+
+
+def k_weighting(frequencies, rate):
+    """Respon daya filter K (high shelf + high pass BS.1770) untuk sample rate apa pun
+
+    Koefisien diturunkan lewat transformasi bilinear (seperti libebur128) dan
+    identik dengan tabel BS.1770 pada 48 kHz.
+    """
+    w = 2 * math.pi * frequencies / rate
+    z1 = np.exp(-1j * w)
+    z2 = z1 * z1
+
+    # Tahap 1: high shelf +4 dB di sekitar 1.7 kHz
+    k = math.tan(math.pi * 1681.974450955533 / rate)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh ** 0.4996667741545416
+    shelf_b = (vh + vb * k / q + k * k, 2 * (k * k - vh), vh - vb * k / q + k * k)
+    shelf_a = (1 + k / q + k * k, 2 * (k * k - 1), 1 - k / q + k * k)
+
+    # Tahap 2: high pass ~38 Hz
+    k = math.tan(math.pi * 38.13547087602444 / rate)
+    q = 0.5003270373238773
+    pass_b = (1.0, -2.0, 1.0)
+    pass_a = (1 + k / q + k * k, 2 * (k * k - 1), 1 - k / q + k * k)
+    # libebur128 menormalkan a dengan a0 tetapi b tetap [1, -2, 1]
+    pass_b = tuple(value * pass_a[0] for value in pass_b)
+
+    return _biquad_power(shelf_b, shelf_a, z1, z2) * _biquad_power(pass_b, pass_a, z1, z2)
+
+
+def measure(samples, rate) -> tuple:
+    """Integrated loudness (LUFS) dan sample peak (dBFS) dari array (frame, kanal)
+
+    Filter K diterapkan di domain frekuensi per blok 400 ms: daya blok
+    dihitung dari spektrum rfft yang dibobot |H(f)|^2 (teorema Parseval),
+    sehingga seluruh perhitungan tervektorisasi tanpa filter IIR per sampel.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    peak = float(np.max(np.abs(samples))) if samples.size else 0.0
+    peak_db = 20 * math.log10(peak) if peak > 0 else float("-inf")
+
+    block = int(BLOCK_SECONDS * rate)
+    hop = int(HOP_SECONDS * rate)
+    if len(samples) < block:
+        samples = np.concatenate([samples, np.zeros((block - len(samples), samples.shape[1]),
+                                                    dtype=samples.dtype)])
+    windows = np.lib.stride_tricks.sliding_window_view(samples, block, axis=0)[::hop]
+    weight = k_weighting(np.fft.rfftfreq(block, 1 / rate), rate)
+    # Koreksi Parseval untuk rfft: bin selain DC (dan Nyquist) mewakili dua bin
+    weight[1:] *= 2
+    if block % 2 == 0:
+        weight[-1] /= 2
+    weight /= block * block
+
+    powers = []
+    for start in range(0, len(windows), BLOCKS_PER_CHUNK):
+        spectrum = np.fft.rfft(windows[start:start + BLOCKS_PER_CHUNK], axis=-1)
+        mean_square = (spectrum.real ** 2 + spectrum.imag ** 2) @ weight  # (blok, kanal)
+        powers.append(mean_square.sum(axis=1))  # Bobot kanal kiri/kanan = 1
+    power = np.concatenate(powers)
+
+    with np.errstate(divide="ignore"):
+        block_loudness = -0.691 + 10 * np.log10(power)
+    gated = power[block_loudness > ABSOLUTE_GATE_LUFS]
+    if not gated.size:
+        return float("-inf"), peak_db
+    relative_gate = -0.691 + 10 * math.log10(float(gated.mean())) + RELATIVE_GATE_LU
+    gated = power[(block_loudness > ABSOLUTE_GATE_LUFS) & (block_loudness > relative_gate)]
+    return -0.691 + 10 * math.log10(float(gated.mean())), peak_db
+
+
+def compute_gain(lufs: float, peak_db: float, target: float = LOUDNESS_TARGET_LUFS) -> float:
+    """Gain (dB) menuju target loudness tanpa melewati batas peak"""
+    if not math.isfinite(lufs):
+        return 0.0
+    gain = target - lufs
+    if math.isfinite(peak_db):
+        gain = min(gain, LOUDNESS_PEAK_CEILING_DB - peak_db)
+    return round(gain, 2)
+
+
+def _read_pcm(path: str, cached_path: str):
+    """Sampel float (frame, kanal) dan sample rate; di-decode jika belum ada di cache"""
+    for candidate in (cached_path, path):
+        if candidate and candidate.lower().endswith(".wav") and os.path.exists(candidate):
+            try:
+                with wave.open(candidate, "rb") as wav:
+                    if wav.getsampwidth() == 2:
+                        raw = wav.readframes(wav.getnframes())
+                        data = np.frombuffer(raw, dtype="<i2").reshape(-1, wav.getnchannels())
+                        return data / 32768.0, wav.getframerate()
+            except (wave.Error, EOFError):
+                pass
+    import pygame
+    frequency, size, channels = pygame.mixer.get_init()
+    data = pygame.sndarray.array(pygame.mixer.Sound(path))
+    scale = float(2 ** (abs(size) - 1))
+    return data.reshape(len(data), -1) / scale, frequency
+
+
+def _analyze_file(path: str, cached_path: str) -> dict:
+    """Analisis satu file (dijalankan di proses worker)"""
+    import time
+    start = time.perf_counter()
+    samples, rate = _read_pcm(path, cached_path)
+    lufs, peak_db = measure(samples, rate)
+    return {
+        "duration": len(samples) / rate,
+        "lufs": lufs,
+        "peak_db": peak_db,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+class LoudnessAnalyzer:
+    """Analisis loudness pustaka audio di worker pool dan gain siap pakai per file
+
+    Hasil analisis disimpan di tabel audio_metadata. Saat pemutaran hanya
+    `gain_for()` yang dipanggil: lookup dict di memori, tanpa analisis.
+    """
+
+    def __init__(self):
+        self._gains = None  # path -> gain_db, dimuat dari database
+        self._enabled = True
+        self._enabled_generation = None  # settings_generation saat _enabled dibaca
+        self._executor = None
+        self._pending = set()
+        self._futures = set()  # Analisis yang belum selesai, dibatalkan saat shutdown
+        self._lock = threading.Lock()
+
+    def enabled(self) -> bool:
+        """Setting loudness_enabled, dibaca ulang hanya jika ada setting yang berubah"""
+        generation = data_manager.settings_generation
+        if generation != self._enabled_generation:
+            self._enabled = data_manager.get_setting("loudness_enabled") != "0"
+            self._enabled_generation = generation
+        return self._enabled
+
+    def available(self) -> bool:
+        return np is not None and self.enabled()
+
+    def target(self) -> float:
+        try:
+            return float(data_manager.get_setting("loudness_target") or LOUDNESS_TARGET_LUFS)
+        except ValueError:
+            return LOUDNESS_TARGET_LUFS
+
+    def _load(self) -> dict:
+        gains = {row[0]: row[6] for row in data_manager.get_audio_metadata()}
+        with self._lock:
+            self._gains = gains
+        return gains
+
+    def gain_for(self, path: str) -> float:
+        """Gain tersimpan untuk file (dB), 0 jika belum dianalisis"""
+        gains = self._gains if self._gains is not None else self._load()
+        gain = gains.get(path)
+        if gain is None or not self.enabled():
+            return 0.0
+        return gain
+
+    def analyze(self, paths) -> int:
+        """Jadwalkan analisis file yang belum punya metadata untuk isinya saat ini"""
+        if not self.available():
+            if np is None:
+                log_warning("numpy tidak terpasang, analisis loudness dilewati")
+            return 0
+        known = {row[0]: row[1] for row in data_manager.get_audio_metadata()}
+        count = 0
+        for path in sorted(set(paths)):
+            file_hash = data_manager.calculate_file_hash(path)
+            if not file_hash or known.get(path) == file_hash:
+                continue
+            with self._lock:
+                if path in self._pending:
+                    continue
+                self._pending.add(path)
+                if self._executor is None:
+                    settings = (MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER)
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=max(1, (os.cpu_count() or 2) - 1),
+                        initializer=_init_decoder, initargs=(settings,))
+                executor = self._executor
+            cached_path = pcm_cache.cache_path(path)
+            future = executor.submit(_analyze_file, path, cached_path)
+            with self._lock:
+                self._futures.add(future)
+            future.add_done_callback(lambda f, p=path, h=file_hash: self._on_analyzed(f, p, h))
+            count += 1
+        if count:
+            log_info(f"Menganalisis loudness {count} file audio")
+        return count
+
+    def analyze_library(self) -> int:
+        """Analisis semua file di folder audio/"""
+        if not os.path.isdir(AUDIO_DIR):
+            return 0
+        return self.analyze(os.path.join(AUDIO_DIR, name) for name in os.listdir(AUDIO_DIR)
+                            if os.path.splitext(name)[1].lower() in AUDIO_FORMATS)
+
+    def _on_analyzed(self, future, path, file_hash) -> None:
+        with self._lock:
+            self._pending.discard(path)
+            self._futures.discard(future)
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            log_error(f"Gagal menganalisis loudness {path}: {e}")
+            return
+        _analysis_timer.observe(result["seconds"])
+        gain = compute_gain(result["lufs"], result["peak_db"], self.target())
+        lufs = result["lufs"] if math.isfinite(result["lufs"]) else None
+        peak_db = result["peak_db"] if math.isfinite(result["peak_db"]) else None
+        if data_manager.save_audio_metadata(path, file_hash, result["duration"], lufs, peak_db, gain):
+            with self._lock:
+                if self._gains is not None:
+                    self._gains[path] = gain
+            log_info(f"Loudness {os.path.basename(path)}: "
+                     f"{'-inf' if lufs is None else f'{lufs:.1f}'} LUFS, gain {gain:+.1f} dB")
+
+    def shutdown(self) -> None:
+        """Hentikan worker pool"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            futures, self._futures = self._futures, set()
+        if executor is not None:
+            _shutdown_pool(executor, futures)
+
+
+def gain_to_volume(gain_db: float) -> float:
+    """Gain dB ke volume pygame (0..1); pygame tidak bisa memperkuat di atas 1"""
+    return max(0.0, min(1.0, 10 ** (gain_db / 20)))
+
+
+# Instance global
+loudness = LoudnessAnalyzer()
@@ -1,15 +1,20 @@
 # main.py
-import tkinter as tk
-from gui.splash_screen import SplashScreen
-from gui.main_window import SchoolBellApp
-from data_manager import data_manager
-from logger import log_info, log_error
-from gui.tray_icon import TrayIcon
 import sys
 import time
 import os
+import multiprocessing
+from single_instance import InstanceLock, forward, parse_command, COMMAND_SHOW
 
-def main():
+def main(instance_lock):
+    # Import berat setelah kunci instance, agar peluncuran kedua tidak perlu memuatnya
+    import tkinter as tk
+    from gui.splash_screen import SplashScreen
+    from gui.main_window import SchoolBellApp
+    from data_manager import data_manager
+    from logger import log_info, log_error
+    from gui.tray_icon import TrayIcon
+    from watchdog import supervisor
+    
     # Inisialisasi database terlebih dahulu
     data_manager.init_db()
     
@@ -55,8 +60,9 @@ def main():
         root = tk.Tk()
         root.withdraw()  # Sembunyikan dulu
         
-        # Buat aplikasi
+        # Buat aplikasi; perintah dari peluncuran kedua dijalankan setelah ini
         app = SchoolBellApp(root)
+        instance_lock.set_handler(app.handle_instance_command)
         time.sleep(1)
         
         # Langkah 6: Memuat file audio
@@ -87,6 +93,7 @@ def main():
             if icon:
                 # Simpan referensi tray icon di app
                 app.tray_icon = tray_icon
+                supervisor.register("tray", tray_icon.restart, is_alive=tray_icon.is_alive)
                 
                 # Jalankan tray icon
                 tray_icon.run()
@@ -138,4 +145,24 @@ def main():
             sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Wajib untuk audio engine berbasis proses pada build PyInstaller
+    multiprocessing.freeze_support()
+    
+    # Hanya satu instance per PC; peluncuran kedua meneruskan perintahnya lalu keluar
+    command, arg = parse_command(sys.argv[1:])
+    instance_lock = InstanceLock()
+    if not instance_lock.acquire():
+        if forward(command, arg):
+            sys.exit(0)
+        # Instance lama mungkin baru saja keluar
+        if not instance_lock.acquire():
+            from logger import log_error
+            log_error("Bell Sekolah sudah berjalan tetapi tidak merespon")
+            sys.exit(1)
+    instance_lock.listen()
+    if command != COMMAND_SHOW:
+        instance_lock.submit(command, arg)
+    try:
+        main(instance_lock)
+    finally:
+        instance_lock.release()
\ No newline at end of file
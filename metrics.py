@@ -0,0 +1,316 @@
+# metrics.py
+import bisect
+import functools
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logger import log_error, log_info
+
+# Batas bucket default histogram (detik)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RETIRE_MIN_CELLS = 32  # jumlah sel per metrik sebelum sel thread mati dilipat
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ShardedCells:
+    """Sel per-thread agar jalur panas tidak perlu mengambil lock
+
+    Setiap thread menulis ke selnya sendiri; lock hanya dipakai saat thread
+    pertama kali membuat sel dan saat scrape menjumlahkan semua sel. Sel
+    milik thread yang sudah mati dilipat ke `_retired` agar jumlah sel tidak
+    bertambah terus (AudioPlayer membuat thread baru setiap pemutaran).
+    """
+
+    def __init__(self, factory, merge):
+        self._factory = factory
+        self._merge = merge
+        self._local = threading.local()
+        self._cells = []  # (weakref thread, sel)
+        self._retired = factory()
+        self._retire_at = RETIRE_MIN_CELLS
+        self._lock = threading.Lock()
+
+    def cell(self):
+        """Sel milik thread pemanggil"""
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = self._factory()
+            self._local.cell = cell
+            with self._lock:
+                self._cells.append((weakref.ref(threading.current_thread()), cell))
+                # Tanpa scrape, sel thread mati tetap harus dilipat
+                if len(self._cells) >= self._retire_at:
+                    self._retire_dead()
+                    self._retire_at = max(RETIRE_MIN_CELLS, 2 * len(self._cells))
+        return cell
+
+    def _retire_dead(self) -> None:
+        """Lipat sel milik thread yang sudah mati ke `_retired` (lock dipegang pemanggil)"""
+        alive = []
+        for thread_ref, cell in self._cells:
+            thread = thread_ref()
+            if thread is None or not thread.is_alive():
+                self._merge(self._retired, cell)
+            else:
+                alive.append((thread_ref, cell))
+        self._cells = alive
+
+    def collect(self):
+        """Gabungan semua sel (dipanggil saat scrape)"""
+        with self._lock:
+            self._retire_dead()
+            alive = self._cells
+            total = self._factory()
+            self._merge(total, self._retired)
+            for _, cell in alive:
+                self._merge(total, cell)
+            return total
+
+
+def _merge_list(target, source):
+    for index, value in enumerate(source):
+        target[index] += value
+
+
+class Counter:
+    """Penghitung yang hanya naik"""
+    kind = "counter"
+
+    def __init__(self):
+        self._shards = _ShardedCells(lambda: [0], _merge_list)
+
+    def inc(self, amount=1) -> None:
+        """Tambah nilai penghitung"""
+        self._shards.cell()[0] += amount
+
+    def value(self):
+        """Total dari semua thread"""
+        return self._shards.collect()[0]
+
+    def samples(self, name, labels):
+        yield name, labels, self.value()
+
+
+class Gauge:
+    """Nilai sesaat; bisa diisi langsung atau lewat fungsi saat scrape"""
+    kind = "gauge"
+
+    def __init__(self, func=None):
+        self._value = 0
+        self._func = func
+
+    def set(self, value) -> None:
+        self._value = value
+
+    def inc(self, amount=1) -> None:
+        self._value += amount
+
+    def dec(self, amount=1) -> None:
+        self._value -= amount
+
+    def value(self):
+        if self._func is not None:
+            try:
+                return self._func()
+            except Exception as e:
+                log_error(f"Gagal membaca gauge: {e}")
+                return float("nan")
+        return self._value
+
+    def samples(self, name, labels):
+        yield name, labels, self.value()
+
+
+class Histogram:
+    """Histogram dengan bucket tetap (format Prometheus)"""
+    kind = "histogram"
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        size = len(self.buckets) + 2  # bucket + +Inf + sum
+        self._shards = _ShardedCells(lambda: [0] * size, _merge_list)
+
+    def observe(self, value) -> None:
+        """Catat satu sampel"""
+        cell = self._shards.cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def time(self):
+        """Context manager untuk mengukur durasi blok kode"""
+        return _Timer(self)
+
+    def samples(self, name, labels):
+        cell = self._shards.collect()
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), cell[:-1]):
+            cumulative += count
+            yield f"{name}_bucket", dict(labels, le=_format_value(bound)), cumulative
+        yield f"{name}_sum", labels, cell[-1]
+        yield f"{name}_count", labels, cumulative
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+
+class MetricsRegistry:
+    """Kumpulan metrik aplikasi, diekspos dalam format teks Prometheus"""
+
+    def __init__(self):
+        self._families = {}  # nama -> [kind, help, {label_key: metric}]
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        key = tuple(sorted((labels or {}).items()))
+        family = self._families.get(name)
+        metric = family[2].get(key) if family else None
+        if metric is not None:
+            return metric
+        with self._lock:
+            family = self._families.setdefault(name, [cls.kind, help_text, {}])
+            if family[0] != cls.kind:
+                raise ValueError(f"Metrik {name} sudah terdaftar sebagai {family[0]}")
+            return family[2].setdefault(key, cls(**kwargs))
+
+    def counter(self, name, help_text, labels=None) -> Counter:
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=None) -> Gauge:
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=None, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def gauge_fn(self, name, help_text, func, labels=None) -> Gauge:
+        """Gauge yang nilainya dihitung saat scrape; pendaftaran ulang menimpa fungsi lama"""
+        gauge = self._get(Gauge, name, help_text, labels)
+        gauge._func = func
+        return gauge
+
+    def exposition(self) -> str:
+        """Semua metrik dalam format teks Prometheus 0.0.4"""
+        with self._lock:
+            families = [(name, family[0], family[1], list(family[2].items()))
+                        for name, family in sorted(self._families.items())]
+        lines = []
+        for name, kind, help_text, metrics in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, metric in metrics:
+                for sample_name, labels, value in metric.samples(name, dict(key)):
+                    lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def timed(histogram_name, help_text, **labels):
+    """Decorator: ukur durasi fungsi ke histogram registry global"""
+    def decorator(func):
+        histogram = registry.histogram(histogram_name, help_text, labels)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrape berkala tidak perlu masuk log
+        pass
+
+
+class MetricsServer:
+    """Server HTTP lokal untuk endpoint /metrics"""
+
+    def __init__(self, host="127.0.0.1", port=9108):
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    def start(self) -> bool:
+        """Jalankan server di thread daemon"""
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+            self.httpd.daemon_threads = True
+            self.port = self.httpd.server_address[1]
+            self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+            self.thread.start()
+            log_info(f"Endpoint metrik aktif di http://{self.host}:{self.port}/metrics")
+            return True
+        except Exception as e:
+            log_error(f"Gagal menjalankan endpoint metrik: {e}")
+            self.httpd = None
+            return False
+
+    def stop(self) -> None:
+        """Hentikan server"""
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+def cache_counters(cache_name):
+    """Penghitung hit/miss untuk satu cache beserta gauge rasio hit"""
+    hits = registry.counter("cache_requests_total", "Permintaan cache menurut hasil",
+                            {"cache": cache_name, "result": "hit"})
+    misses = registry.counter("cache_requests_total", "Permintaan cache menurut hasil",
+                              {"cache": cache_name, "result": "miss"})
+
+    def ratio():
+        hit, miss = hits.value(), misses.value()
+        return hit / (hit + miss) if hit + miss else 0.0
+
+    registry.gauge_fn("cache_hit_ratio", "Rasio hit cache sejak aplikasi mulai", ratio,
+                      {"cache": cache_name})
+    return hits, misses
+
+
+# Instance global
+registry = MetricsRegistry()
+registry.gauge_fn("process_threads", "Jumlah thread Python yang hidup", threading.active_count)
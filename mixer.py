@@ -0,0 +1,392 @@
+# mixer.py
+import array
+import math
+import sys
+import threading
+import time
+from constants import (
+    MIXER_FREQUENCY, MIXER_CHANNELS, MIXER_MAX_STREAMS,
+    OVERLAP_POLICIES, DEFAULT_OVERLAP_POLICY, DEFAULT_FADE_IN_MS, DEFAULT_FADE_OUT_MS,
+    DEFAULT_DUCK_DB, DUCK_RAMP_MS
+)
+from audio_backend import PygameBackend, create_backend
+from logger import log_error, log_info, log_warning
+from metrics import registry
+from watchdog import supervisor
+
+# Prioritas stream; pada prioritas sama, stream yang lebih baru menang
+PRIORITY_MANUAL = 0   # Putar manual dari GUI
+PRIORITY_BELL = 1     # Bel terjadwal
+PRIORITY_ANNOUNCEMENT = 2  # Siaran pengumuman dari PC lain
+
+# Interval loop mixer
+TICK_ACTIVE = 0.02  # detik
+TICK_IDLE = 0.1     # detik
+# Batas menunggu loop mixer berhenti dan lock-nya lepas saat reset
+RESET_TIMEOUT = 2.0  # detik
+
+_stream_gauge = registry.gauge("mixer_streams_active", "Stream audio yang sedang diputar")
+_queue_gauge = registry.gauge("mixer_streams_queued", "Stream audio yang menunggu giliran")
+
+
+class MixerConfig:
+    """Aturan tumpang tindih, fade dan ducking"""
+    __slots__ = ("policy", "fade_in_ms", "fade_out_ms", "duck_db")
+
+    def __init__(self, policy=DEFAULT_OVERLAP_POLICY, fade_in_ms=DEFAULT_FADE_IN_MS,
+                 fade_out_ms=DEFAULT_FADE_OUT_MS, duck_db=DEFAULT_DUCK_DB):
+        self.policy = policy if policy in OVERLAP_POLICIES else DEFAULT_OVERLAP_POLICY
+        self.fade_in_ms = fade_in_ms
+        self.fade_out_ms = fade_out_ms
+        self.duck_db = duck_db
+
+    @classmethod
+    def from_settings(cls, data_manager) -> "MixerConfig":
+        """Baca konfigurasi dari tabel settings"""
+        def number(key, default, cast=int):
+            try:
+                value = data_manager.get_setting(key)
+                return cast(value) if value not in (None, "") else default
+            except ValueError:
+                log_warning(f"Setting {key} tidak valid, memakai {default}")
+                return default
+
+        policy = data_manager.get_setting("overlap_policy") or DEFAULT_OVERLAP_POLICY
+        if policy not in OVERLAP_POLICIES:
+            log_warning(f"Kebijakan tumpang tindih tidak dikenal: {policy}, memakai {DEFAULT_OVERLAP_POLICY}")
+        return cls(policy,
+                   number("fade_in_ms", DEFAULT_FADE_IN_MS),
+                   number("fade_out_ms", DEFAULT_FADE_OUT_MS),
+                   number("duck_db", DEFAULT_DUCK_DB, float))
+
+    def as_tuple(self) -> tuple:
+        return (self.policy, self.fade_in_ms, self.fade_out_ms, self.duck_db)
+
+
+class Stream:
+    """Satu audio di mixer"""
+    __slots__ = ("seq", "name", "sound", "feed", "priority", "volume", "channel", "level",
+                 "stopping", "success", "done", "on_start", "on_done", "output_at")
+
+    def __init__(self, seq, name, sound, priority, volume, on_start, on_done, feed=None):
+        self.seq = seq
+        self.name = name
+        self.sound = sound
+        self.feed = feed  # Sumber blok PCM berikutnya untuk stream siaran
+        self.priority = priority
+        self.volume = volume
+        self.channel = None
+        self.level = 1.0       # Faktor ducking saat ini
+        self.stopping = False  # Sedang fade out
+        self.success = False
+        self.done = threading.Event()
+        self.on_start = on_start
+        self.on_done = on_done
+        self.output_at = None  # Perkiraan sampel pertama keluar (epoch), diisi saat channel terbukti berbunyi
+
+    @property
+    def rank(self) -> tuple:
+        return (self.priority, self.seq)
+
+
+class Mixer:
+    """Mesin mixing di atas channel backend audio (pygame.mixer.Channel)
+
+    Aturan tumpang tindih bersifat deterministik:
+    - "antri": stream baru menunggu sampai semua stream selesai; antrian
+      diurutkan menurut prioritas lalu urutan datang.
+    - "campur": stream baru langsung diputar; semua stream selain yang
+      peringkatnya tertinggi (prioritas, lalu yang terbaru) di-duck.
+    - "potong": stream dengan prioritas <= stream baru di-fade out; jika ada
+      stream berprioritas lebih tinggi, stream baru masuk antrian.
+    """
+
+    def __init__(self, config=None, max_streams=MIXER_MAX_STREAMS, heartbeat="audio", backend=None):
+        self.config = config or MixerConfig()
+        self.backend = backend or PygameBackend()
+        self.max_streams = max_streams
+        self.heartbeat = heartbeat
+        self._active = []
+        self._queue = []
+        self._seq = 0
+        self._lock = threading.RLock()
+        self._thread = None
+        self._running = False
+        self._closed = False  # shutdown() sudah dipanggil, loop tidak dijalankan lagi
+
+    def ensure_init(self) -> None:
+        """Inisialisasi backend audio jika belum"""
+        if not self.backend.is_initialized():
+            self.backend.init(self.max_streams)
+
+    def start(self) -> None:
+        """Jalankan loop mixer di thread daemon"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while self._running:
+            try:
+                self.tick()
+            except Exception as e:
+                log_error(f"Error di loop mixer: {e}")
+            time.sleep(TICK_ACTIVE if self.active() else TICK_IDLE)
+
+    def active(self) -> bool:
+        """True jika ada stream yang diputar atau menunggu"""
+        return bool(self._active or self._queue)
+
+    def play(self, sound, name="", priority=PRIORITY_BELL, volume=1.0,
+             on_start=None, on_done=None, config=None, feed=None) -> Stream:
+        """Masukkan Sound ke mixer sesuai kebijakan tumpang tindih
+
+        Jika `feed` diberikan, `sound` adalah blok pertama dan feed() dipanggil
+        dari loop mixer untuk blok berikutnya (bytes PCM, None = selesai).
+        feed() tidak boleh blocking.
+        """
+        if config is not None:
+            self.config = config
+        with self._lock:
+            self._seq += 1
+            stream = Stream(self._seq, name, sound, priority, volume, on_start, on_done, feed)
+            policy = self.config.policy
+            playing = [s for s in self._active if not s.stopping]
+            if policy == "antri" and (playing or self._queue):
+                self._enqueue(stream)
+            elif policy == "potong" and any(s.priority > priority for s in playing):
+                self._enqueue(stream)
+            else:
+                if policy == "potong":
+                    for other in playing:
+                        self._fade_out(other)
+                if not self._start(stream):
+                    self._enqueue(stream)
+            self._update_gauges()
+        return stream
+
+    def _enqueue(self, stream) -> None:
+        self._queue.append(stream)
+        self._queue.sort(key=lambda s: (-s.priority, s.seq))
+        log_info(f"Audio {stream.name} menunggu giliran ({len(self._queue)} di antrian)")
+
+    def _start(self, stream) -> bool:
+        """Putar stream di channel kosong; False jika semua channel terpakai"""
+        channel = self.backend.find_channel()
+        if channel is None:
+            return False
+        stream.channel = channel
+        stream.level = self._target_level(stream, self._active + [stream])
+        stream.sound.set_volume(stream.volume * stream.level)
+        played_at = time.time()
+        channel.play(stream.sound, fade_ms=self.config.fade_in_ms)
+        self._active.append(stream)
+        stream.success = True
+        # Sampel pertama baru sampai ke perangkat setelah buffer mixer diputar;
+        # on_start dipanggil dari tick() setelah channel terbukti berbunyi
+        stream.output_at = played_at + self.backend.output_latency()
+        return True
+
+    def _confirm_output(self, stream) -> None:
+        """Panggil on_start sekali, saat channel stream terbukti sedang berbunyi"""
+        on_start, stream.on_start = stream.on_start, None
+        try:
+            on_start(stream)
+        except Exception as e:
+            log_error(f"Error di callback mulai audio: {e}")
+
+    def _fade_out(self, stream) -> None:
+        stream.stopping = True
+        if stream.feed is not None:
+            # pygame tetap memutar blok antrian setelah fade, jadi senyapkan
+            pending = stream.channel.get_queue()
+            if pending is not None:
+                pending.set_volume(0.0)
+        if self.config.fade_out_ms > 0:
+            stream.channel.fadeout(self.config.fade_out_ms)
+        else:
+            stream.channel.stop()
+
+    def _target_level(self, stream, streams) -> float:
+        """Faktor volume: 1 untuk stream teratas, selainnya di-duck (mode campur)"""
+        if self.config.policy != "campur":
+            return 1.0
+        leader = max((s for s in streams if not s.stopping), key=lambda s: s.rank, default=None)
+        if leader is None or stream is leader:
+            return 1.0
+        return 10 ** (self.config.duck_db / 20)
+
+    def tick(self) -> None:
+        """Bersihkan stream selesai, mulai antrian, dan ramp ducking"""
+        finished = []
+        with self._lock:
+            for stream in list(self._active):
+                if stream.feed is not None and not stream.stopping:
+                    self._refill(stream)
+                busy = stream.channel.get_busy()
+                if busy and stream.on_start:
+                    self._confirm_output(stream)
+                if not busy:
+                    self._active.remove(stream)
+                    finished.append(stream)
+            policy = self.config.policy
+            while self._queue:
+                playing = [s for s in self._active if not s.stopping]
+                head = self._queue[0]
+                if policy == "antri" and playing:
+                    break
+                if policy == "potong" and any(s.priority > head.priority for s in playing):
+                    break
+                if policy == "potong":
+                    for other in playing:
+                        self._fade_out(other)
+                if not self._start(head):
+                    break
+                self._queue.pop(0)
+
+            # Ramp ducking agar perubahan volume tidak terdengar patah
+            step = (TICK_ACTIVE * 1000) / DUCK_RAMP_MS
+            for stream in self._active:
+                target = self._target_level(stream, self._active)
+                if stream.level != target:
+                    delta = max(-step, min(step, target - stream.level))
+                    stream.level = target if abs(target - stream.level) <= step else stream.level + delta
+                    stream.sound.set_volume(stream.volume * stream.level)
+            self._update_gauges()
+
+        for stream in finished:
+            self._finish(stream)
+        if self.active() and self.heartbeat:
+            supervisor.heartbeat(self.heartbeat)
+
+    def _refill(self, stream) -> None:
+        """Sambungkan blok berikutnya dari feed sebelum blok yang diputar habis"""
+        busy = stream.channel.get_busy()
+        if busy and stream.channel.get_queue() is not None:
+            return
+        block = stream.feed()
+        if block is None:
+            stream.feed = None  # Siaran selesai, stream berakhir setelah blok terakhir
+            return
+        sound = self.backend.load_buffer(block)
+        sound.set_volume(stream.volume * stream.level)
+        stream.sound = sound
+        if busy:
+            stream.channel.queue(sound)
+        else:
+            stream.channel.play(sound)
+
+    def _finish(self, stream) -> None:
+        stream.done.set()
+        if stream.on_done:
+            try:
+                stream.on_done(stream)
+            except Exception as e:
+                log_error(f"Error di callback selesai audio: {e}")
+
+    def _update_gauges(self) -> None:
+        _stream_gauge.set(len(self._active))
+        _queue_gauge.set(len(self._queue))
+
+    def stop_all(self, fade=True) -> None:
+        """Hentikan semua stream; antrian dibatalkan"""
+        with self._lock:
+            cancelled, self._queue = self._queue, []
+            for stream in self._active:
+                if fade:
+                    self._fade_out(stream)
+                else:
+                    stream.stopping = True
+                    stream.channel.stop()
+            self._update_gauges()
+        for stream in cancelled:
+            stream.success = False
+            self._finish(stream)
+
+    def _stop_loop(self) -> bool:
+        """Hentikan thread loop dan tunggu sampai keluar; False jika loop macet"""
+        self._running = False
+        thread = self._thread
+        if thread is None or thread is threading.current_thread():
+            return True
+        thread.join(RESET_TIMEOUT)
+        return not thread.is_alive()
+
+    def reset(self) -> None:
+        """Tutup backend audio dan gagalkan semua stream (dipanggil watchdog)
+
+        Loop mixer dihentikan dulu agar backend tidak ditutup selagi loop
+        masih memakai channel, lalu dijalankan lagi. Jika loop atau lock-nya
+        macet lebih dari RESET_TIMEOUT, RuntimeError dilempar tanpa menutup
+        backend: watchdog mencatatnya sebagai gagal restart dan mencoba lagi
+        pada pemeriksaan berikutnya, tanpa ikut tertahan.
+        """
+        restart = self._thread is not None and not self._closed
+        if not self._stop_loop():
+            raise RuntimeError("Loop mixer macet, backend tidak ditutup")
+        if not self._lock.acquire(timeout=RESET_TIMEOUT):
+            raise RuntimeError("Lock mixer tidak lepas, backend tidak ditutup")
+        try:
+            streams = self._active + self._queue
+            self._active, self._queue = [], []
+            self._update_gauges()
+        finally:
+            self._lock.release()
+        try:
+            self.backend.quit()
+        except Exception as e:
+            log_error(f"Gagal menutup mixer saat reset: {e}")
+        for stream in streams:
+            stream.success = False
+            self._finish(stream)
+        if restart:
+            self.start()
+
+    def shutdown(self) -> None:
+        """Hentikan loop mixer"""
+        self._closed = True
+        try:
+            self.reset()
+        except RuntimeError as e:
+            log_error(f"Gagal menutup mixer: {e}")
+
+
+def _tone(backend, frequency: float, seconds: float, amplitude: float = 0.3):
+    """Sound sinus stereo untuk benchmark"""
+    frames = int(MIXER_FREQUENCY * seconds)
+    samples = array.array("h")
+    for i in range(frames):
+        value = int(amplitude * 32767 * math.sin(2 * math.pi * frequency * i / MIXER_FREQUENCY))
+        samples.extend((value,) * MIXER_CHANNELS)
+    return backend.load_buffer(samples.tobytes())
+
+
+def benchmark(max_streams: int = 4, seconds: float = 3.0, backend_name: str = None) -> dict:
+    """Ukur CPU proses (persen satu core) saat 0..max_streams stream dicampur"""
+    mixer = Mixer(MixerConfig("campur", 0, 0, DEFAULT_DUCK_DB), max_streams=max(max_streams, 1),
+                  heartbeat=None, backend=create_backend(backend_name, "benchmark_mixer.wav"))
+    mixer.ensure_init()
+    mixer.start()
+    tones = [_tone(mixer.backend, 440 + 110 * i, seconds + 1) for i in range(max_streams)]
+    results = {}
+    for count in range(max_streams + 1):
+        for tone in tones[:count]:
+            mixer.play(tone, f"nada{count}", PRIORITY_BELL)
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        time.sleep(seconds)
+        cpu = time.process_time() - cpu_start
+        results[count] = 100.0 * cpu / (time.perf_counter() - wall_start)
+        mixer.stop_all(fade=False)
+        time.sleep(0.2)
+    mixer.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    streams = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    backend_name = sys.argv[3] if len(sys.argv) > 3 else None
+    for count, cpu in benchmark(streams, duration, backend_name).items():
+        print(f"{count} stream: CPU {cpu:.1f}%")
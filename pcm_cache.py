@@ -0,0 +1,334 @@
+# pcm_cache.py
+import mmap
+import os
+import struct
+import threading
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from constants import (
+    AUDIO_DIR, AUDIO_FORMATS, PCM_CACHE_DIR, PCM_CACHE_MAX_MB,
+    MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER
+)
+from data_manager import data_manager
+from logger import log_error, log_info, log_warning
+from metrics import registry, cache_counters
+
+_hits, _misses = cache_counters("pcm")
+_decode_timer = registry.histogram("pcm_decode_seconds", "Durasi decode file audio ke cache PCM",
+                                   buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+_evictions = registry.counter("pcm_cache_evictions_total", "File cache PCM yang dihapus karena penuh")
+
+
+def _shutdown_pool(executor, futures) -> None:
+    """Hentikan pool tanpa menunggu; tugas yang belum mulai dibatalkan
+
+    Pengganti shutdown(cancel_futures=True) yang baru ada di Python 3.9.
+    """
+    for future in list(futures):
+        future.cancel()
+    executor.shutdown(wait=False)
+
+
+def _init_decoder(settings) -> None:
+    """Inisialisasi pygame di proses transcoder tanpa membuka perangkat audio"""
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    import pygame
+    frequency, size, channels, buffer = settings
+    pygame.mixer.init(frequency=frequency, size=size, channels=channels, buffer=buffer)
+
+
+def _decode_to_wav(source: str, dest: str) -> int:
+    """Decode satu file ke WAV dengan format mixer; mengembalikan jumlah byte PCM
+
+    Dijalankan di proses transcoder. File ditulis ke .tmp lalu di-rename
+    agar pemutar tidak pernah membaca WAV yang belum lengkap.
+    """
+    import pygame
+    frequency, size, channels = pygame.mixer.get_init()
+    raw = pygame.mixer.Sound(source).get_raw()
+    tmp = dest + ".tmp"
+    with wave.open(tmp, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(abs(size) // 8)
+        wav.setframerate(frequency)
+        wav.writeframes(raw)
+    os.replace(tmp, dest)
+    return len(raw)
+
+
+def wav_data_range(buffer) -> tuple:
+    """Cari (offset, panjang) chunk data di WAV beserta formatnya
+
+    Mengembalikan (offset, panjang, frekuensi, lebar_sampel, kanal).
+    """
+    if buffer[:4] != b"RIFF" or buffer[8:12] != b"WAVE":
+        raise ValueError("Bukan file WAV")
+    position = 12
+    fmt = None
+    while position + 8 <= len(buffer):
+        chunk_id = bytes(buffer[position:position + 4])
+        chunk_size = struct.unpack("<I", buffer[position + 4:position + 8])[0]
+        body = position + 8
+        if chunk_id == b"fmt ":
+            channels, frequency = struct.unpack("<HI", buffer[body + 2:body + 8])
+            bits = struct.unpack("<H", buffer[body + 14:body + 16])[0]
+            fmt = (frequency, bits // 8, channels)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("Chunk fmt tidak ditemukan")
+            length = min(chunk_size, len(buffer) - body)
+            return (body, length) + fmt
+        position = body + chunk_size + (chunk_size & 1)
+    raise ValueError("Chunk data tidak ditemukan")
+
+
+class CachedPcm:
+    """PCM ter-cache yang di-memory-map
+
+    Yang dihemat adalah decode: backend tetap menyalin seluruh PCM ke Sound
+    baru setiap pemutaran (load_buffer), jadi halaman mmap dibaca semua saat
+    itu juga, bukan bertahap.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.offset, self.length, frequency, width, channels = wav_data_range(self._mmap)
+        except Exception:
+            self._file.close()
+            raise
+        self.matches_mixer = (frequency == MIXER_FREQUENCY and width == abs(MIXER_SIZE) // 8
+                              and channels == MIXER_CHANNELS)
+
+    def view(self) -> memoryview:
+        """Potongan PCM tanpa salinan; lepaskan dengan release() sebelum close()"""
+        return memoryview(self._mmap)[self.offset:self.offset + self.length]
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+
+class PcmCache:
+    """Cache PCM hasil decode di disk, dikunci dengan hash isi file
+
+    File MP3/OGG/FLAC di-decode sekali oleh proses transcoder di latar
+    belakang ke WAV berformat mixer. Pemutaran berikutnya me-memory-map WAV
+    tersebut dan menyalin PCM-nya ke Sound, tanpa decode di jalur bel. Hash
+    isi file dihitung saat pustaka disiapkan (warm_library); lookup() di
+    jalur bel hanya memakai hash yang sudah dikenal. Cache dibatasi ukuran
+    (setting `pcm_cache_max_mb`); file yang paling lama tidak dipakai dihapus
+    lebih dulu.
+    """
+
+    def __init__(self, cache_dir=PCM_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._hashes = {}  # path -> (mtime, ukuran, hash)
+        self._enabled = True
+        self._enabled_generation = None  # settings_generation saat _enabled dibaca
+        self._pending = set()
+        self._futures = set()  # Decode yang belum selesai, dibatalkan saat shutdown
+        self._executor = None
+        self._lock = threading.Lock()
+        registry.gauge_fn("pcm_cache_bytes", "Ukuran cache PCM di disk", self.size)
+
+    def enabled(self) -> bool:
+        """Setting pcm_cache_enabled, dibaca ulang hanya jika ada setting yang berubah"""
+        generation = data_manager.settings_generation
+        if generation != self._enabled_generation:
+            self._enabled = data_manager.get_setting("pcm_cache_enabled") != "0"
+            self._enabled_generation = generation
+        return self._enabled
+
+    def max_bytes(self) -> int:
+        try:
+            return int(data_manager.get_setting("pcm_cache_max_mb") or PCM_CACHE_MAX_MB) * 1024 * 1024
+        except ValueError:
+            return PCM_CACHE_MAX_MB * 1024 * 1024
+
+    def _content_hash(self, path: str, compute: bool = True):
+        """Hash isi file; dihitung ulang hanya jika mtime/ukuran berubah
+
+        Dengan compute=False hanya hash yang sudah dikenal dikembalikan
+        (None jika belum ada), tanpa membaca isi file.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        cached = self._hashes.get(path)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+        if not compute:
+            return None
+        file_hash = data_manager.calculate_file_hash(path)
+        if file_hash:
+            self._hashes[path] = (stat.st_mtime, stat.st_size, file_hash)
+        return file_hash
+
+    def cache_path(self, path: str, compute: bool = True):
+        """Lokasi WAV cache untuk file audio (belum tentu sudah ada)"""
+        file_hash = self._content_hash(path, compute)
+        if not file_hash:
+            return None
+        return os.path.join(self.cache_dir, f"{file_hash}_{MIXER_FREQUENCY}_{MIXER_CHANNELS}.wav")
+
+    def lookup(self, path: str):
+        """CachedPcm untuk file ini, atau None (decode dijadwalkan di latar belakang)"""
+        if not self.enabled():
+            return None
+        if path.lower().endswith(".wav"):
+            # WAV yang formatnya sudah sama dengan mixer langsung di-mmap
+            try:
+                pcm = CachedPcm(path)
+                if pcm.matches_mixer:
+                    _hits.inc()
+                    return pcm
+                pcm.close()
+            except (OSError, ValueError):
+                pass
+        cached_path = self.cache_path(path, compute=False)
+        if cached_path is None:
+            # Hash belum dikenal (file baru/berubah): hitung dan decode di
+            # latar belakang, bel ini diputar dari file aslinya
+            _misses.inc()
+            threading.Thread(target=self.request, args=(path,), daemon=True).start()
+            return None
+        if os.path.exists(cached_path):
+            try:
+                pcm = CachedPcm(cached_path)
+                if pcm.matches_mixer:
+                    os.utime(cached_path)  # Tandai baru dipakai untuk eviction LRU
+                    _hits.inc()
+                    return pcm
+                pcm.close()
+            except (OSError, ValueError) as e:
+                log_warning(f"Cache PCM rusak, di-decode ulang: {e}")
+            try:
+                os.remove(cached_path)
+            except OSError:
+                pass
+        _misses.inc()
+        self.request(path)
+        return None
+
+    def request(self, path: str) -> bool:
+        """Jadwalkan decode satu file; True jika benar-benar dijadwalkan"""
+        if not self.enabled() or not os.path.exists(path):
+            return False
+        if os.path.splitext(path)[1].lower() not in AUDIO_FORMATS:
+            return False
+        cached_path = self.cache_path(path)
+        if cached_path is None or os.path.exists(cached_path):
+            return False
+        with self._lock:
+            if cached_path in self._pending:
+                return False
+            self._pending.add(cached_path)
+            if self._executor is None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                settings = (MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER)
+                self._executor = ProcessPoolExecutor(max_workers=1, initializer=_init_decoder,
+                                                     initargs=(settings,))
+            executor = self._executor
+        start = time.perf_counter()
+        try:
+            future = executor.submit(_decode_to_wav, path, cached_path)
+        except RuntimeError as e:
+            with self._lock:
+                self._pending.discard(cached_path)
+            log_error(f"Gagal menjadwalkan decode {path}: {e}")
+            return False
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(lambda f: self._on_decoded(f, path, cached_path, start))
+        return True
+
+    def _on_decoded(self, future, path, cached_path, start) -> None:
+        with self._lock:
+            self._pending.discard(cached_path)
+            self._futures.discard(future)
+        if future.cancelled():
+            return
+        try:
+            size = future.result()
+            _decode_timer.observe(time.perf_counter() - start)
+            log_info(f"Cache PCM dibuat: {os.path.basename(path)} ({size / 1024 / 1024:.1f} MB)")
+        except Exception as e:
+            log_error(f"Gagal decode {path} ke cache PCM: {e}")
+            return
+        self.evict()
+
+    def warm(self, paths) -> int:
+        """Jadwalkan decode untuk banyak file; mengembalikan jumlah yang dijadwalkan"""
+        return sum(1 for path in set(paths) if self.request(path))
+
+    def warm_library(self) -> int:
+        """Decode semua file di folder audio/ yang belum ada di cache"""
+        if not os.path.isdir(AUDIO_DIR):
+            return 0
+        paths = [os.path.join(AUDIO_DIR, name) for name in os.listdir(AUDIO_DIR)
+                 if os.path.splitext(name)[1].lower() in AUDIO_FORMATS]
+        count = self.warm(paths)
+        if count:
+            log_info(f"Menyiapkan cache PCM untuk {count} file audio")
+        return count
+
+    def _entries(self) -> list:
+        """(mtime, ukuran, path) semua file cache"""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(".wav"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        """Total ukuran cache (byte)"""
+        return sum(entry[1] for entry in self._entries())
+
+    def evict(self) -> int:
+        """Hapus file yang paling lama tidak dipakai sampai di bawah batas ukuran"""
+        entries = sorted(self._entries())
+        total = sum(entry[1] for entry in entries)
+        limit = self.max_bytes()
+        removed = 0
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except OSError as e:
+                # Di Windows file yang sedang di-mmap tidak bisa dihapus
+                log_warning(f"Gagal menghapus cache PCM {path}: {e}")
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            _evictions.inc(removed)
+            log_info(f"{removed} file cache PCM dihapus (batas {limit // 1024 // 1024} MB)")
+        return removed
+
+    def shutdown(self) -> None:
+        """Hentikan proses transcoder tanpa menunggu decode yang berjalan"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            futures, self._futures = self._futures, set()
+        if executor is not None:
+            _shutdown_pool(executor, futures)
+
+
+# Instance global
+pcm_cache = PcmCache()
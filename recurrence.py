@@ -0,0 +1,129 @@
+# recurrence.py
+import heapq
+import datetime
+from constants import DAYS
+
+# Jenis aturan berulang
+RULE_KINDS = ["interval", "mingguan", "bulanan"]
+
+
+class RecurrenceRule:
+    """Aturan bel berulang yang disimpan ringkas dalam satu baris database
+
+    - interval : setiap `interval_minutes` menit dari `start_time` s/d `end_time`
+    - mingguan : setiap `week_interval` minggu (dihitung dari `anchor_date`)
+    - bulanan  : hanya pada hari ke-`nth` bulan itu (-1 = terakhir)
+
+    Jendela interval bisa dipakai bersama aturan mingguan/bulanan.
+    """
+    __slots__ = ("id", "kind", "day", "start_time", "end_time", "interval_minutes",
+                 "week_interval", "anchor_date", "nth", "audio_path")
+
+    def __init__(self, id, kind, day, start_time, end_time, interval_minutes,
+                 week_interval, anchor_date, nth, audio_path):
+        self.id = id
+        self.kind = kind
+        self.day = day
+        self.start_time = start_time
+        self.end_time = end_time
+        self.interval_minutes = interval_minutes
+        self.week_interval = week_interval or 1
+        self.anchor_date = anchor_date
+        self.nth = nth
+        self.audio_path = audio_path
+
+    @classmethod
+    def from_row(cls, row):
+        """Buat aturan dari baris tabel recurrence_rules"""
+        return cls(*row)
+
+    def validate(self) -> None:
+        """Lempar ValueError jika aturan tidak valid"""
+        if self.kind not in RULE_KINDS:
+            raise ValueError(f"Jenis aturan tidak dikenal: {self.kind}")
+        if self.day not in DAYS:
+            raise ValueError(f"Hari tidak valid: {self.day}")
+        start = parse_minutes(self.start_time)
+        if self.kind == "interval" or self.interval_minutes:
+            if not self.interval_minutes or self.interval_minutes <= 0:
+                raise ValueError("Interval harus lebih dari 0 menit")
+            if parse_minutes(self.end_time) < start:
+                raise ValueError("Jam selesai sebelum jam mulai")
+        if self.kind == "mingguan":
+            if self.week_interval < 1:
+                raise ValueError("Interval minggu minimal 1")
+            datetime.date.fromisoformat(self.anchor_date)
+        if self.kind == "bulanan" and self.nth not in (1, 2, 3, 4, 5, -1):
+            raise ValueError("Urutan hari dalam bulan harus 1-5 atau -1")
+
+    def applies_on(self, date: datetime.date, day_name: str = None) -> bool:
+        """True jika aturan aktif pada tanggal tersebut
+
+        `day_name` dipakai saat hari khusus meminjam jadwal hari lain.
+        """
+        if (day_name or DAYS[date.weekday()]) != self.day:
+            return False
+        if self.kind == "mingguan" and self.week_interval > 1:
+            anchor = datetime.date.fromisoformat(self.anchor_date)
+            anchor_monday = anchor - datetime.timedelta(days=anchor.weekday())
+            monday = date - datetime.timedelta(days=date.weekday())
+            weeks = (monday - anchor_monday).days // 7
+            if weeks % self.week_interval != 0:
+                return False
+        if self.kind == "bulanan":
+            if self.nth == -1:
+                return (date + datetime.timedelta(days=7)).month != date.month
+            return (date.day - 1) // 7 + 1 == self.nth
+        return True
+
+    def iter_times(self):
+        """Generator jam "HH:MM" dalam satu hari"""
+        minute = parse_minutes(self.start_time)
+        if not self.interval_minutes:
+            yield _format_minutes(minute)
+            return
+        end = parse_minutes(self.end_time)
+        while minute <= end:
+            yield _format_minutes(minute)
+            minute += self.interval_minutes
+
+
+def parse_minutes(time_str: str) -> int:
+    """Ubah "HH:MM" menjadi menit sejak tengah malam"""
+    parsed = datetime.datetime.strptime(time_str, "%H:%M")
+    return parsed.hour * 60 + parsed.minute
+
+
+def _format_minutes(minutes: int) -> str:
+    """Ubah menit sejak tengah malam menjadi "HH:MM" """
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def iter_rule_occurrences(rule: RecurrenceRule, start: datetime.datetime):
+    """Generator tak hingga (datetime, audio_path) untuk satu aturan mulai dari `start`
+
+    Hanya satu hari yang diekspansi pada satu waktu, jadi memori tidak
+    bertambah seberapa jauh pun konsumen membaca ke depan.
+    """
+    date = start.date()
+    while True:
+        if rule.applies_on(date):
+            for time_str in rule.iter_times():
+                hour, minute = map(int, time_str.split(":"))
+                occurrence = datetime.datetime.combine(date, datetime.time(hour, minute))
+                if occurrence >= start:
+                    yield occurrence, rule.audio_path
+        date += datetime.timedelta(days=1)
+
+
+def iter_timeline(rules, start: datetime.datetime, end: datetime.datetime = None):
+    """Gabungkan semua aturan menjadi satu timeline terurut secara lazy
+
+    Jika `end` diberikan, generator berhenti di horizon tersebut.
+    """
+    merged = heapq.merge(*(iter_rule_occurrences(rule, start) for rule in rules),
+                         key=lambda item: item[0])
+    for occurrence in merged:
+        if end is not None and occurrence[0] >= end:
+            return
+        yield occurrence
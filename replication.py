@@ -0,0 +1,168 @@
+# replication.py
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from constants import REPLICATION_INTERVAL, REPLICATION_MAX_CHANGES
+from logger import log_info, log_warning
+from metrics import registry
+
+# Compaction change log di primary paling sering sekali per jam
+COMPACT_INTERVAL = 3600  # detik
+HTTP_TIMEOUT = 10  # detik
+
+_version_gauge = registry.gauge("replication_version", "Versi change log yang sudah diterapkan replica")
+_lag_gauge = registry.gauge("replication_lag_versions", "Selisih versi replica terhadap primary")
+_bytes_received = registry.counter("replication_bytes_total", "Byte respon sinkronisasi yang diterima replica")
+_apply_timer = registry.histogram("replication_apply_seconds", "Durasi menerapkan delta atau snapshot")
+
+
+class ReplicationPublisher:
+    """Sisi primary: delta change log dan snapshot, disajikan lewat API kontrol
+
+    Semua perubahan tabel replikasi dicatat trigger SQLite ke change_log,
+    jadi perubahan lewat GUI, API maupun reset ikut tersebar tanpa kode
+    tambahan di setiap method DataManager.
+    """
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        self.node_id = data_manager.get_setting("replication_node_id")
+        if not self.node_id:
+            # Id berubah jika database diganti, replica lalu memuat snapshot baru
+            self.node_id = uuid.uuid4().hex[:12]
+            data_manager.set_setting("replication_node_id", self.node_id)
+        self._last_compact = 0.0
+        self._snapshot = None  # (versi, body JSON)
+        self._lock = threading.Lock()
+
+    def _maintain(self) -> None:
+        now = time.monotonic()
+        if now - self._last_compact >= COMPACT_INTERVAL:
+            self._last_compact = now
+            self.data_manager.compact_change_log()
+
+    def changes(self, since: int) -> tuple:
+        """(etag, body) delta setelah versi `since`; None jika replica harus memuat snapshot"""
+        self._maintain()
+        version, rows = self.data_manager.get_changes(since)
+        etag = f'"r{version}"'
+        if rows is None:
+            return etag, None
+        body = {"node": self.node_id, "version": version, "changes": rows}
+        return etag, json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+    def snapshot(self) -> tuple:
+        """(etag, body) snapshot lengkap, diserialisasi sekali per versi"""
+        version = self.data_manager.change_log_version()
+        with self._lock:
+            if self._snapshot is not None and self._snapshot[0] == version:
+                return f'"s{version}"', self._snapshot[1]
+        snapshot = self.data_manager.export_snapshot()
+        if snapshot is None:
+            raise RuntimeError("Snapshot gagal dibuat")
+        snapshot["node"] = self.node_id
+        body = json.dumps(snapshot, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._snapshot = (snapshot["version"], body)
+        return f'"s{snapshot["version"]}"', body
+
+
+class ReplicaSync:
+    """Sisi replica: tarik delta dari primary secara berkala
+
+    Replica mengirim versi terakhirnya sebagai If-None-Match, sehingga
+    tarikan saat tidak ada perubahan hanya berupa respon 304 kosong.
+    Snapshot hanya dimuat saat pertama kali, saat delta yang dibutuhkan
+    sudah di-compact, atau saat database primary diganti.
+    """
+
+    def __init__(self, data_manager, primary_url, token=None, interval=REPLICATION_INTERVAL):
+        self.data_manager = data_manager
+        self.primary_url = primary_url.rstrip("/")
+        self.token = token or None
+        self.interval = interval
+        self.thread = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Jalankan sinkronisasi di thread daemon"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        log_info(f"Replica menarik jadwal dari {self.primary_url}")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+            except Exception as e:
+                log_warning(f"Sinkronisasi replika gagal: {e}")
+            self._stop.wait(self.interval)
+
+    def _get(self, path, etag=None) -> tuple:
+        """(status, body dict atau None)"""
+        request = urllib.request.Request(self.primary_url + path)
+        if etag:
+            request.add_header("If-None-Match", etag)
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+                raw = response.read()
+                _bytes_received.inc(len(raw))
+                return response.status, json.loads(raw)
+        except urllib.error.HTTPError as e:
+            if e.code in (304, 410):
+                return e.code, None
+            raise
+
+    def _load_snapshot(self) -> int:
+        status, snapshot = self._get("/api/replication/snapshot")
+        start = time.perf_counter()
+        if not self.data_manager.import_snapshot(snapshot):
+            raise RuntimeError("Snapshot gagal dimuat")
+        _apply_timer.observe(time.perf_counter() - start)
+        self.data_manager.set_setting("replication_source", snapshot["node"])
+        return snapshot["version"]
+
+    def sync_once(self) -> int:
+        """Satu putaran sinkronisasi; mengembalikan jumlah perubahan yang diterapkan"""
+        version = int(self.data_manager.get_setting("replication_version") or 0)
+        source = self.data_manager.get_setting("replication_source")
+        applied = 0
+        if not source:
+            version = self._load_snapshot()
+            source = self.data_manager.get_setting("replication_source")
+        while True:
+            status, body = self._get(f"/api/replication/changes?since={version}", f'"r{version}"')
+            if status == 304:
+                _lag_gauge.set(0)
+                break
+            if status == 410 or body["node"] != source:
+                log_info("Delta tidak tersedia di primary, memuat snapshot")
+                version = self._load_snapshot()
+                source = self.data_manager.get_setting("replication_source")
+                continue
+            changes = body["changes"]
+            new_version = changes[-1][0] if changes else body["version"]
+            start = time.perf_counter()
+            if not self.data_manager.apply_changes(changes, new_version):
+                raise RuntimeError("Delta gagal diterapkan")
+            _apply_timer.observe(time.perf_counter() - start)
+            applied += len(changes)
+            version = new_version
+            _lag_gauge.set(body["version"] - version)
+            if len(changes) < REPLICATION_MAX_CHANGES:
+                break
+        _version_gauge.set(version)
+        if applied:
+            log_info(f"Replika menerapkan {applied} perubahan (versi {version})")
+        return applied
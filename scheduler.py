@@ -1,55 +1,280 @@
 # scheduler.py
 import threading
 import datetime
+import heapq
 import time as time_module
-import sys
 from data_manager import data_manager
 from audio_player import AudioPlayer
-from logger import log_error, log_info
+from holiday_calendar import CalendarResolver
+from clock import system_clock
+from clock_sync import clock_sync
+from clock_monitor import ClockMonitor, EVENT_JUMP_BACKWARD
+from fire_log import FireLog, OUTCOME_PLAYED, OUTCOME_CATCHUP, OUTCOME_FAILED, OUTCOME_MISSED
+from latency import latency_tracker, FireTrace, STAGE_WAKEUP, STAGE_NOTIFY
+from logger import log_error, log_info, log_warning
+from metrics import registry
+from watchdog import supervisor
 from utils import show_notification
-from constants import DAYS, SCHEDULE_CHECK_INTERVAL
+from constants import (
+    SCHEDULE_CHECK_INTERVAL, CATCHUP_POLICIES, DEFAULT_CATCHUP_POLICY,
+    DEFAULT_CATCHUP_WINDOW, CATCHUP_MAX_DAYS
+)
 
 class BellScheduler:
-    def __init__(self, audio_player=None):
+    """Bunyikan bel sesuai rencana kalender
+
+    `clock` (default jam sistem) bisa diganti SimulatedClock agar seminggu
+    jadwal diputar ulang dalam hitungan detik; dengan `start=False` loop
+    tidak dijalankan di thread dan pemanggil menggerakkannya lewat step().
+    `notify` dipanggil (title, message) saat bel berbunyi, None = tanpa notifikasi.
+    """
+
+    def __init__(self, audio_player=None, clock=None, notify=show_notification, start=True):
         self.running = True
         self.audio_player = audio_player or AudioPlayer()
-        self.last_played = {}  # Track last played time to avoid repeats
-        self.thread = threading.Thread(target=self._run, daemon=True)
-        self.thread.start()
+        self.clock = clock or system_clock
+        self.notify = notify
+        self.calendar = CalendarResolver(data_manager)
+        self.fire_log = FireLog(data_manager)
+        self.clock_monitor = ClockMonitor(clock=self.clock)
+        self.last_tick = None
+        self._last_sleep = None
+        self._heap = []  # (scheduled_at, audio_path) bel berikutnya
+        self._heap_date = None
+        self._heap_generation = None
+        self._tick_timer = registry.histogram("scheduler_tick_seconds", "Durasi satu tick scheduler")
+        registry.gauge_fn("scheduler_heap_size", "Jumlah bel di antrian berikutnya", lambda: len(self._heap))
+        registry.gauge_fn("scheduler_clock_drift_seconds", "Akumulasi selisih jam dinding vs monotonic",
+                          lambda: self.clock_monitor.drift)
+        registry.gauge_fn("scheduler_alive", "1 jika thread scheduler hidup",
+                          lambda: int(self.thread is not None and self.thread.is_alive()))
+        self._generation = 0
+        # Diambil saat memutuskan dan membunyikan bel, agar thread lama yang
+        # macet dan thread pengganti dari restart() tidak membunyikan bel yang sama
+        self._fire_lock = threading.Lock()
+        self.thread = None
+        if start:
+            self.thread = threading.Thread(target=self._run, args=(self._generation,), daemon=True)
+            self.thread.start()
+        else:
+            self._startup_catch_up()
         log_info("Scheduler diinisialisasi")
 
-    def _run(self) -> None:
+    def restart(self) -> None:
+        """Jalankan ulang loop di thread baru (dipanggil watchdog)
+
+        Thread lama yang macet akan keluar sendiri begitu lepas karena
+        generasinya sudah tidak berlaku; sampai saat itu ia tidak lagi
+        mengubah heap maupun membunyikan bel (lihat _superseded).
+        """
+        if not self.running:
+            return
+        self._generation += 1
+        self._heap_date = None  # Paksa susun ulang heap
+        self.thread = threading.Thread(target=self._run, args=(self._generation,), daemon=True)
+        self.thread.start()
+        log_info("Scheduler dijalankan ulang")
+
+    def next_bell(self):
+        """(scheduled_at, audio_path) bel berikutnya, None jika tidak ada"""
+        heap = self._heap
+        return heap[0] if heap else None
+
+    def _superseded(self) -> bool:
+        """True jika dipanggil dari thread loop yang sudah diganti restart()"""
+        thread = self.thread
+        return thread is not None and threading.current_thread() is not thread
+
+    def _run(self, generation=0) -> None:
         """Main scheduler loop"""
-        while self.running:
-            try:
-                now = datetime.datetime.now()
-                # Hanya Senin-Sabtu (0-5)
-                if now.weekday() < 6:
-                    day_name = DAYS[now.weekday()]
-                    current_time_str = now.strftime("%H:%M")
-                    
-                    # Check if we've already played a bell for this time
-                    last_key = f"{day_name}_{current_time_str}"
-                    if last_key not in self.last_played or \
-                       (now - self.last_played[last_key]).total_seconds() > 60:
-                        
-                        schedules = data_manager.get_schedules().get(day_name, [])
-                        for schedule_time, path in schedules:
-                            if schedule_time == current_time_str:
-                                # Tampilkan notifikasi
-                                show_notification(f"Bell Sekolah", f"Memutar bell untuk {day_name} pukul {schedule_time}")
-                                
-                                # Putar audio
-                                self.audio_player.play_audio(path)
-                                self.last_played[last_key] = now
-                                break
-                
-                time_module.sleep(SCHEDULE_CHECK_INTERVAL)
-            except Exception as e:
-                log_error(f"Error di scheduler: {e}")
-                time_module.sleep(SCHEDULE_CHECK_INTERVAL)
-    
+        supervisor.heartbeat("scheduler")
+        try:
+            if generation == 0:
+                self._startup_catch_up()
+            elif self.last_tick is not None:
+                # Thread hasil restart() hanya menyusulkan bel selama thread lama
+                # macet, memakai riwayat yang sudah ada di memori
+                self.catch_up(self.last_tick, self.clock.now())
+        except Exception as e:
+            log_error(f"Error saat susulan awal: {e}")
+
+        while self.running and generation == self._generation:
+            supervisor.heartbeat("scheduler")
+            self.step()
+
+    def step(self) -> None:
+        """Satu tick lalu tidur sampai bel berikutnya"""
+        try:
+            self.tick()
+            self._sleep_until_next()
+        except Exception as e:
+            log_error(f"Error di scheduler: {e}")
+            self._last_sleep = SCHEDULE_CHECK_INTERVAL
+            self.clock.sleep(SCHEDULE_CHECK_INTERVAL)
+
+    def tick(self) -> None:
+        """Periksa anomali jam, susun ulang heap bila perlu, bunyikan bel yang jatuh tempo"""
+        if self._superseded():
+            return  # Thread lama yang baru lepas dari macet; keluar di cek loop berikutnya
+        tick_start = time_module.perf_counter()
+        now = self.clock.now()
+        event = self.clock_monitor.tick(self._last_sleep)
+        if event is not None:
+            registry.counter("scheduler_clock_events_total", "Anomali jam menurut jenis",
+                             {"kind": event.kind}).inc()
+            log_warning(f"{event.describe()} (drift kumulatif {self.clock_monitor.drift:+.3f} detik)")
+            if event.kind != EVENT_JUMP_BACKWARD and self.last_tick is not None:
+                self.catch_up(self.last_tick, now)
+            self._rebuild_heap(now)
+        else:
+            today = now.date()
+            if self._heap_date != today or self._heap_generation != data_manager.cache_generation:
+                self._rebuild_heap(now)
+        self.last_tick = now
+
+        self._fire_due(now)
+        self.fire_log.flush()
+        latency_tracker.flush(data_manager, self._heap_date)  # Heap selalu milik hari `now`
+        self._tick_timer.observe(time_module.perf_counter() - tick_start)
+
+    def _rebuild_heap(self, now) -> None:
+        """Susun ulang heap bel berikutnya dari menit ini s/d akhir besok"""
+        start = now.replace(second=0, microsecond=0)
+        end = datetime.datetime.combine(now.date() + datetime.timedelta(days=2), datetime.time())
+        heap = [(scheduled_at, path)
+                for scheduled_at, path in self._scheduled_between(start, end)
+                if not self.fire_log.has_fired(scheduled_at)]
+        heapq.heapify(heap)
+        if self._superseded():
+            return
+        self._heap = heap
+        self._heap_date = now.date()
+        self._heap_generation = data_manager.cache_generation
+
+    def _fire_due(self, now) -> None:
+        """Bunyikan semua bel di puncak heap yang waktunya sudah tiba"""
+        late_since = None
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            with self._fire_lock:
+                if self._superseded():
+                    return
+                scheduled_at, path = heapq.heappop(heap)
+                if self.fire_log.has_fired(scheduled_at):
+                    continue
+                if (now - scheduled_at).total_seconds() < 60:
+                    self._fire(scheduled_at, path, now, OUTCOME_PLAYED)
+                    continue
+            if late_since is None:
+                late_since = scheduled_at
+        if late_since is not None:
+            # Tick terlambat lebih dari semenit, serahkan ke kebijakan susulan
+            self.catch_up(late_since, now)
+
+    def _sleep_until_next(self) -> None:
+        """Tidur sampai bel berikutnya, paling lama SCHEDULE_CHECK_INTERVAL"""
+        delay = SCHEDULE_CHECK_INTERVAL
+        if self._heap:
+            until = (self._heap[0][0] - self.clock.now()).total_seconds()
+            delay = min(max(until, 0.05), SCHEDULE_CHECK_INTERVAL)
+        self._last_sleep = delay
+        self.clock.sleep(delay)
+
+    def _fire(self, scheduled_at, path, now, outcome) -> None:
+        """Bunyikan bel dan catat hasilnya"""
+        trace = None
+        if outcome == OUTCOME_PLAYED and self.clock.realtime:
+            # Bel susulan dan simulasi tidak diukur agar histogram latensi tidak tercemar
+            # Tahap berikutnya dicap dengan jam lokal, jadi buang koreksi offset
+            skew = clock_sync.offset
+            trace = FireTrace(scheduled_at.timestamp() - skew)
+            trace.mark(STAGE_WAKEUP, now.timestamp() - skew)
+        plan = self.calendar.plan_for(scheduled_at.date())
+        day_name = plan.day_name
+        time_str = scheduled_at.strftime("%H:%M")
+        # Tampilkan notifikasi di thread lain agar tidak menunda audio
+        if self.notify is not None:
+            threading.Thread(
+                target=self.notify,
+                args=("Bell Sekolah", f"Memutar bell untuk {day_name} pukul {time_str}"),
+                daemon=True
+            ).start()
+        if trace:
+            trace.mark(STAGE_NOTIFY)
+
+        # Putar audio
+        success = self.audio_player.play_audio(path, trace=trace, gain_db=plan.gains.get(time_str))
+        self.fire_log.record(scheduled_at, now, outcome if success else OUTCOME_FAILED, path)
+
+    def _scheduled_between(self, start, end):
+        """Generator (scheduled_at, path) terurut dalam rentang [start, end)"""
+        date = start.date()
+        while date <= end.date():
+            plan = self.calendar.plan_for(date)
+            for time_str, path in plan.bells.items():
+                hour, minute = map(int, time_str.split(":"))
+                scheduled_at = datetime.datetime.combine(date, datetime.time(hour, minute))
+                if start <= scheduled_at < end:
+                    yield scheduled_at, path
+            date += datetime.timedelta(days=1)
+
+    def _startup_catch_up(self) -> None:
+        """Muat riwayat lalu susulkan bel yang terlewat selama aplikasi mati"""
+        now = self.clock.now()
+        earliest = now - datetime.timedelta(days=CATCHUP_MAX_DAYS)
+        self.fire_log.load(earliest)
+        records = data_manager.get_fire_records(earliest.isoformat(sep=" ", timespec="seconds"))
+        if records:
+            # Mulai setelah bel terakhir yang tercatat
+            since = datetime.datetime.fromisoformat(records[-1][0]) + datetime.timedelta(minutes=1)
+        else:
+            since = datetime.datetime.combine(now.date(), datetime.time())
+        self.catch_up(since, now)
+
+    def catch_up(self, since, now) -> None:
+        """Terapkan kebijakan susulan untuk bel dalam rentang [since, menit ini)"""
+        policy = data_manager.get_setting("catchup_policy") or DEFAULT_CATCHUP_POLICY
+        if policy not in CATCHUP_POLICIES:
+            log_warning(f"Kebijakan susulan tidak dikenal: {policy}, memakai {DEFAULT_CATCHUP_POLICY}")
+            policy = DEFAULT_CATCHUP_POLICY
+        try:
+            window = int(data_manager.get_setting("catchup_window") or DEFAULT_CATCHUP_WINDOW)
+        except ValueError:
+            window = DEFAULT_CATCHUP_WINDOW
+
+        since = max(since, now - datetime.timedelta(days=CATCHUP_MAX_DAYS))
+        with self._fire_lock:
+            if not self._superseded():
+                self._catch_up_locked(since, now, policy, window)
+
+    def _catch_up_locked(self, since, now, policy, window) -> None:
+        """Catat bel terlewat dan susulkan sesuai kebijakan (dengan _fire_lock dipegang)"""
+        # Bel pada menit berjalan ditangani oleh loop biasa
+        current_minute = now.replace(second=0, microsecond=0)
+        missed = [(scheduled_at, path)
+                  for scheduled_at, path in self._scheduled_between(since, current_minute)
+                  if not self.fire_log.has_fired(scheduled_at)]
+        if not missed:
+            return
+
+        latest = missed[-1]
+        ring = None
+        if policy == "terakhir" or \
+           (policy == "jendela" and (now - latest[0]).total_seconds() <= window):
+            ring = latest
+
+        log_warning(f"{len(missed)} bel terlewat sejak {since:%Y-%m-%d %H:%M} "
+                    f"(kebijakan: {policy}, disusulkan: {1 if ring else 0})")
+        for scheduled_at, path in missed:
+            if ring is None or scheduled_at != ring[0]:
+                self.fire_log.record(scheduled_at, None, OUTCOME_MISSED, path)
+        if ring:
+            self._fire(ring[0], ring[1], now, OUTCOME_CATCHUP)
+        self.fire_log.flush()
+
     def stop(self) -> None:
         """Stop scheduler"""
         self.running = False
-        log_info("Scheduler dihentikan")
\ No newline at end of file
+        self.fire_log.flush()
+        latency_tracker.flush(data_manager)
+        log_info("Scheduler dihentikan")
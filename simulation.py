@@ -0,0 +1,325 @@
+# simulation.py
+import collections
+import datetime
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import data_manager as data_manager_module
+from data_manager import data_manager
+from audio_backend import NullBackend
+from clock import SimulatedClock
+from fire_log import OUTCOME_PLAYED, OUTCOME_CATCHUP
+from holiday_calendar import CalendarResolver
+from loudness import gain_to_volume
+from mixer import Mixer, MixerConfig, PRIORITY_BELL
+from scheduler import BellScheduler
+
+# Klasifikasi bel di laporan
+RESULT_ON_TIME = "tepat"
+RESULT_LATE = "terlambat"
+RESULT_CATCHUP = "susulan"
+RESULT_MISSED = "terlewat"
+RESULT_DUPLICATED = "ganda"
+RESULT_UNEXPECTED = "tak_terduga"
+RESULTS = (RESULT_ON_TIME, RESULT_LATE, RESULT_CATCHUP, RESULT_MISSED, RESULT_DUPLICATED, RESULT_UNEXPECTED)
+
+LATE_TOLERANCE = 1.0  # detik
+
+# Skenario bawaan: seminggu jadwal dengan libur, lompatan jam, suspend,
+# perubahan jadwal dan aplikasi mati. "expect" adalah hasil yang benar
+# menurut kebijakan susulan "jendela" 120 detik.
+DEFAULT_SCENARIO = {
+    "start": "2026-01-05 05:00",
+    "days": 7,
+    "schedules": [{"day": day, "time": t, "audio": f"{t.replace(':', '')}.wav"}
+                  for day in ("Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu")
+                  for t in ("07:00", "09:30", "12:00", "14:00")],
+    "holidays": [{"start": "2026-01-08", "end": "2026-01-08", "description": "Libur simulasi"}],
+    "settings": {"catchup_policy": "jendela", "catchup_window": "120"},
+    "events": [
+        {"at": "2026-01-06 09:00", "type": "jump", "seconds": 3600},
+        {"at": "2026-01-07 13:59", "type": "suspend", "seconds": 120},
+        {"at": "2026-01-09 08:00", "type": "add_schedule", "day": "Jumat", "time": "10:15", "audio": "1015.wav"},
+        {"at": "2026-01-09 08:00", "type": "delete_schedule", "day": "Jumat", "time": "12:00", "audio": "1200.wav"},
+        {"at": "2026-01-09 09:00", "type": "jump", "seconds": -1800},
+        {"at": "2026-01-10 06:00", "type": "restart", "down": 10800},
+        {"at": "2026-01-10 20:00", "type": "utc_offset", "offset": 3600},
+    ],
+    "expect": {"tepat": 17, "terlambat": 0, "susulan": 1, "terlewat": 2, "ganda": 0, "tak_terduga": 0},
+}
+
+
+def _parse_time(value: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value)
+
+
+class RecordingPlayer:
+    """Pemutar untuk simulasi: mixer sungguhan di atas NullBackend berjam tiruan
+
+    Dipanggil sinkron dari scheduler (tanpa thread), sehingga setiap
+    pemutaran tercatat tepat pada waktu simulasi.
+    """
+
+    def __init__(self, clock, durations=None):
+        self.clock = clock
+        self.backend = NullBackend(clock=clock.monotonic, durations=durations or {})
+        self.mixer = Mixer(MixerConfig.from_settings(data_manager), heartbeat=None, backend=self.backend)
+        self.mixer.ensure_init()
+        self.plays = []  # (waktu simulasi, path)
+
+    @property
+    def currently_playing(self) -> bool:
+        return self.mixer.active()
+
+    def play_audio(self, path: str, blocking: bool = False, trace=None, gain_db=None,
+                   priority: int = PRIORITY_BELL) -> bool:
+        self.mixer.tick()
+        sound = self.backend.load(path)
+        self.mixer.play(sound, os.path.basename(path), priority, gain_to_volume(gain_db or 0.0))
+        self.plays.append((self.clock.now(), path))
+        return True
+
+    def stop_audio(self):
+        self.mixer.stop_all()
+
+    def reset(self) -> None:
+        self.mixer.reset()
+
+    def shutdown(self) -> None:
+        self.mixer.shutdown()
+
+
+class SimulationReport:
+    """Hasil simulasi per bel: tepat, terlambat, susulan, terlewat, ganda, tak terduga"""
+
+    def __init__(self, start, end, wall_seconds):
+        self.start = start
+        self.end = end
+        self.wall_seconds = wall_seconds
+        self.items = {result: [] for result in RESULTS}  # hasil -> [(scheduled_at, path, detail)]
+        self.expected = 0
+        self.plays = 0
+        self.events = []
+
+    def counts(self) -> dict:
+        return {result: len(items) for result, items in self.items.items()}
+
+    def ok(self, expect=None) -> bool:
+        """Cocok dengan `expect`; tanpa expect, semua bel harus tepat waktu"""
+        counts = self.counts()
+        if expect:
+            return all(counts.get(result, 0) == value for result, value in expect.items())
+        return counts[RESULT_ON_TIME] == self.expected and not any(
+            counts[result] for result in RESULTS if result != RESULT_ON_TIME)
+
+    def as_dict(self) -> dict:
+        return {
+            "start": self.start.isoformat(), "end": self.end.isoformat(),
+            "wall_seconds": round(self.wall_seconds, 3), "expected": self.expected,
+            "plays": self.plays, "counts": self.counts(), "events": self.events,
+            "items": {result: [[at.isoformat(), path, detail] for at, path, detail in items]
+                      for result, items in self.items.items() if result != RESULT_ON_TIME},
+        }
+
+    def summary(self) -> str:
+        days = (self.end - self.start).total_seconds() / 86400
+        lines = [f"Simulasi {days:.1f} hari dalam {self.wall_seconds:.2f} detik: "
+                 f"{self.expected} bel diharapkan, {self.plays} diputar"]
+        lines.append(", ".join(f"{result} {count}" for result, count in self.counts().items()))
+        for result in RESULTS:
+            if result == RESULT_ON_TIME:
+                continue
+            for at, path, detail in self.items[result]:
+                lines.append(f"  [{result}] {at:%Y-%m-%d %H:%M} {os.path.basename(path)} {detail}".rstrip())
+        return "\n".join(lines)
+
+
+class Simulation:
+    """Putar ulang jadwal berhari-hari dengan jam tiruan dalam hitungan detik
+
+    Berjalan di database sementara (salinan `database` atau database baru
+    berisi jadwal skenario), jadi database aplikasi tidak tersentuh. Bel
+    yang diharapkan dihitung dari kalender pada saat bel jatuh tempo, lalu
+    dibandingkan dengan fire_log dan pemutaran yang benar-benar terjadi.
+
+    Jenis kejadian: jump, suspend, utc_offset, restart, add_schedule,
+    delete_schedule, holiday, setting.
+    """
+
+    def __init__(self, scenario: dict, database: str = None):
+        self.scenario = scenario
+        self.database = database
+        self.start = _parse_time(scenario["start"])
+        self.end = self.start + datetime.timedelta(days=scenario.get("days", 7))
+        self.events = sorted(scenario.get("events", []), key=lambda e: e["at"])
+        self.clock = SimulatedClock(self.start)
+        self.player = None
+        self.scheduler = None
+        self._expected = {}  # scheduled_at -> path
+        self.report_events = []
+
+    def _setup_database(self) -> None:
+        if self.database:
+            shutil.copy2(self.database, data_manager_module.DB_NAME)
+        data_manager.init_db()
+        data_manager.reload()
+        for item in self.scenario.get("schedules", []):
+            data_manager.add_schedule(item["day"], item["time"], item["audio"])
+        for item in self.scenario.get("holidays", []):
+            data_manager.add_date_exception(item["start"], item.get("end", item["start"]), "libur",
+                                            description=item.get("description", ""))
+        for key, value in self.scenario.get("settings", {}).items():
+            data_manager.set_setting(key, str(value))
+
+    def _expect_from(self, moment) -> None:
+        """Hitung ulang bel yang diharapkan mulai `moment` (setelah jadwal berubah)"""
+        resolver = CalendarResolver(data_manager)
+        self._expected = {at: path for at, path in self._expected.items() if at < moment}
+        date = moment.date()
+        while date < self.end.date() or (date == self.end.date() and self.end.time() > datetime.time()):
+            for time_str, path in resolver.plan_for(date).bells.items():
+                hour, minute = map(int, time_str.split(":"))
+                scheduled_at = datetime.datetime.combine(date, datetime.time(hour, minute))
+                if moment <= scheduled_at < self.end:
+                    self._expected[scheduled_at] = path
+            date += datetime.timedelta(days=1)
+
+    def _start_scheduler(self) -> None:
+        self.scheduler = BellScheduler(self.player, clock=self.clock, notify=None, start=False)
+
+    def _apply(self, event) -> None:
+        kind = event["type"]
+        now = self.clock.now()
+        if kind == "jump":
+            self.clock.jump(event["seconds"])
+        elif kind == "suspend":
+            self.clock.suspend(event["seconds"])
+        elif kind == "utc_offset":
+            self.clock.set_utc_offset(event["offset"])
+        elif kind == "restart":
+            self.scheduler.stop()
+            self.clock.wake_at = None
+            self.clock.sleep(event.get("down", 0))
+            self._start_scheduler()
+        elif kind == "add_schedule":
+            data_manager.add_schedule(event["day"], event["time"], event["audio"])
+        elif kind == "delete_schedule":
+            data_manager.delete_schedule(event["day"], event["time"], event["audio"])
+        elif kind == "holiday":
+            data_manager.add_date_exception(event["start"], event.get("end", event["start"]), "libur",
+                                            description=event.get("description", ""))
+        elif kind == "setting":
+            data_manager.set_setting(event["key"], str(event["value"]))
+        else:
+            raise ValueError(f"Jenis kejadian tidak dikenal: {kind}")
+        if kind in ("add_schedule", "delete_schedule", "holiday"):
+            self._expect_from(now)
+        self.report_events.append(f"{now:%Y-%m-%d %H:%M:%S} {kind}")
+
+    def run(self) -> SimulationReport:
+        original_db = data_manager_module.DB_NAME
+        workdir = tempfile.mkdtemp(prefix="bell_simulasi_")
+        data_manager_module.DB_NAME = os.path.join(workdir, "simulasi.db")
+        wall_start = time.perf_counter()
+        try:
+            self._setup_database()
+            self._expect_from(self.start)
+            self.player = RecordingPlayer(self.clock)
+            self._start_scheduler()
+            pending = collections.deque(self.events)
+            while self.clock.now() < self.end:
+                while pending and _parse_time(pending[0]["at"]) <= self.clock.now():
+                    self._apply(pending.popleft())
+                self.clock.wake_at = _parse_time(pending[0]["at"]) if pending else self.end
+                self.scheduler.step()
+            self.scheduler.stop()
+            report = self._report(time.perf_counter() - wall_start)
+            self.player.shutdown()
+            return report
+        finally:
+            data_manager_module.DB_NAME = original_db
+            data_manager.reload()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _report(self, wall_seconds) -> SimulationReport:
+        report = SimulationReport(self.start, self.end, wall_seconds)
+        report.expected = len(self._expected)
+        report.plays = len(self.player.plays)
+        report.events = self.report_events
+
+        plays = collections.defaultdict(list)  # (detik, path) -> [waktu putar]
+        for moment, path in self.player.plays:
+            plays[(moment.replace(microsecond=0), path)].append(moment)
+        records = collections.defaultdict(list)
+        for scheduled_at, fired_at, outcome, path in data_manager.get_fire_records(self.start.isoformat(sep=" ")):
+            records[datetime.datetime.fromisoformat(scheduled_at)].append((fired_at, outcome, path))
+
+        for scheduled_at in sorted(set(self._expected) | set(records)):
+            audible = [(fired_at, outcome, path) for fired_at, outcome, path in records.get(scheduled_at, [])
+                       if outcome in (OUTCOME_PLAYED, OUTCOME_CATCHUP)]
+            path = self._expected.get(scheduled_at) or records[scheduled_at][0][2]
+            if scheduled_at not in self._expected:
+                for fired_at, outcome, audible_path in audible:
+                    report.items[RESULT_UNEXPECTED].append((scheduled_at, audible_path, f"diputar {fired_at}"))
+                continue
+            if not audible:
+                report.items[RESULT_MISSED].append((scheduled_at, path, ""))
+                continue
+            if len(audible) > 1:
+                report.items[RESULT_DUPLICATED].append((scheduled_at, path, f"{len(audible)} kali"))
+            fired_at, outcome, audible_path = audible[0]
+            if outcome == OUTCOME_CATCHUP:
+                report.items[RESULT_CATCHUP].append((scheduled_at, path, f"pada {fired_at}"))
+                continue
+            moments = plays.get((datetime.datetime.fromisoformat(fired_at), audible_path), [])
+            delay = (moments[0] - scheduled_at).total_seconds() if moments else None
+            if delay is None or delay > LATE_TOLERANCE:
+                detail = "tidak terdengar" if delay is None else f"+{delay:.1f} detik"
+                report.items[RESULT_LATE].append((scheduled_at, path, detail))
+            else:
+                report.items[RESULT_ON_TIME].append((scheduled_at, path, f"+{delay:.2f} detik"))
+
+        # Pemutaran tanpa catatan fire_log (misal bel dibunyikan dua kali pada detik yang sama)
+        matched = collections.Counter()
+        for items in records.values():
+            for fired_at, outcome, path in items:
+                if fired_at and outcome in (OUTCOME_PLAYED, OUTCOME_CATCHUP):
+                    matched[(datetime.datetime.fromisoformat(fired_at), path)] += 1
+        for key, moments in plays.items():
+            for moment in moments[matched.get(key, 0):]:
+                report.items[RESULT_DUPLICATED].append((moment, key[1], "pemutaran tanpa catatan"))
+        return report
+
+
+def run_cli(argv) -> int:
+    """python simulation.py [skenario.json] [--db bell_sekolah.db] [--json]"""
+    args = list(argv)
+    as_json = "--json" in args
+    if as_json:
+        args.remove("--json")
+    database = None
+    if "--db" in args:
+        index = args.index("--db")
+        database = args[index + 1]
+        del args[index:index + 2]
+    scenario = DEFAULT_SCENARIO
+    if args:
+        with open(args[0], encoding="utf-8") as f:
+            scenario = json.load(f)
+    import logging
+    logging.getLogger("bell_sekolah").setLevel(logging.WARNING)
+    report = Simulation(scenario, database).run()
+    ok = report.ok(scenario.get("expect"))
+    if as_json:
+        print(json.dumps(dict(report.as_dict(), ok=ok), ensure_ascii=False, indent=2))
+    else:
+        print(report.summary())
+        print("LULUS" if ok else "GAGAL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(sys.argv[1:]))
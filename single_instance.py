@@ -0,0 +1,150 @@
+# single_instance.py
+# Sengaja hanya memakai modul standar agar peluncuran kedua selesai dalam
+# milidetik: tanpa database, splash, Tk maupun pygame.
+import os
+import secrets
+import socket
+import threading
+import time
+from constants import LOCK_FILE
+
+# Perintah yang bisa diteruskan ke instance yang sedang berjalan
+COMMAND_SHOW = "show"
+COMMAND_RING = "ring"
+COMMAND_RELOAD = "reload"
+COMMANDS = (COMMAND_SHOW, COMMAND_RING, COMMAND_RELOAD)
+
+CONNECT_TIMEOUT = 2.0  # detik
+STARTUP_WAIT = 5.0     # detik menunggu instance pertama membuka socket
+# Byte yang dikunci berada setelah isi file, karena kunci Windows bersifat
+# wajib dan akan menghalangi instance kedua membaca port
+LOCK_OFFSET = 1024
+
+
+def parse_command(argv) -> tuple:
+    """(perintah, argumen) dari argumen baris perintah, misal `--ring audio/Masuk.wav`"""
+    for index, value in enumerate(argv):
+        name = value.lstrip("-")
+        if value.startswith("--") and name in COMMANDS:
+            arg = argv[index + 1] if index + 1 < len(argv) and not argv[index + 1].startswith("--") else ""
+            return name, arg
+    return COMMAND_SHOW, ""
+
+
+def _lock(file) -> None:
+    """Kunci eksklusif tanpa menunggu; OSError jika dipegang proses lain"""
+    file.seek(LOCK_OFFSET)
+    if os.name == "nt":
+        import msvcrt
+        msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+class InstanceLock:
+    """Satu instance per PC: kunci file OS ditambah socket lokal untuk perintah
+
+    Kunci dilepas OS saat proses berakhir (termasuk crash), jadi tidak ada
+    file kunci basi. File kunci berisi port dan token socket; instance kedua
+    membacanya, meneruskan perintah, lalu keluar. Perintah yang datang
+    sebelum aplikasi siap disimpan dan dijalankan setelah handler dipasang.
+    """
+
+    def __init__(self, path=LOCK_FILE):
+        self.path = path
+        self.port = None
+        self.token = None
+        self._file = None
+        self._sock = None
+        self._handler = None
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """True jika proses ini satu-satunya instance"""
+        open(self.path, "a").close()
+        file = open(self.path, "r+")
+        try:
+            _lock(file)
+        except OSError:
+            file.close()
+            return False
+        self._file = file
+        return True
+
+    def listen(self) -> None:
+        """Buka socket lokal dan umumkan port-nya di file kunci"""
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(4)
+        self.port = self._sock.getsockname()[1]
+        self.token = secrets.token_hex(16)
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(f"{self.port} {self.token}\n")
+        self._file.flush()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def set_handler(self, handler) -> None:
+        """Pasang handler(perintah, argumen) lalu jalankan perintah yang tertunda"""
+        with self._lock:
+            self._handler = handler
+            pending, self._pending = self._pending, []
+        for command, arg in pending:
+            handler(command, arg)
+
+    def submit(self, command, arg="") -> None:
+        """Jalankan perintah sekarang, atau setelah handler dipasang"""
+        with self._lock:
+            handler = self._handler
+            if handler is None:
+                self._pending.append((command, arg))
+                return
+        handler(command, arg)
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            with conn:
+                try:
+                    conn.settimeout(CONNECT_TIMEOUT)
+                    line = conn.makefile("r", encoding="utf-8").readline().rstrip("\n")
+                    token, _, rest = line.partition(" ")
+                    command, _, arg = rest.partition(" ")
+                    if not secrets.compare_digest(token, self.token) or command not in COMMANDS:
+                        conn.sendall(b"error\n")
+                        continue
+                    self.submit(command, arg)
+                    conn.sendall(b"ok\n")
+                except (OSError, ValueError):
+                    pass
+
+    def release(self) -> None:
+        """Tutup socket dan lepas kunci"""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def forward(command, arg="", path=LOCK_FILE) -> bool:
+    """Kirim perintah ke instance yang sedang berjalan; True jika diterima"""
+    deadline = time.monotonic() + STARTUP_WAIT
+    while True:
+        try:
+            with open(path, "r") as file:
+                port, token = file.read().split()
+            with socket.create_connection(("127.0.0.1", int(port)), timeout=CONNECT_TIMEOUT) as sock:
+                sock.sendall(f"{token} {command} {arg}\n".encode("utf-8"))
+                return sock.makefile("r", encoding="utf-8").readline().strip() == "ok"
+        except (OSError, ValueError):
+            # Instance pertama mungkin belum sempat menulis port
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
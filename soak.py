@@ -0,0 +1,337 @@
+# soak.py
+import datetime
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import data_manager as data_manager_module
+from data_manager import data_manager
+from audio_backend import NullBackend
+from audio_player import AudioPlayer
+from clock import SimulatedClock
+from constants import DAYS
+from dataset_generator import generate, DEFAULT_SEED, DEFAULT_START
+from mixer import PRIORITY_MANUAL
+from pcm_cache import pcm_cache
+from scheduler import BellScheduler
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_DAYS = 28
+MIN_DAYS = 7                 # lebih pendek dari ini, pemanasan terbaca sebagai pertumbuhan
+DEFAULT_SPEED = 20000        # detik simulasi per detik nyata
+DEFAULT_SCHEDULES = 500
+SAMPLE_HOURS = 6             # jarak sampel (jam simulasi)
+WARMUP_FRACTION = 0.25       # sampel awal yang diabaikan (cache, import, pool thread)
+TOP_ALLOCATORS = 5
+VOICE_HISTORY = 16
+PREVIEW_TIME = datetime.time(10, 0)  # pratinjau audio dari GUI, sekali sehari
+EDIT_TIME = datetime.time(16, 0)     # tambah lalu hapus jadwal, sekali sehari
+
+# Pertumbuhan maksimum per hari simulasi (kemiringan regresi setelah pemanasan)
+GROWTH_LIMITS = {
+    "rss_bytes": 256 * 1024,
+    "traced_bytes": 32 * 1024,
+    "gc_objects": 200,
+    "threads": 0.1,
+    "fds": 0.1,
+}
+
+
+def _rss_bytes():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _open_fds():
+    if psutil is not None:
+        process = psutil.Process()
+        return process.num_handles() if os.name == "nt" else process.num_fds()
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def _slope_per_day(points) -> float:
+    """Kemiringan regresi linear (nilai per hari) dari [(hari, nilai)]"""
+    points = [(x, y) for x, y in points if y is not None]
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if spread == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def _allocators(snapshot, limit=TOP_ALLOCATORS) -> list:
+    return [(str(stat.traceback[0]), stat.size, stat.count)
+            for stat in snapshot.statistics("lineno")[:limit]]
+
+
+class SoakReport:
+    """Sampel sepanjang soak dan penilaian pertumbuhan tiap sumber daya"""
+
+    def __init__(self, days, speed):
+        self.days = days
+        self.speed = speed
+        self.samples = []  # dict per sampel
+        self.growth = {}  # metrik -> (kemiringan per hari, batas)
+        self.allocator_growth = []  # (lokasi, selisih byte, selisih jumlah) sejak pemanasan
+        self.plays = 0
+        self.wall_seconds = 0.0
+
+    def evaluate(self) -> None:
+        start = int(len(self.samples) * WARMUP_FRACTION)
+        steady = self.samples[start:]
+        for metric, limit in GROWTH_LIMITS.items():
+            self.growth[metric] = (_slope_per_day([(s["day"], s[metric]) for s in steady]), limit)
+
+    @property
+    def failures(self) -> list:
+        return [metric for metric, (slope, limit) in self.growth.items() if slope > limit]
+
+    def ok(self) -> bool:
+        return not self.failures
+
+    def as_dict(self) -> dict:
+        return {
+            "days": self.days,
+            "speed": self.speed,
+            "wall_seconds": round(self.wall_seconds, 1),
+            "plays": self.plays,
+            "growth_per_day": {metric: {"slope": slope, "limit": limit}
+                               for metric, (slope, limit) in self.growth.items()},
+            "failures": self.failures,
+            "allocator_growth": self.allocator_growth,
+            "samples": self.samples,
+        }
+
+    def summary(self) -> str:
+        first, last = self.samples[0], self.samples[-1]
+        lines = [f"Soak {self.days} hari simulasi dalam {self.wall_seconds:.0f} detik, "
+                 f"{self.plays} pemutaran, {len(self.samples)} sampel"]
+        for metric, (slope, limit) in self.growth.items():
+            status = "TUMBUH" if slope > limit else "datar"
+            lines.append(f"  {metric:13s} {first[metric]!s:>12s} -> {last[metric]!s:>12s}  "
+                         f"{slope:+12.1f}/hari (batas {limit})  {status}")
+        if self.allocator_growth:
+            lines.append("  Alokasi yang paling bertambah sejak pemanasan:")
+            for location, size, count in self.allocator_growth:
+                lines.append(f"    {size / 1024:+9.1f} KiB {count:+7d} objek  {location}")
+        return "\n".join(lines)
+
+
+class Soak:
+    """Jalankan scheduler, mixer dan pemutar sungguhan berminggu-minggu dengan jam tiruan
+
+    Bel dibunyikan lewat AudioPlayer (thread per pemutaran) di atas
+    NullBackend berjam tiruan, notifikasi memakai thread seperti aplikasi,
+    dan setiap hari ada pratinjau dari "GUI" serta perubahan jadwal. Waktu
+    simulasi dipercepat `speed` kali, sehingga thread dan loop latar tetap
+    berjalan dalam waktu nyata. Dengan `gui` (butuh display), ClockFace,
+    StatusBar dan ScheduleTable ikut hidup beserta loop after() mereka.
+
+    Semua berjalan di database dan cache PCM sementara.
+    """
+
+    def __init__(self, days=DEFAULT_DAYS, speed=DEFAULT_SPEED, schedules=DEFAULT_SCHEDULES,
+                 seed=DEFAULT_SEED, gui=False):
+        if days < MIN_DAYS:
+            raise ValueError(f"Soak minimal {MIN_DAYS} hari simulasi")
+        self.days = days
+        self.speed = speed
+        self.schedules = schedules
+        self.seed = seed
+        self.gui = gui
+        self.start = datetime.datetime.combine(DEFAULT_START, datetime.time())
+        self.end = self.start + datetime.timedelta(days=days)
+        self.clock = SimulatedClock(self.start)
+        self.player = None
+        self.scheduler = None
+        self.audio = []
+        self._root = None
+        self._table = None
+        self._baseline = None
+        self._wall_start = None
+
+    def _notify(self, title, message) -> None:
+        """Pengganti notifikasi desktop (tetap dijalankan di thread oleh scheduler)"""
+
+    def _preview(self, path) -> None:
+        """Seperti tombol Play di jendela utama: thread baru yang menunggu audio selesai"""
+        threading.Thread(target=self.player.play_audio, args=(path,),
+                         kwargs={"blocking": True, "priority": PRIORITY_MANUAL}, daemon=True).start()
+
+    def _edit(self, day_index) -> None:
+        """Tambah lalu hapus satu jadwal; cache data dan heap scheduler disusun ulang"""
+        path = self.audio[day_index % len(self.audio)]
+        day = DAYS[day_index % len(DAYS)]
+        data_manager.add_schedule(day, "23:59", path)
+        data_manager.delete_schedule(day, "23:59", path)
+
+    def _start_gui(self) -> None:
+        import tkinter as tk
+        from gui.components import ClockFace, StatusBar, ScheduleTable
+        try:
+            self._root = tk.Tk()
+        except tk.TclError as e:
+            raise RuntimeError(f"Mode GUI butuh display: {e}")
+        ClockFace(self._root).pack()
+        StatusBar(self._root, "#333333", "white").pack(fill="x")
+        schedules = data_manager.get_schedules()
+        self._table = ScheduleTable(self._root, rows=max([len(v) for v in schedules.values()] or [1]))
+        self._table.pack(fill="both", expand=True)
+
+    def _sample(self, report):
+        # Sampel soak sendiri tidak dihitung sebagai pertumbuhan aplikasi
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)])
+        moment = self.clock.now()
+        report.samples.append({
+            "at": moment.isoformat(sep=" ", timespec="seconds"),
+            "day": (moment - self.start).total_seconds() / 86400,
+            "wall": round(time.perf_counter() - self._wall_start, 2),
+            "rss_bytes": _rss_bytes(),
+            "traced_bytes": sum(stat.size for stat in snapshot.statistics("filename")),
+            "gc_objects": len(gc.get_objects()),
+            "threads": threading.active_count(),
+            "fds": _open_fds(),
+            "fired": len(self.scheduler.fire_log._fired),
+            "heap": len(self.scheduler._heap),
+            "top": _allocators(snapshot),
+        })
+        if self._baseline is None and len(report.samples) >= self.days * 24 / SAMPLE_HOURS * WARMUP_FRACTION:
+            self._baseline = snapshot
+        return snapshot
+
+    def run(self) -> SoakReport:
+        report = SoakReport(self.days, self.speed)
+        original_db = data_manager_module.DB_NAME
+        original_cache = pcm_cache.cache_dir
+        workdir = tempfile.mkdtemp(prefix="bell_soak_")
+        tracemalloc.start()
+        try:
+            manifest = generate(workdir, self.seed, schedules=self.schedules,
+                                audio_files=max(self.schedules // 5, 5), years=1, history=False)
+            data_manager_module.DB_NAME = manifest["database"]
+            pcm_cache.cache_dir = os.path.join(workdir, "pcm")
+            data_manager.reload()
+            self.audio = sorted(os.path.join(manifest["audio_dir"], name)
+                                for name in os.listdir(manifest["audio_dir"]))
+            if self.gui:
+                self._start_gui()
+
+            # Riwayat suara NullBackend dibatasi kecil agar tidak terbaca sebagai pertumbuhan
+            self.player = AudioPlayer(backend=NullBackend(clock=self.clock.monotonic, history=VOICE_HISTORY))
+            self.scheduler = BellScheduler(self.player, clock=self.clock, notify=self._notify, start=False)
+            self._wall_start = time.perf_counter()
+            interval = datetime.timedelta(hours=SAMPLE_HOURS)
+            next_sample = self.start
+            day_index = 0
+            previews = 0
+            events = []
+            while self.clock.now() < self.end:
+                now = self.clock.now()
+                if now >= next_sample:
+                    self._sample(report)
+                    next_sample += interval
+                if not events:
+                    date = self.start.date() + datetime.timedelta(days=day_index)
+                    events = [(datetime.datetime.combine(date, PREVIEW_TIME), "preview"),
+                              (datetime.datetime.combine(date, EDIT_TIME), "edit")]
+                    day_index += 1
+                while events and events[0][0] <= now:
+                    _, kind = events.pop(0)
+                    if kind == "preview":
+                        previews += 1
+                        self._preview(self.audio[day_index % len(self.audio)])
+                    else:
+                        self._edit(day_index)
+                        if self._table is not None:
+                            self._table.update_data(data_manager.get_schedules())
+                self.clock.wake_at = min(next_sample, events[0][0] if events else self.end, self.end)
+                self.scheduler.step()
+                # Jaga percepatan agar thread pemutaran dan loop after() sempat berjalan
+                ahead = (self.clock.now() - self.start).total_seconds() / self.speed - \
+                    (time.perf_counter() - self._wall_start)
+                if ahead > 0:
+                    time.sleep(ahead)
+                if self._root is not None:
+                    self._root.update()
+            snapshot = self._sample(report)
+            if self._baseline is not None:
+                report.allocator_growth = [
+                    (str(stat.traceback[0]), stat.size_diff, stat.count_diff)
+                    for stat in snapshot.compare_to(self._baseline, "lineno")[:TOP_ALLOCATORS]]
+            report.wall_seconds = time.perf_counter() - self._wall_start
+            report.plays = len(data_manager.get_fire_records(self.start.isoformat(sep=" "))) + previews
+            report.evaluate()
+            return report
+        finally:
+            tracemalloc.stop()
+            if self.scheduler is not None:
+                self.scheduler.stop()
+            if self.player is not None:
+                self.player.shutdown()
+            if self._root is not None:
+                self._root.destroy()
+            data_manager_module.DB_NAME = original_db
+            pcm_cache.cache_dir = original_cache
+            data_manager.reload()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_cli(argv) -> int:
+    """python soak.py [--days N] [--speed N] [--schedules N] [--seed N] [--gui] [--json laporan.json]
+
+    Kode keluar 1 jika ada sumber daya yang terus tumbuh.
+    """
+    args = list(argv)
+    options = {}
+    for flag, key, cast in (("--days", "days", int), ("--speed", "speed", float),
+                            ("--schedules", "schedules", int), ("--seed", "seed", int)):
+        if flag in args:
+            index = args.index(flag)
+            options[key] = cast(args[index + 1])
+            del args[index:index + 2]
+    if "--gui" in args:
+        args.remove("--gui")
+        options["gui"] = True
+    output = None
+    if "--json" in args:
+        index = args.index("--json")
+        output = args[index + 1]
+        del args[index:index + 2]
+    import logging
+    logging.getLogger("bell_sekolah").setLevel(logging.WARNING)
+    try:
+        report = Soak(**options).run()
+    except (RuntimeError, ValueError) as e:
+        print(f"Soak tidak bisa dijalankan: {e}")
+        return 2
+    print(report.summary())
+    print("LULUS" if report.ok() else f"GAGAL: {', '.join(report.failures)} terus tumbuh")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report.as_dict(), f, ensure_ascii=False, indent=2)
+    return 0 if report.ok() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(sys.argv[1:]))
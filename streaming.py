@@ -0,0 +1,374 @@
+# streaming.py
+import hmac
+import json
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from constants import (
+    STREAM_PORT, STREAM_FRAME_MS, STREAM_LEAD, STREAM_MAX_FRAME,
+    MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER
+)
+from chime import chime_library, is_chime_path
+from clock_sync import clock_sync, parse_address
+from logger import log_error, log_info, log_warning
+from metrics import registry
+from mixer import PRIORITY_ANNOUNCEMENT
+
+# Pesan TCP: header (magic, versi, jenis, panjang payload) lalu payload
+_HEADER = struct.Struct("!4sBBxxI")
+_FRAME = struct.Struct("!Id")  # nomor frame, waktu kirim (jam referensi)
+_END = struct.Struct("!I")     # jumlah frame
+MAGIC = b"BELA"
+VERSION = 1
+KIND_HELLO = 1
+KIND_FRAME = 2
+KIND_END = 3
+
+CODEC_PCM = "pcm"
+CODEC_ZLIB = "zlib"
+CONNECT_TIMEOUT = 3.0  # detik
+SEND_TIMEOUT = 2.0     # detik; PC gedung yang lebih lambat dari ini diputus
+BUFFER_MAX_FRAMES = 600  # frame yang boleh menunggu di jitter buffer
+
+_latency = registry.histogram("stream_latency_seconds",
+                              "Selisih waktu kirim frame dan saat diserahkan ke mixer",
+                              buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 2.0, 5.0))
+_underruns = registry.counter("stream_underruns_total", "Frame siaran yang belum tiba saat harus diputar")
+_late = registry.counter("stream_late_frames_total", "Frame siaran yang tiba setelah gilirannya lewat")
+_buffer_gauge = registry.gauge("stream_buffer_seconds", "Isi jitter buffer siaran")
+_sent_bytes = registry.counter("stream_sent_bytes_total", "Byte siaran yang dikirim ke PC gedung")
+
+
+def frame_bytes(frame_ms=STREAM_FRAME_MS) -> int:
+    """Ukuran PCM berformat mixer untuk satu frame"""
+    return MIXER_FREQUENCY * frame_ms // 1000 * MIXER_CHANNELS * (abs(MIXER_SIZE) // 8)
+
+
+def read_pcm(path: str) -> bytes:
+    """PCM berformat mixer dari file audio atau chime
+
+    WAV hasil ingest dan cache PCM dibaca langsung; format lain di-decode
+    sekali di proses terpisah seperti transcoder upload.
+    """
+    from audio_engine import load_pcm
+    from pcm_cache import pcm_cache, _init_decoder, _decode_to_wav
+    if is_chime_path(path):
+        path = chime_library.resolve(path)
+        if path is None:
+            raise FileNotFoundError("Chime tidak ditemukan")
+    cached = pcm_cache.lookup(path)
+    if cached is not None:
+        view = cached.view()
+        try:
+            return bytes(view)
+        finally:
+            view.release()
+            cached.close()
+    pcm = load_pcm(path)
+    if pcm is not None:
+        return pcm
+    settings = (MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER)
+    fd, dest = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        with ProcessPoolExecutor(1, initializer=_init_decoder, initargs=(settings,)) as executor:
+            executor.submit(_decode_to_wav, path, dest).result()
+        return load_pcm(dest)
+    finally:
+        os.remove(dest)
+
+
+def _recv_exact(sock, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Koneksi ditutup")
+        data += chunk
+    return bytes(data)
+
+
+def _recv_message(sock) -> tuple:
+    """(jenis, payload) pesan berikutnya"""
+    magic, version, kind, length = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Bukan pesan siaran")
+    if length > STREAM_MAX_FRAME:
+        raise ValueError(f"Pesan terlalu besar: {length} byte")
+    return kind, _recv_exact(sock, length)
+
+
+def _message(kind, payload: bytes) -> bytes:
+    return _HEADER.pack(MAGIC, VERSION, kind, len(payload)) + payload
+
+
+class JitterBuffer:
+    """Frame siaran diurutkan menurut nomor dan diambil mixer satu per satu
+
+    Frame yang belum tiba saat gilirannya diganti hening (underrun) dan
+    jika datang kemudian dibuang, sehingga semua PC gedung tetap pada
+    posisi yang sama terhadap waktu mulai serentak.
+    """
+
+    def __init__(self, start_at, frame_ms=STREAM_FRAME_MS, codec=CODEC_PCM):
+        self.start_at = start_at  # epoch jam referensi saat frame 0 diputar
+        self.frame_seconds = frame_ms / 1000
+        self.silence = bytes(frame_bytes(frame_ms))
+        self.codec = codec
+        self.underruns = 0
+        self.late = 0
+        self._frames = {}  # nomor -> (waktu kirim, payload)
+        self._next = 0
+        self._total = None  # jumlah frame setelah siaran selesai
+        self._highest = -1
+        self._lock = threading.Lock()
+
+    def put(self, seq, sent_at, payload) -> None:
+        with self._lock:
+            # Frame yang terlalu jauh di depan juga dibuang agar memori terbatas
+            if seq < self._next or seq >= self._next + BUFFER_MAX_FRAMES:
+                self.late += 1
+                _late.inc()
+                return
+            self._frames[seq] = (sent_at, payload)
+            self._highest = max(self._highest, seq)
+            _buffer_gauge.set(len(self._frames) * self.frame_seconds)
+
+    def end(self, total=None) -> None:
+        """Tandai siaran selesai; tanpa `total` (koneksi putus) dipakai frame tertinggi yang diterima"""
+        with self._lock:
+            if total is not None:
+                self._total = total
+            elif self._total is None:
+                self._total = self._highest + 1
+
+    def skip_to(self, now) -> None:
+        """Lewati frame yang waktunya sudah lewat (PC gedung terlambat bergabung)"""
+        behind = int((now - self.start_at) / self.frame_seconds)
+        with self._lock:
+            if behind > self._next:
+                for seq in range(self._next, behind):
+                    self._frames.pop(seq, None)
+                self._next = behind
+
+    def pop(self):
+        """Blok PCM berikutnya, hening jika belum tiba, None jika siaran selesai"""
+        with self._lock:
+            if self._total is not None and self._next >= self._total:
+                return None
+            frame = self._frames.pop(self._next, None)
+            self._next += 1
+            _buffer_gauge.set(len(self._frames) * self.frame_seconds)
+        if frame is None:
+            self.underruns += 1
+            _underruns.inc()
+            return self.silence
+        sent_at, payload = frame
+        _latency.observe(max(0.0, clock_sync.now().timestamp() - sent_at))
+        if self.codec == CODEC_ZLIB:
+            return zlib.decompressobj().decompress(payload, len(self.silence))
+        return payload
+
+
+class StreamReceiver:
+    """PC gedung: terima siaran dan putar lewat AudioPlayer pada waktu mulai serentak
+
+    Waktu mulai dan cap waktu frame memakai jam terkoreksi clock_sync, jadi
+    PC yang jamnya sudah diselaraskan ke referensi mulai bersamaan.
+    """
+
+    def __init__(self, audio_player, host="0.0.0.0", port=STREAM_PORT, token=None):
+        self.audio_player = audio_player
+        self.host = host
+        self.port = port
+        self.token = token or None
+        self.sock = None
+        self.thread = None
+        self.buffers = []  # Jitter buffer siaran terakhir (untuk diperiksa)
+        self._stop = threading.Event()
+
+    def start(self) -> bool:
+        """Buka port TCP dan terima siaran di thread daemon"""
+        if not self.token and self.host not in ("127.0.0.1", "localhost"):
+            log_warning("Penerima siaran dibuka ke jaringan tanpa stream_token")
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.sock.bind((self.host, self.port))
+            self.sock.listen(4)
+            self.sock.settimeout(1.0)
+            self.port = self.sock.getsockname()[1]
+        except OSError as e:
+            log_error(f"Gagal membuka penerima siaran: {e}")
+            self.sock = None
+            return False
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self.thread.start()
+        log_info(f"Penerima siaran aktif di TCP {self.host}:{self.port}")
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def _accept_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                conn, address = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._session, args=(conn, address), daemon=True).start()
+
+    def _session(self, conn, address) -> None:
+        buffer = None
+        try:
+            conn.settimeout(None)
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            kind, payload = _recv_message(conn)
+            if kind != KIND_HELLO:
+                raise ValueError("Pesan pertama harus HELLO")
+            hello = json.loads(payload)
+            if self.token and not hmac.compare_digest(str(hello.get("token", "")).encode("utf-8"),
+                                                      self.token.encode("utf-8")):
+                log_warning(f"Siaran dari {address[0]} ditolak: token salah")
+                return
+            if (hello.get("rate"), hello.get("channels"), hello.get("width")) != \
+                    (MIXER_FREQUENCY, MIXER_CHANNELS, abs(MIXER_SIZE) // 8):
+                log_warning(f"Siaran dari {address[0]} ditolak: format PCM berbeda")
+                return
+            name = hello.get("name") or "siaran"
+            buffer = JitterBuffer(float(hello["start_at"]), int(hello.get("frame_ms", STREAM_FRAME_MS)),
+                                  hello.get("codec", CODEC_PCM))
+            self.buffers = (self.buffers + [buffer])[-10:]
+            log_info(f"Siaran {name} dari {address[0]} dimulai serentak dalam "
+                     f"{buffer.start_at - clock_sync.now().timestamp():.2f} detik")
+            threading.Thread(target=self._play_at, args=(buffer, name), daemon=True).start()
+            while True:
+                kind, payload = _recv_message(conn)
+                if kind == KIND_FRAME:
+                    seq, sent_at = _FRAME.unpack_from(payload)
+                    buffer.put(seq, sent_at, payload[_FRAME.size:])
+                elif kind == KIND_END:
+                    buffer.end(_END.unpack(payload)[0])
+                    break
+        except (ConnectionError, OSError, ValueError, KeyError, TypeError, struct.error) as e:
+            # struct.error: frame lebih pendek dari header; TypeError: HELLO tidak lengkap
+            log_warning(f"Siaran dari {address[0]} terputus: {e}")
+        finally:
+            if buffer is not None:
+                buffer.end()
+            conn.close()
+
+    def _play_at(self, buffer, name) -> None:
+        """Tunggu waktu mulai serentak lalu serahkan jitter buffer ke mixer"""
+        delay = buffer.start_at - clock_sync.now().timestamp()
+        if delay > 0:
+            time.sleep(delay)
+        buffer.skip_to(clock_sync.now().timestamp())
+        self.audio_player.play_stream(buffer.pop, name, PRIORITY_ANNOUNCEMENT, blocking=True)
+        log_info(f"Siaran {name} selesai (underrun {buffer.underruns}, terlambat {buffer.late})")
+
+
+class AnnouncementSender:
+    """PC kantor: kirim pengumuman per frame ke semua PC gedung sekaligus
+
+    Frame dikirim dengan laju waktu nyata sehingga file dan sumber langsung
+    (iterator blok PCM dari perangkat rekam) diperlakukan sama; PC gedung
+    mulai memutar STREAM_LEAD detik setelah frame pertama dikirim.
+    """
+
+    def __init__(self, targets, token=None, lead=STREAM_LEAD, frame_ms=STREAM_FRAME_MS, compress=False):
+        self.targets = [parse_address(target, STREAM_PORT) for target in targets]
+        self.token = token or ""
+        self.lead = lead
+        self.frame_ms = frame_ms
+        self.codec = CODEC_ZLIB if compress else CODEC_PCM
+
+    def _connect(self, hello) -> list:
+        connections = []
+        message = _message(KIND_HELLO, json.dumps(hello).encode("utf-8"))
+        for host, port in self.targets:
+            try:
+                sock = socket.create_connection((host, port), timeout=CONNECT_TIMEOUT)
+                sock.settimeout(SEND_TIMEOUT)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.sendall(message)
+                connections.append(((host, port), sock))
+            except OSError as e:
+                log_error(f"Gagal menghubungi PC gedung {host}:{port}: {e}")
+        return connections
+
+    def _broadcast(self, connections, message) -> list:
+        alive = []
+        for target, sock in connections:
+            try:
+                sock.sendall(message)
+                _sent_bytes.inc(len(message))
+                alive.append((target, sock))
+            except OSError as e:
+                log_error(f"Siaran ke {target[0]}:{target[1]} terputus: {e}")
+                sock.close()
+        return alive
+
+    def _frames(self, blocks):
+        """Potong blok PCM sembarang ukuran menjadi frame tetap
+
+        Blok dibaca lewat memoryview dengan offset, jadi satu blok besar
+        (send_file) tidak disalin ulang per frame; yang disimpan antar blok
+        hanya sisa yang belum cukup satu frame.
+        """
+        size = frame_bytes(self.frame_ms)
+        pending = b""
+        for block in blocks:
+            view = memoryview(pending + bytes(block) if pending else block).cast("B")
+            offset = 0
+            while len(view) - offset >= size:
+                yield bytes(view[offset:offset + size])
+                offset += size
+            pending = bytes(view[offset:])
+            view.release()
+        if pending:
+            yield pending
+
+    def send_file(self, path: str) -> dict:
+        """Siarkan satu file audio atau chime"""
+        return self.send_blocks([read_pcm(path)], os.path.basename(path))
+
+    def send_blocks(self, blocks, name: str) -> dict:
+        """Siarkan iterator blok PCM berformat mixer; mengembalikan ringkasan"""
+        start_at = clock_sync.now().timestamp() + self.lead
+        hello = {"token": self.token, "name": name, "start_at": start_at, "frame_ms": self.frame_ms,
+                 "rate": MIXER_FREQUENCY, "channels": MIXER_CHANNELS, "width": abs(MIXER_SIZE) // 8,
+                 "codec": self.codec}
+        connections = self._connect(hello)
+        reached = len(connections)
+        frames = 0
+        origin = time.perf_counter()
+        frame_seconds = self.frame_ms / 1000
+        for seq, pcm in enumerate(self._frames(blocks)):
+            if not connections:
+                break
+            # Laju waktu nyata: buffer PC gedung tetap sekitar STREAM_LEAD detik
+            wait = origin + seq * frame_seconds - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            payload = zlib.compress(pcm, 1) if self.codec == CODEC_ZLIB else pcm
+            frame = _FRAME.pack(seq, clock_sync.now().timestamp()) + payload
+            connections = self._broadcast(connections, _message(KIND_FRAME, frame))
+            frames = seq + 1
+        connections = self._broadcast(connections, _message(KIND_END, _END.pack(frames)))
+        for _, sock in connections:
+            sock.close()
+        log_info(f"Siaran {name}: {frames} frame ke {len(connections)}/{len(self.targets)} PC gedung")
+        return {"frames": frames, "targets": len(self.targets), "reached": reached,
+                "completed": len(connections), "start_at": start_at}
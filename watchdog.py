@@ -0,0 +1,129 @@
+# watchdog.py
+import threading
+import time
+from constants import WATCHDOG_INTERVAL
+from logger import log_error, log_info
+from metrics import registry
+
+# Alasan kegagalan (kategori tetap agar label metrik tidak bertambah liar)
+FAILURE_DEAD = "thread_mati"
+FAILURE_STALLED = "macet"
+FAILURE_RESTART_ERROR = "gagal_restart"
+
+
+class _Component:
+    __slots__ = ("name", "deadline", "restart", "is_alive", "is_active",
+                 "restarts", "last_failure", "last_failure_at")
+
+    def __init__(self, name, deadline, restart, is_alive, is_active):
+        self.name = name
+        self.deadline = deadline
+        self.restart = restart
+        self.is_alive = is_alive
+        self.is_active = is_active
+        self.restarts = 0
+        self.last_failure = None
+        self.last_failure_at = None
+
+
+class Supervisor:
+    """Pantau heartbeat komponen dan jalankan ulang yang mati atau macet
+
+    Komponen memanggil `heartbeat(nama)` dari loop-nya. Supervisor memeriksa
+    setiap WATCHDOG_INTERVAL detik: thread yang mati (`is_alive` False) atau
+    heartbeat yang lebih tua dari `deadline` saat komponen aktif dianggap
+    gagal, lalu `restart()` milik komponen dipanggil.
+    """
+
+    def __init__(self, interval=WATCHDOG_INTERVAL):
+        self.interval = interval
+        self.running = False
+        self.thread = None
+        self._components = {}
+        self._beats = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, restart, deadline=None, is_alive=None, is_active=None) -> None:
+        """Daftarkan komponen; deadline None = hanya cek thread hidup"""
+        with self._lock:
+            self._components[name] = _Component(name, deadline, restart, is_alive, is_active)
+        self._beats[name] = time.monotonic()
+        registry.gauge_fn("watchdog_heartbeat_age_seconds", "Umur heartbeat terakhir komponen",
+                          lambda: time.monotonic() - self._beats.get(name, 0), {"component": name})
+
+    def heartbeat(self, name) -> None:
+        """Tandai komponen masih berjalan (cukup satu penugasan dict)"""
+        self._beats[name] = time.monotonic()
+
+    def start(self) -> None:
+        """Jalankan thread supervisor"""
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        log_info("Watchdog dijalankan")
+
+    def stop(self) -> None:
+        """Hentikan supervisor"""
+        self.running = False
+
+    def _run(self) -> None:
+        while self.running:
+            try:
+                self.check()
+            except Exception as e:
+                log_error(f"Error di watchdog: {e}")
+            time.sleep(self.interval)
+
+    def check(self) -> None:
+        """Periksa semua komponen sekali"""
+        with self._lock:
+            components = list(self._components.values())
+        now = time.monotonic()
+        for component in components:
+            reason = None
+            detail = ""
+            if component.is_alive is not None and not component.is_alive():
+                reason = FAILURE_DEAD
+            elif component.deadline is not None and \
+                    (component.is_active is None or component.is_active()):
+                age = now - self._beats.get(component.name, now)
+                if age > component.deadline:
+                    reason = FAILURE_STALLED
+                    detail = f" (heartbeat terakhir {age:.0f} detik lalu)"
+            if reason:
+                self._recover(component, reason, detail)
+
+    def _recover(self, component, reason, detail) -> None:
+        log_error(f"Watchdog: {component.name} {reason}{detail}, menjalankan ulang")
+        component.restarts += 1
+        component.last_failure = reason
+        component.last_failure_at = time.time()
+        registry.counter("watchdog_restarts_total", "Restart komponen oleh watchdog",
+                         {"component": component.name}).inc()
+        registry.gauge("watchdog_last_failure_timestamp_seconds",
+                       "Waktu kegagalan terakhir menurut komponen dan alasan",
+                       {"component": component.name, "reason": reason}).set(component.last_failure_at)
+        try:
+            component.restart()
+            self._beats[component.name] = time.monotonic()
+        except Exception as e:
+            component.last_failure = FAILURE_RESTART_ERROR
+            log_error(f"Watchdog: gagal menjalankan ulang {component.name}: {e}")
+
+    def status(self) -> dict:
+        """Ringkasan restart dan kegagalan terakhir per komponen"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "restarts": component.restarts,
+                    "last_failure": component.last_failure,
+                    "last_failure_at": component.last_failure_at,
+                    "heartbeat_age": now - self._beats.get(name, now),
+                }
+                for name, component in self._components.items()
+            }
+
+
+# Instance global
+supervisor = Supervisor()